@@ -0,0 +1,200 @@
+"""Бюджеты страниц: число SQL-запросов, время в БД и время рендера.
+
+Фикстура view_budget замеряет страницу на засеянных данных (seeded_site)
+и сравнивает замер с tests/budgets.json; при превышении тест падает
+с diff бюджета и замера. pytest --update-budgets перезаписывает файл по
+текущим замерам: запросы как есть, время с запасом BUDGET_HEADROOM.
+
+По умолчанию проверяется только число запросов: время зависит от нагрузки
+машины. pytest --check-time-budgets проверяет и время, а переменная
+окружения BUDGET_TIME_FACTOR растягивает его бюджеты на медленных машинах.
+"""
+import difflib
+import json
+import math
+import os
+import statistics
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count
+from django.urls import reverse
+
+BUDGET_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'budgets.json'
+)
+METRICS = ('queries', 'sql_ms', 'render_ms')
+REPEATS = 5
+BUDGET_HEADROOM = 3
+MIN_TIME_BUDGET_MS = 10
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--update-budgets', action='store_true', default=False,
+        help='Перезаписать tests/budgets.json по текущим замерам.'
+    )
+    parser.addoption(
+        '--check-time-budgets', action='store_true', default=False,
+        help='Проверять бюджеты времени, а не только число запросов.'
+    )
+
+
+def load_budgets(path=BUDGET_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def measure_view(client, url, repeats=REPEATS):
+    """Худшее число запросов и медианы времени по нескольким прогонам с
+    пустым кэшем; первый запрос прогревает шаблоны и не учитывается."""
+    from core.metrics import measure
+
+    client.get(url)
+    runs = []
+    for _ in range(repeats):
+        cache.clear()
+        with measure() as result:
+            response = client.get(url)
+        assert response.status_code == 200, (
+            f'Страница {url} вернула {response.status_code}')
+        runs.append(result)
+    return {
+        'queries': max(run.queries for run in runs),
+        'sql_ms': round(statistics.median(run.sql_ms for run in runs), 2),
+        'render_ms': round(
+            statistics.median(run.render_ms for run in runs), 2),
+    }
+
+
+def exceeded(measured, budget, check_time=False, time_factor=1.0):
+    """Метрики, вышедшие за бюджет; время - только при check_time."""
+    over = []
+    for metric in METRICS:
+        limit = budget.get(metric)
+        if limit is None:
+            continue
+        if metric != 'queries':
+            if not check_time:
+                continue
+            limit *= time_factor
+        if measured[metric] > limit:
+            over.append(metric)
+    return over
+
+
+def budget_diff(name, budget, measured):
+    def lines(data):
+        return json.dumps(
+            {name: data}, indent=2, sort_keys=True).splitlines()
+
+    return '\n'.join(difflib.unified_diff(
+        lines(budget), lines(measured), 'budgets.json', 'замер',
+        lineterm=''
+    ))
+
+
+def budget_for(measured):
+    """Бюджет по замеру: запросы точно, время с запасом."""
+    budget = {'queries': measured['queries']}
+    for metric in ('sql_ms', 'render_ms'):
+        budget[metric] = max(
+            math.ceil(measured[metric] * BUDGET_HEADROOM),
+            MIN_TIME_BUDGET_MS
+        )
+    return budget
+
+
+class BudgetRecorder:
+    def __init__(self, update=False, check_time=False, path=BUDGET_PATH):
+        self.update = update
+        self.check_time = check_time
+        self.path = path
+        self.budgets = load_budgets(path)
+        self.measured = {}
+        self.time_factor = float(os.environ.get('BUDGET_TIME_FACTOR', 1))
+
+    def check(self, name, client, url):
+        measured = measure_view(client, url)
+        self.measured[name] = measured
+        if self.update:
+            return measured
+        budget = self.budgets.get(name)
+        if budget is None:
+            pytest.fail(
+                f'Нет бюджета для {name} в {self.path}; '
+                f'запустите pytest --update-budgets', pytrace=False)
+        over = exceeded(
+            measured, budget, self.check_time, self.time_factor)
+        if over:
+            pytest.fail(
+                f'{name}: превышен бюджет ({", ".join(over)})\n'
+                + budget_diff(name, budget, measured), pytrace=False)
+        return measured
+
+    def save(self):
+        budgets = dict(self.budgets)
+        for name, measured in self.measured.items():
+            budgets[name] = budget_for(measured)
+        with open(self.path, 'w', encoding='utf-8') as file:
+            json.dump(budgets, file, indent=2, sort_keys=True)
+            file.write('\n')
+
+
+@pytest.fixture(scope='session')
+def budget_recorder(request):
+    recorder = BudgetRecorder(
+        request.config.getoption('--update-budgets'),
+        request.config.getoption('--check-time-budgets'),
+    )
+    yield recorder
+    if recorder.update and recorder.measured:
+        recorder.save()
+
+
+@pytest.fixture
+def view_budget(budget_recorder):
+    """view_budget(name, client, url) - замерить и сверить с бюджетом."""
+    return budget_recorder.check
+
+
+class SeededSite:
+    """Засеянные данные и адреса страниц с самыми тяжелыми объектами."""
+
+    def __init__(self):
+        from posts.models import Group, Post
+
+        User = get_user_model()
+        self.reader = User.objects.annotate(
+            follows=Count('follower')).order_by('-follows', 'pk').first()
+        self.author = User.objects.order_by(
+            '-profile__posts_count', 'pk').first()
+        self.group = Group.objects.order_by('-posts_count', 'pk').first()
+        self.post = Post.objects.annotate(
+            total=Count('comments')).order_by('-total', 'pk').first()
+
+    def url(self, name):
+        args = {
+            'posts:group_list': [self.group.slug],
+            'posts:profile': [self.author.username],
+            'posts:post_detail': [self.post.pk],
+        }
+        return reverse(name, args=args.get(name, []))
+
+
+@pytest.fixture
+def seeded_site(db, mock_media):
+    from posts.seeding import Seeder
+
+    seeder = Seeder(seed=1, batch_size=500)
+    seeder.users(60)
+    seeder.groups(4)
+    seeder.make_images(3)
+    seeder.posts(400, comments_mean=3, image_share=0.3)
+    seeder.follows(8)
+    seeder.finish()
+    return SeededSite()
@@ -0,0 +1,32 @@
+import pytest
+
+from tests.fixtures.fixture_budget import exceeded
+
+VIEWS = [
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+]
+
+
+class TestViewBudgets:
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('name', VIEWS)
+    def test_view_within_budget(self, name, seeded_site, client, view_budget):
+        client.force_login(seeded_site.reader)
+        view_budget(name, client, seeded_site.url(name))
+
+
+class TestExceeded:
+
+    def test_time_checked_only_on_request(self):
+        budget = {'queries': 4, 'sql_ms': 10, 'render_ms': 10}
+        measured = {'queries': 4, 'sql_ms': 50, 'render_ms': 5}
+        assert exceeded(measured, budget) == []
+        assert exceeded(measured, budget, check_time=True) == ['sql_ms']
+        assert exceeded(
+            measured, budget, check_time=True, time_factor=5) == []
+        assert exceeded(dict(measured, queries=5), budget) == ['queries']
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib import admin
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+
+from . import sqllog
+from .models import Job
+
+SQL_REPORT_ROWS: int = 100
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'kind',
+        'object_id',
+        'status',
+        'attempts',
+        'run_after',
+        'error',
+    )
+    list_filter = ('status', 'kind')
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Job, JobAdmin)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def sql_report(request):
+    """Отчет журнала SQL: отпечатки по суммарному времени, фильтр по
+    странице; POST сбрасывает сводку."""
+    if request.method == 'POST':
+        sqllog.log.clear()
+        return redirect('sql_report')
+    selected = request.GET.get('view') or None
+    rows = []
+    for entry, timing in sqllog.log.snapshot(selected)[:SQL_REPORT_ROWS]:
+        views = sorted(
+            entry.views.items(), key=lambda item: item[1].total,
+            reverse=True)
+        rows.append({
+            'digest': entry.digest,
+            'sql': entry.sql,
+            'count': timing.count,
+            'total_ms': _ms(timing.total),
+            'mean_ms': _ms(timing.mean),
+            'max_ms': _ms(timing.max),
+            'slow': entry.slow,
+            'plan': entry.plan,
+            'views': [(view, _ms(item.total)) for view, item in views[:3]],
+        })
+    views = sorted(
+        sqllog.log.views().items(), key=lambda item: item[1].total,
+        reverse=True)
+    return TemplateResponse(request, 'core/sql_report.html', {
+        **admin.site.each_context(request),
+        'title': 'Журнал SQL',
+        'rows': rows,
+        'views': [
+            (view, timing.count, _ms(timing.total), _ms(timing.max))
+            for view, timing in views
+        ],
+        'selected': selected,
+        'started': datetime.fromtimestamp(sqllog.log.started),
+        'threshold_ms': _ms(settings.SQL_SLOW_THRESHOLD),
+    })
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import sqllog
+
+        if settings.SQL_LOG:
+            connection_created.connect(sqllog.install)
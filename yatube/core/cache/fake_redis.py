@@ -0,0 +1,203 @@
+"""Крошечный сервер с протоколом Redis для тестов и локальной разработки.
+
+Поддерживает только команды, которые использует core.cache.redis, а EVAL -
+только для его скрипта INCR_SCRIPT:
+    python -m core.cache.fake_redis --port 6379
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+from core.cache.redis import INCR_SCRIPT
+
+
+class Store:
+    """Словарь значений со сроком жизни, общий для всех соединений."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def _alive(self, key):
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return item
+
+    def get(self, key):
+        item = self._alive(key)
+        return None if item is None else item[0]
+
+    def set(self, key, value, ttl_ms=None, nx=False):
+        if nx and self._alive(key) is not None:
+            return False
+        expires = None
+        if ttl_ms is not None:
+            expires = time.monotonic() + ttl_ms / 1000
+        self.data[key] = (value, expires)
+        return True
+
+    def expire(self, key, ttl_ms):
+        item = self._alive(key)
+        if item is None:
+            return False
+        expires = None if ttl_ms is None else time.monotonic() + ttl_ms / 1000
+        self.data[key] = (item[0], expires)
+        return True
+
+
+class Handler(socketserver.StreamRequestHandler):
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def reply(self, value):
+        if value is None:
+            data = b'$-1\r\n'
+        elif value is True:
+            data = b'+OK\r\n'
+        elif isinstance(value, int):
+            data = b':%d\r\n' % value
+        elif isinstance(value, Exception):
+            data = b'-ERR %s\r\n' % str(value).encode()
+        elif isinstance(value, list):
+            self.wfile.write(b'*%d\r\n' % len(value))
+            for item in value:
+                self.reply(item)
+            return
+        else:
+            data = b'$%d\r\n%s\r\n' % (len(value), value)
+        self.wfile.write(data)
+
+    def handle(self):
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            name = args[0].decode().upper()
+            command = getattr(self, f'cmd_{name.lower()}', None)
+            with self.server.store.lock:
+                if command is None:
+                    result = ValueError(f"unknown command '{name}'")
+                else:
+                    try:
+                        result = command(*args[1:])
+                    except ValueError as error:
+                        result = error
+            self.reply(result)
+
+    @property
+    def store(self):
+        return self.server.store
+
+    def cmd_ping(self):
+        return True
+
+    def cmd_select(self, db):
+        return True
+
+    def cmd_get(self, key):
+        return self.store.get(key)
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        ttl_ms = None
+        if b'PX' in options:
+            ttl_ms = int(options[options.index(b'PX') + 1])
+        if not self.store.set(key, value, ttl_ms, nx=b'NX' in options):
+            return None
+        return True
+
+    def cmd_mget(self, *keys):
+        return [self.store.get(key) for key in keys]
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self.store.get(key) is not None:
+                del self.store.data[key]
+                removed += 1
+        return removed
+
+    def cmd_exists(self, *keys):
+        return sum(self.store.get(key) is not None for key in keys)
+
+    def cmd_incrby(self, key, delta):
+        item = self.store._alive(key)
+        value, expires = item if item is not None else (b'0', None)
+        try:
+            value = int(value) + int(delta)
+        except ValueError:
+            raise ValueError('value is not an integer or out of range')
+        self.store.data[key] = (str(value).encode(), expires)
+        return value
+
+    def cmd_eval(self, script, numkeys, key, delta):
+        if script.decode() != INCR_SCRIPT:
+            raise ValueError('unknown script')
+        if self.store.get(key) is None:
+            return None
+        return self.cmd_incrby(key, delta)
+
+    def cmd_pexpire(self, key, ttl_ms):
+        return int(self.store.expire(key, int(ttl_ms)))
+
+    def cmd_persist(self, key):
+        return int(self.store.expire(key, None))
+
+    def cmd_flushdb(self):
+        self.store.data.clear()
+        return True
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    """Сервер в фоновом потоке: with FakeRedisServer() as server: ..."""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), Handler)
+        self.store = Store()
+        self.thread = None
+
+    @property
+    def location(self):
+        host, port = self.server_address[:2]
+        return f'{host}:{port}'
+
+    def __enter__(self):
+        self.thread = threading.Thread(
+            target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    options = parser.parse_args()
+    with FakeRedisServer(options.host, options.port) as server:
+        print(f'Fake Redis слушает {server.location}')
+        server.thread.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""Кэш-бэкенд Django поверх протокола Redis (RESP) без внешних пакетов."""
+import pickle
+import socket
+import threading
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+DEFAULT_PORT: int = 6379
+# INCRBY только для существующего ключа: проверка и изменение одной
+# командой, без гонки с удалением или истечением ключа.
+INCR_SCRIPT: str = (
+    "if redis.call('EXISTS', KEYS[1]) == 0 then return false end "
+    "return redis.call('INCRBY', KEYS[1], ARGV[1])"
+)
+
+
+class RedisError(Exception):
+    """Ответ сервера с ошибкой."""
+
+
+class CommandNotSent(ConnectionError):
+    """Команда не ушла на сервер, ее можно повторить."""
+
+
+class Connection:
+    """Одно соединение с сервером, команды выполняются по очереди."""
+
+    def __init__(self, host, port, db=0, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.reader = self.sock.makefile('rb')
+        if db:
+            self.execute('SELECT', db)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def execute(self, *args):
+        chunks = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            chunks.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        try:
+            self.sock.sendall(b''.join(chunks))
+        except OSError as error:
+            raise CommandNotSent(str(error)) from error
+        return self.read_reply()
+
+    def read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('Соединение с сервером кэша закрыто')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            raise RedisError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self.read_reply() for _ in range(length)]
+        raise RedisError(f'Неизвестный ответ сервера: {line!r}')
+
+
+def parse_location(location):
+    """'host:port/db' -> (host, port, db)."""
+    location = location.replace('redis://', '', 1)
+    address, _, db = location.partition('/')
+    host, _, port = address.partition(':')
+    return host or 'localhost', int(port or DEFAULT_PORT), int(db or 0)
+
+
+class RedisCache(BaseCache):
+    """Общий для всех процессов кэш в Redis или совместимом сервере.
+
+    Целые числа хранятся как есть, чтобы работали INCRBY/DECRBY,
+    остальные значения - в pickle (он всегда начинается с байта 0x80).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        if isinstance(location, (list, tuple)):
+            location = location[0]
+        self.host, self.port, self.db = parse_location(location)
+        self.socket_timeout = params.get('OPTIONS', {}).get(
+            'SOCKET_TIMEOUT', 5)
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = Connection(
+                self.host, self.port, self.db, self.socket_timeout)
+            self._local.connection = connection
+        return connection
+
+    def _execute(self, *args, retry=True):
+        """Команда на соединении потока. После обрыва соединение
+        открывается заново и команда повторяется, если ее можно выполнить
+        дважды (retry) или она не успела уйти на сервер."""
+        try:
+            return self._connection().execute(*args)
+        except OSError as error:
+            self.close()
+            if not retry and not isinstance(error, CommandNotSent):
+                raise
+            return self._connection().execute(*args)
+
+    def close(self, **kwargs):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(data):
+        if data is None:
+            return None
+        if data[:1] == b'\x80':
+            return pickle.loads(data)
+        return int(data)
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _expiry(self, timeout):
+        """Аргументы SET для времени жизни в миллисекундах."""
+        timeout = self._timeout(timeout)
+        if timeout is None:
+            return ()
+        return ('PX', max(int(timeout * 1000), 1))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        reply = self._execute(
+            'SET', key, self._encode(value), *self._expiry(timeout), 'NX',
+            retry=False)
+        return reply is not None
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        data = self._execute('GET', key)
+        return default if data is None else self._decode(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        timeout = self._timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            self._execute('DEL', key)
+            return
+        self._execute('SET', key, self._encode(value), *self._expiry(timeout))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        expiry = self._expiry(timeout)
+        if not expiry:
+            self._execute('PERSIST', key)
+            return self._has(key)
+        return bool(self._execute('PEXPIRE', key, expiry[1]))
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._execute('DEL', key)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = [self.make_key(key, version=version) for key in keys]
+        for key in made:
+            self.validate_key(key)
+        values = self._execute('MGET', *made)
+        return {
+            key: self._decode(data)
+            for key, data in zip(keys, values) if data is not None
+        }
+
+    def _has(self, key):
+        return bool(self._execute('EXISTS', key))
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._has(key)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        try:
+            value = self._execute(
+                'EVAL', INCR_SCRIPT, 1, key, delta, retry=False)
+        except RedisError:
+            raise ValueError("Key '%s' is not an integer" % key)
+        if value is None:
+            raise ValueError("Key '%s' not found" % key)
+        return value
+
+    def delete_many(self, keys, version=None):
+        made = [self.make_key(key, version=version) for key in keys]
+        if made:
+            self._execute('DEL', *made)
+
+    def clear(self):
+        self._execute('FLUSHDB')
@@ -0,0 +1,93 @@
+"""Пересчет значений кэша без лавины одновременных запросов.
+
+Запись хранится как (значение, логический срок, время вычисления) и
+живет в кэше дольше логического срока, чтобы ее можно было отдать
+устаревшей. Пересчет начинается заранее с вероятностью, растущей к
+концу срока (алгоритм XFetch), и выполняется только тем процессом,
+который взял блокировку через cache.add; остальные отдают старую копию.
+"""
+import math
+import random
+import time
+
+LOCK_TIMEOUT: int = 30
+WAIT_STEP: float = 0.05
+# Дольше ждать чужой пересчет нет смысла: запрос стоит в потоке сервера.
+WAIT_TIMEOUT: float = 0.2
+
+
+def _is_fresh(expires_at, delta, beta):
+    """XFetch: чем дороже пересчет и ближе срок, тем раньше он начнется."""
+    early = -delta * beta * math.log(1.0 - random.random())
+    return time.time() + early < expires_at
+
+
+def _compute_and_store(cache, key, compute, timeout, stale_timeout,
+                       fallback_key):
+    started = time.time()
+    value = compute()
+    if value is None:
+        return None
+    delta = time.time() - started
+    record = (value, started + delta + timeout, delta)
+    data = {key: record}
+    if fallback_key is not None:
+        data[fallback_key] = record
+    cache.set_many(data, timeout + stale_timeout)
+    return value
+
+
+def get_or_compute(cache, key, compute, timeout, stale_timeout=None,
+                   fallback_key=None, beta=1.0, lock_timeout=LOCK_TIMEOUT,
+                   wait_timeout=WAIT_TIMEOUT):
+    """Значение из кэша или результат compute(), пересчитанный одним
+    процессом. compute() может вернуть None - тогда ничего не кэшируется.
+
+    fallback_key хранит последнюю копию под ключом без версии: если
+    основной ключ сменился (новая версия), пока один процесс строит
+    новое значение, остальные получают эту копию. Если копии нет, запрос
+    ждет чужой пересчет не дольше wait_timeout секунд, а потом считает
+    значение сам.
+    """
+    if stale_timeout is None:
+        stale_timeout = timeout
+    lock_key = f'{key}:lock'
+
+    def recompute():
+        try:
+            return _compute_and_store(
+                cache, key, compute, timeout, stale_timeout, fallback_key)
+        finally:
+            cache.delete(lock_key)
+
+    record = cache.get(key)
+    if record is not None:
+        value, expires_at, delta = record
+        if _is_fresh(expires_at, delta, beta):
+            return value
+        if cache.add(lock_key, 1, lock_timeout):
+            return recompute()
+        return value
+
+    if cache.add(lock_key, 1, lock_timeout):
+        return recompute()
+    record = _wait_for(cache, key, fallback_key, wait_timeout)
+    if record is not None:
+        return record[0]
+    return _compute_and_store(
+        cache, key, compute, timeout, stale_timeout, fallback_key)
+
+
+def _wait_for(cache, key, fallback_key, wait_timeout):
+    """Запись, которую строит другой процесс, или ее прошлая копия."""
+    if fallback_key is not None:
+        stale = cache.get(fallback_key)
+        if stale is not None:
+            return stale
+    deadline = time.time() + wait_timeout
+    while time.time() < deadline:
+        time.sleep(WAIT_STEP)
+        record = cache.get(key)
+        if record is not None:
+            return record
+    return None
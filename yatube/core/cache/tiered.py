@@ -0,0 +1,112 @@
+"""Двухуровневый кэш: маленький кэш процесса перед общим кэшем."""
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+_MISSING = object()
+
+
+class TieredCache(BaseCache):
+    """Кэш процесса (L1) ограниченного размера и с коротким TTL перед
+    общим кэшем (L2) из CACHES[OPTIONS['SHARED']].
+
+    Запись идет в оба уровня, чтение сначала из L1. Другие процессы
+    видят изменения в L2 сразу, а свои копии в L1 - не позже L1_TIMEOUT.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.local = LocMemCache(f'tiered-l1-{location}', {
+            'TIMEOUT': self.l1_timeout,
+            'OPTIONS': {
+                'MAX_ENTRIES': options.get('L1_MAX_ENTRIES', 1000),
+                'CULL_FREQUENCY': options.get('L1_CULL_FREQUENCY', 3),
+            },
+        })
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added:
+            self.local.set(key, value, self._local_timeout(timeout), version)
+        return added
+
+    def get(self, key, default=None, version=None):
+        value = self.local.get(key, _MISSING, version)
+        if value is not _MISSING:
+            return value
+        value = self.shared.get(key, _MISSING, version)
+        if value is _MISSING:
+            return default
+        self.local.set(key, value, version=version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        self.local.set(key, value, self._local_timeout(timeout), version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.local.delete(key, version)
+        return self.shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.local.delete(key, version)
+        self.shared.delete(key, version)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key, _MISSING, version)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            fetched = self.shared.get_many(missing, version)
+            self.local.set_many(fetched, version=version)
+            found.update(fetched)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version)
+        self.local.set_many(data, self._local_timeout(timeout), version)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.local.delete_many(keys, version)
+        self.shared.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        return (
+            self.local.has_key(key, version)
+            or self.shared.has_key(key, version)
+        )
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version)
+        self.local.set(key, value, version=version)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version)
+
+    def clear(self):
+        """Очищает общий кэш и L1 этого процесса."""
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
@@ -0,0 +1,138 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+CLAIM_BATCH: int = 10
+
+_handlers = {}
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def workers():
+    return getattr(settings, 'JOBS_WORKERS', 2)
+
+
+def max_attempts():
+    return getattr(settings, 'JOBS_MAX_ATTEMPTS', 3)
+
+
+def retry_delay():
+    return getattr(settings, 'JOBS_RETRY_DELAY', 60)
+
+
+def lock_timeout():
+    return getattr(settings, 'JOBS_LOCK_TIMEOUT', 60 * 10)
+
+
+def handler(kind):
+    """Регистрирует обработчик задач типа kind: func(object_id)."""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, object_id):
+    """Ставит задачу в очередь БД; воркеры будятся после коммита.
+
+    Запись создается в той же транзакции, что и изменения объекта, поэтому
+    задача не теряется при падении процесса и подбирается run_jobs. Вторую
+    ожидающую задачу для того же объекта не дает создать ограничение
+    job_unique_pending: get_or_create тогда вернет уже созданную.
+    """
+    job, _ = Job.objects.get_or_create(
+        kind=kind, object_id=object_id, status=Job.PENDING)
+    transaction.on_commit(wake)
+    return job
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers(), thread_name_prefix='jobs')
+        return _executor
+
+
+def _work():
+    try:
+        run_pending()
+    except Exception:
+        logger.exception('Сбой воркера фоновых задач')
+    finally:
+        connections.close_all()
+
+
+def wake():
+    """Запускает разбор очереди в пуле потоков процесса."""
+    if workers() > 0:
+        _get_executor().submit(_work)
+
+
+def claim():
+    """Атомарно забирает готовую задачу или зависшую у упавшего воркера.
+
+    Задачу получает тот, чей UPDATE с тем же условием затронул строку.
+    """
+    now = timezone.now()
+    ready = (
+        Q(status=Job.PENDING, run_after__lte=now)
+        | Q(status=Job.RUNNING,
+            locked_at__lt=now - timedelta(seconds=lock_timeout()))
+    )
+    candidates = Job.objects.filter(ready).values_list('pk', flat=True)
+    for pk in candidates[:CLAIM_BATCH]:
+        claimed = Job.objects.filter(ready, pk=pk).update(
+            status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1)
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job):
+    """Выполняет задачу: успешная удаляется, упавшая откладывается."""
+    try:
+        _handlers[job.kind](job.object_id)
+    except Exception as error:
+        logger.exception('Задача %s завершилась с ошибкой', job)
+        failed = job.attempts >= max_attempts()
+        try:
+            with transaction.atomic():
+                Job.objects.filter(pk=job.pk).update(
+                    status=Job.FAILED if failed else Job.PENDING,
+                    error=repr(error),
+                    locked_at=None,
+                    run_after=timezone.now() + timedelta(
+                        seconds=retry_delay() * job.attempts),
+                )
+        except IntegrityError:
+            # Пока задача выполнялась, объект снова поставили в очередь:
+            # повтор сделает новая задача.
+            job.delete()
+        return False
+    job.delete()
+    return True
+
+
+def run_pending(limit=None):
+    """Выполняет готовые задачи, пока очередь не опустеет."""
+    done = 0
+    while limit is None or done < limit:
+        job = claim()
+        if job is None:
+            break
+        run(job)
+        done += 1
+    return done
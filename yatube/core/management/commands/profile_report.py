@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiler
+
+
+class Command(BaseCommand):
+    help = ('Сводит стеки медленных запросов в список самых горячих '
+            'функций.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', default=settings.SLOW_REQUEST_PROFILE_DIR,
+            help='Каталог с файлами .folded.'
+        )
+        parser.add_argument(
+            '--view', action='append', default=[],
+            help='Имя URL, например posts:profile; можно повторять.'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Сколько функций показать.'
+        )
+        parser.add_argument(
+            '--sort', choices=('self', 'total'), default='self',
+            help='self - время в самой функции, total - вместе с вызовами.'
+        )
+
+    def handle(self, *args, **options):
+        directory = options['dir']
+        try:
+            paths = profiler.profile_paths(directory, options['view'])
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать {directory}: {error}')
+        if not paths:
+            raise CommandError(f'В {directory} нет профилей.')
+        stacks = (
+            pair for path in paths for pair in profiler.read(path))
+        total, functions = profiler.hot_functions(stacks)
+        if not total:
+            raise CommandError(f'Профили в {directory} пусты.')
+        column = 0 if options['sort'] == 'self' else 1
+        top = sorted(
+            functions.items(), key=lambda item: (-item[1][column], item[0])
+        )[:options['limit']]
+        self.stdout.write(
+            f'Файлов: {len(paths)}, сэмплов: {total}\n'
+            f'{"self %":>7} {"total %":>7} {"self":>7}  функция'
+        )
+        for name, (own, inclusive) in top:
+            self.stdout.write(
+                f'{own / total * 100:7.1f} {inclusive / total * 100:7.1f} '
+                f'{own:7d}  {name}'
+            )
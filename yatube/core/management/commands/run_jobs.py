@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в БД.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а опрашивать очередь до Ctrl+C.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между опросами пустой очереди, сек.'
+        )
+
+    def handle(self, *args, **options):
+        done = jobs.run_pending()
+        try:
+            while options['loop']:
+                batch = jobs.run_pending()
+                done += batch
+                if not batch:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}'))
@@ -0,0 +1,239 @@
+"""Замеры запроса: SQL-запросы, рендер шаблонов, кэш и миниатюры.
+
+collect() открывает сборщик RequestStats для текущего потока. SQL-запросы
+считает обертка connection.execute_wrapper, остальное - перехватчики,
+которые install() ставит один раз на процесс: Template.render и
+get/get_many класса кэша default. Без открытого сборщика перехватчики
+только проверяют thread-local, поэтому в работе их цена незаметна.
+"""
+import contextlib
+import functools
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import caches
+from django.db import connection
+from django.template.base import Template
+
+from . import prometheus
+
+CACHE_REQUESTS = prometheus.counter(
+    'yatube_cache_requests',
+    'Чтения из кэша default по результату.', ['result'])
+
+_local = threading.local()
+_original_render = Template.render
+_MISSING = object()
+
+
+class QueryStats:
+    """Обертка для execute_wrapper: число запросов и суммарное время."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class RequestStats:
+    """Замеры одного запроса или блока кода в текущем потоке."""
+
+    def __init__(self):
+        self.queries = QueryStats()
+        self.render_seconds = 0.0
+        self.render_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.timers = defaultdict(float)
+        self.seconds = 0.0
+
+    def absorb(self, other):
+        """Добавляет замеры вложенного сборщика; SQL уже посчитан."""
+        self.render_seconds += other.render_seconds
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+        for name, seconds in other.timers.items():
+            self.timers[name] += seconds
+
+    def as_dict(self):
+        data = {
+            'total_ms': round(self.seconds * 1000, 2),
+            'db_ms': round(self.queries.seconds * 1000, 2),
+            'db_queries': self.queries.count,
+            'render_ms': round(self.render_seconds * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+        for name, seconds in sorted(self.timers.items()):
+            data[f'{name}_ms'] = round(seconds * 1000, 2)
+        return data
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing."""
+        entries = [
+            f'db;dur={self.queries.seconds * 1000:.2f}'
+            f';desc="{self.queries.count} queries"',
+            f'tpl;dur={self.render_seconds * 1000:.2f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+        ]
+        entries.extend(
+            f'{name};dur={seconds * 1000:.2f}'
+            for name, seconds in sorted(self.timers.items())
+        )
+        entries.append(f'total;dur={self.seconds * 1000:.2f}')
+        return ', '.join(entries)
+
+
+def current():
+    """Открытый сборщик текущего потока или None."""
+    return getattr(_local, 'stats', None)
+
+
+def _timed_render(template, context):
+    stats = current()
+    if stats is None:
+        return _original_render(template, context)
+    # Вложенные шаблоны (include, extends) входят во время внешнего.
+    stats.render_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(template, context)
+    finally:
+        stats.render_depth -= 1
+        if not stats.render_depth:
+            stats.render_seconds += time.perf_counter() - started
+
+
+def _count_cache(hits, misses):
+    stats = current()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+    if hits:
+        CACHE_REQUESTS.inc(hits, result='hit')
+    if misses:
+        CACHE_REQUESTS.inc(misses, result='miss')
+
+
+@contextlib.contextmanager
+def _cache_call():
+    """True для внешнего вызова кэша: get_many базового класса сам
+    вызывает get, такие чтения не считаются дважды."""
+    if getattr(_local, 'in_cache', False):
+        yield False
+        return
+    _local.in_cache = True
+    try:
+        yield True
+    finally:
+        _local.in_cache = False
+
+
+def _counting_get(original):
+    @functools.wraps(original)
+    def get(self, key, default=None, version=None):
+        with _cache_call() as outer:
+            value = original(self, key, _MISSING, version)
+        if value is _MISSING:
+            if outer:
+                _count_cache(0, 1)
+            return default
+        if outer:
+            _count_cache(1, 0)
+        return value
+    return get
+
+
+def _counting_get_many(original):
+    @functools.wraps(original)
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with _cache_call() as outer:
+            found = original(self, keys, version)
+        if outer:
+            _count_cache(len(found), len(keys) - len(found))
+        return found
+    return get_many
+
+
+def install():
+    """Ставит перехватчики рендера и кэша; повторный вызов ничего не
+    делает."""
+    Template.render = _timed_render
+    backend = type(caches['default'])
+    if not backend.__dict__.get('_counted_by_metrics'):
+        backend.get = _counting_get(backend.get)
+        backend.get_many = _counting_get_many(backend.get_many)
+        backend._counted_by_metrics = True
+
+
+@contextlib.contextmanager
+def collect():
+    """Собирает замеры блока: with collect() as stats: ..."""
+    install()
+    stats = RequestStats()
+    outer = current()
+    _local.stats = stats
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(stats.queries):
+            yield stats
+    finally:
+        stats.seconds = time.perf_counter() - started
+        _local.stats = outer
+        if outer is not None:
+            outer.absorb(stats)
+
+
+@contextlib.contextmanager
+def timer(name, histogram=None, **labels):
+    """Время блока: в сборщик потока под именем name и в гистограмму."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        stats = current()
+        if stats is not None:
+            stats.timers[name] += seconds
+        if histogram is not None:
+            histogram.observe(seconds, **labels)
+
+
+class Measurement:
+    """Итог замера в миллисекундах."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.render_ms = 0.0
+        self.total_ms = 0.0
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'sql_ms': round(self.sql_ms, 2),
+            'render_ms': round(self.render_ms, 2),
+            'total_ms': round(self.total_ms, 2),
+        }
+
+
+@contextlib.contextmanager
+def measure():
+    """Замеряет блок: with measure() as result: client.get(url)."""
+    result = Measurement()
+    with collect() as stats:
+        yield result
+    result.total_ms = stats.seconds * 1000
+    result.queries = stats.queries.count
+    result.sql_ms = stats.queries.seconds * 1000
+    result.render_ms = stats.render_seconds * 1000
@@ -0,0 +1,132 @@
+import json
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics, profiler, prometheus, sqllog
+
+logger = logging.getLogger('yatube.requests')
+profiler_logger = logging.getLogger('yatube.profiler')
+
+REQUEST_SECONDS = prometheus.histogram(
+    'yatube_request_duration_seconds',
+    'Время обработки запроса.', ['view', 'method', 'status'])
+DB_SECONDS = prometheus.histogram(
+    'yatube_request_db_seconds', 'Время SQL-запросов за запрос.', ['view'])
+DB_QUERIES = prometheus.histogram(
+    'yatube_request_db_queries', 'Число SQL-запросов за запрос.', ['view'],
+    buckets=prometheus.COUNT_BUCKETS)
+RENDER_SECONDS = prometheus.histogram(
+    'yatube_request_render_seconds', 'Время рендера шаблонов за запрос.',
+    ['view'])
+
+
+def view_name(request):
+    """Имя URL как метка: число значений не зависит от адресов."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name
+
+
+def shows_server_timing(request):
+    """Server-Timing раскрывает число SQL-запросов и время частей страницы,
+    поэтому по умолчанию он только для сотрудников."""
+    if settings.SERVER_TIMING_PUBLIC:
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+class RequestMetricsMiddleware:
+    """Замеры каждого запроса: строка JSON в лог yatube.requests,
+    гистограммы для /metrics и заголовок Server-Timing (см.
+    shows_server_timing).
+
+    Отключается настройкой REQUEST_METRICS = False.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        metrics.install()
+
+    def __call__(self, request):
+        with metrics.collect() as stats:
+            response = self.get_response(request)
+        view = view_name(request)
+        if shows_server_timing(request):
+            response['Server-Timing'] = stats.server_timing()
+        REQUEST_SECONDS.observe(
+            stats.seconds, view=view, method=request.method,
+            status=f'{response.status_code // 100}xx')
+        DB_SECONDS.observe(stats.queries.seconds, view=view)
+        DB_QUERIES.observe(stats.queries.count, view=view)
+        RENDER_SECONDS.observe(stats.render_seconds, view=view)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'status': response.status_code,
+                **stats.as_dict(),
+            }, ensure_ascii=False))
+        return response
+
+
+class SlowRequestProfilerMiddleware:
+    """Стеки запросов дольше SLOW_REQUEST_THRESHOLD секунд в файлы
+    <имя URL>.folded каталога SLOW_REQUEST_PROFILE_DIR.
+
+    Включается настройкой SLOW_REQUEST_PROFILER; сэмплер на сигналах
+    работает только в Unix и ставится из главного потока.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SLOW_REQUEST_PROFILER:
+            raise MiddlewareNotUsed
+        if not profiler.supported():
+            raise MiddlewareNotUsed('setitimer недоступен')
+        try:
+            self.sampler = profiler.get_sampler(
+                settings.SLOW_REQUEST_PROFILE_INTERVAL)
+        except ValueError:
+            raise MiddlewareNotUsed('сигнал ставится только в главном потоке')
+        self.get_response = get_response
+
+    def __call__(self, request):
+        samples = self.sampler.start(stop=type(self).__call__.__code__)
+        try:
+            response = self.get_response(request)
+        finally:
+            seconds = self.sampler.stop(samples)
+        if seconds >= settings.SLOW_REQUEST_THRESHOLD and samples.stacks:
+            path = profiler.write(
+                settings.SLOW_REQUEST_PROFILE_DIR, view_name(request),
+                samples.stacks)
+            profiler_logger.warning(
+                'Медленный запрос %s %s: %.2f с, сэмплов %d, стеки в %s',
+                request.method, request.path, seconds,
+                sum(samples.stacks.values()), path)
+        return response
+
+
+class SqlLogMiddleware:
+    """Подписывает запросы журнала SQL именем URL страницы."""
+
+    def __init__(self, get_response):
+        if not settings.SQL_LOG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sqllog.set_view(view_name(request))
+        try:
+            return self.get_response(request)
+        finally:
+            sqllog.set_view(None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        sqllog.set_view(view_name(request))
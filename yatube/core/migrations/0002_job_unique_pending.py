@@ -0,0 +1,26 @@
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_pending(apps, schema_editor):
+    """Оставляет по одной ожидающей задаче на тип и объект."""
+    Job = apps.get_model('core', 'Job')
+    pending = Job.objects.filter(status='pending')
+    keep = pending.order_by().values('kind', 'object_id').annotate(
+        first_id=Min('id')).values_list('first_id', flat=True)
+    pending.exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_pending, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(status='pending'), fields=('kind', 'object_id'), name='job_unique_pending'),
+        ),
+    ]
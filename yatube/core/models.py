@@ -0,0 +1,43 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фоновая задача: обработчик kind для объекта object_id."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    kind = models.CharField('Тип задачи', max_length=100)
+    object_id = models.PositiveIntegerField('Объект')
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+    run_after = models.DateTimeField('Не раньше', default=timezone.now)
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ['run_after']
+        indexes = [
+            models.Index(
+                fields=['status', 'run_after'], name='job_status_run_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'],
+                condition=models.Q(status='pending'),
+                name='job_unique_pending',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id} ({self.status})'
@@ -0,0 +1,157 @@
+"""Сэмплирующий профилировщик медленных запросов.
+
+Пока идут запросы, таймер ITIMER_REAL каждые interval секунд шлет SIGALRM.
+Обработчик сигнала (он всегда выполняется в главном потоке) снимает стеки
+потоков всех текущих запросов через sys._current_frames() и считает
+одинаковые стеки. Если запрос оказался медленнее порога, его стеки
+дописываются в файл <имя URL>.folded в свернутом формате flamegraph.pl
+и speedscope: «кадр;кадр;кадр число». Остальные замеры выбрасываются.
+
+Обработчик не берет блокировок: сигнал может прийти, пока главный поток
+сам держит блокировку профилировщика.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+SUFFIX: str = '.folded'
+
+
+def frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    # co_qualname (с именем класса) есть только с Python 3.11.
+    return f'{module}:{getattr(code, "co_qualname", code.co_name)}'
+
+
+def collapse(frame, stop=None):
+    """Стек от корня к листу; кадры выше кода stop отбрасываются."""
+    names = []
+    while frame is not None:
+        if frame.f_code is stop:
+            break
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Samples:
+    """Стеки одного запроса."""
+
+    def __init__(self, thread_id, stop=None):
+        self.thread_id = thread_id
+        self.stop = stop
+        self.started = time.perf_counter()
+        self.stacks = Counter()
+
+
+class Sampler:
+    """Таймер работает, только пока есть хотя бы один отслеживаемый
+    запрос; signal.signal можно вызвать лишь из главного потока."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.active = {}
+        self.lock = threading.Lock()
+        signal.signal(signal.SIGALRM, self.sample)
+
+    def sample(self, signum, frame):
+        frames = sys._current_frames()
+        main = threading.get_ident()
+        for samples in list(self.active.values()):
+            # Стек главного потока в frames - это сам обработчик.
+            current = frame
+            if samples.thread_id != main:
+                current = frames.get(samples.thread_id)
+            if current is not None:
+                stack = collapse(current, samples.stop)
+                if stack:
+                    samples.stacks[stack] += 1
+
+    def start(self, stop=None):
+        samples = Samples(threading.get_ident(), stop)
+        with self.lock:
+            self.active[id(samples)] = samples
+            if len(self.active) == 1:
+                signal.setitimer(
+                    signal.ITIMER_REAL, self.interval, self.interval)
+        return samples
+
+    def stop(self, samples):
+        with self.lock:
+            self.active.pop(id(samples), None)
+            if not self.active:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        return time.perf_counter() - samples.started
+
+
+_sampler = None
+
+
+def supported():
+    return hasattr(signal, 'setitimer')
+
+
+def get_sampler(interval):
+    """Один сэмплер на процесс: обработчик сигнала у процесса один."""
+    global _sampler
+    if _sampler is None:
+        _sampler = Sampler(interval)
+    _sampler.interval = interval
+    return _sampler
+
+
+def safe_name(name):
+    return ''.join(
+        char if char.isalnum() or char in '-_.' else '_' for char in name)
+
+
+def write(directory, name, stacks):
+    """Дописывает стеки в <directory>/<name>.folded одним вызовом write,
+    чтобы строки разных процессов не перемешивались."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, safe_name(name) + SUFFIX)
+    data = ''.join(f'{stack} {count}\n' for stack, count in stacks.items())
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write(data)
+    return path
+
+
+def read(path):
+    """Пары (стек, число) из свернутого файла."""
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack and count.isdigit():
+                yield stack, int(count)
+
+
+def profile_paths(directory, names=None):
+    """Файлы каталога; names - имена URL без суффикса."""
+    names = {safe_name(name) for name in names or ()}
+    paths = []
+    for filename in sorted(os.listdir(directory)):
+        name, suffix = os.path.splitext(filename)
+        if suffix == SUFFIX and (not names or name in names):
+            paths.append(os.path.join(directory, filename))
+    return paths
+
+
+def hot_functions(stacks):
+    """Сэмплы по функциям: собственные (функция в листе стека) и общие
+    (функция где-либо в стеке, рекурсия считается один раз).
+
+    Возвращает общее число сэмплов и {функция: [собственные, общие]}.
+    """
+    total = 0
+    functions = {}
+    for stack, count in stacks:
+        total += count
+        frames = stack.split(';')
+        for name in set(frames):
+            functions.setdefault(name, [0, 0])[1] += count
+        functions[frames[-1]][0] += count
+    return total, functions
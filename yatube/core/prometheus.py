@@ -0,0 +1,163 @@
+"""Счетчики и гистограммы процесса в текстовом формате Prometheus.
+
+Метрики живут в памяти процесса и обновляются под блокировкой. При
+нескольких процессах (gunicorn) каждый отдает свои значения, а сводит их
+Prometheus по метке instance.
+"""
+import bisect
+import threading
+
+CONTENT_TYPE: str = 'text/plain; version=0.0.4; charset=utf-8'
+# Секунды: от быстрых ответов из кэша до тяжелых страниц.
+TIME_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+registry = {}
+_registry_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace(
+        '\n', r'\n').replace('"', r'\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    kind = ''
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f'{self.name}: ожидались метки {self.labelnames}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+    def samples(self):
+        """Строки (суффикс, метки, значение) для выдачи."""
+        raise NotImplementedError
+
+    def exposition(self):
+        lines = [
+            f'# HELP {self.name} {_escape(self.documentation)}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        for suffix, pairs, value in self.samples():
+            lines.append(
+                f'{self.name}{suffix}{_labels(pairs)} {_number(value)}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(self.key(labels), 0)
+
+    def samples(self):
+        with self.lock:
+            values = sorted(self.values.items())
+        for key, value in values:
+            yield '_total', list(zip(self.labelnames, key)), value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=TIME_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                # Счетчики по корзинам (последняя - +Inf), сумма, число.
+                state = self.values[key] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        state = self.values.get(self.key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        with self.lock:
+            values = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self.values.items()
+            )
+        bounds = self.buckets + (float('inf'),)
+        for key, (counts, total, count) in values:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket in zip(bounds, counts):
+                cumulative += bucket
+                yield '_bucket', pairs + [('le', _number(float(bound)))], (
+                    cumulative)
+            yield '_sum', pairs, total
+            yield '_count', pairs, count
+
+
+def _register(metric):
+    with _registry_lock:
+        existing = registry.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f'Метрика {metric.name} уже объявлена')
+            return existing
+        registry[metric.name] = metric
+        return metric
+
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=TIME_BUCKETS):
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def exposition():
+    """Все метрики процесса одним текстом."""
+    with _registry_lock:
+        metrics = [registry[name] for name in sorted(registry)]
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.exposition())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,206 @@
+"""Журнал SQL-запросов по отпечаткам.
+
+Обертка record() ставится на каждое соединение с БД (см. CoreConfig) и
+сводит запросы к отпечатку: литералы и параметры заменяются на ?, списки
+IN и многострочные VALUES сворачиваются. По отпечатку и по странице
+(имя URL, см. SqlLogMiddleware) копятся число, суммарное и наибольшее
+время. Запросы дольше SQL_SLOW_THRESHOLD секунд пишутся в лог yatube.sql
+вместе с планом EXPLAIN; план запоминается у отпечатка для отчета в
+админке (/admin/sql/).
+
+Сводка живет в памяти процесса, как и метрики core.prometheus.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DatabaseError
+
+logger = logging.getLogger('yatube.sql')
+
+BACKGROUND: str = '-'
+OTHER: str = '<прочие>'
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'\bIN \(\?(?:, \?)*\)', re.IGNORECASE)
+_ROWS = re.compile(r'(\(\?(?:, \?)*\))(?:, \(\?(?:, \?)*\))+')
+_SPACES = re.compile(r'\s+')
+
+_local = threading.local()
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """Текст запроса без конкретных значений."""
+    text = _SPACES.sub(' ', sql).strip()
+    text = _STRING.sub('?', text)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _IN_LIST.sub('IN (...)', text)
+    return _ROWS.sub(r'\1, ...', text)
+
+
+def digest(text):
+    return hashlib.md5(text.encode()).hexdigest()[:12]
+
+
+class Timing:
+    """Число, суммарное и наибольшее время в секундах."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class Entry(Timing):
+    def __init__(self, sql):
+        super().__init__()
+        self.sql = sql
+        self.digest = digest(sql)
+        self.views = {}
+        self.slow = 0
+        self.plan = None
+
+    def add(self, seconds, view):
+        super().add(seconds)
+        timing = self.views.get(view)
+        if timing is None:
+            timing = self.views[view] = Timing()
+        timing.add(seconds)
+
+
+class SqlLog:
+    """Сводка по отпечаткам; число отпечатков ограничено SQL_LOG_MAX_ENTRIES,
+    сверх него запросы копятся в общей записи OTHER."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.started = time.time()
+
+    def add(self, sql, seconds, view):
+        text = fingerprint(sql)
+        with self.lock:
+            entry = self.entries.get(text)
+            if entry is None:
+                if len(self.entries) >= settings.SQL_LOG_MAX_ENTRIES:
+                    text = OTHER
+                    entry = self.entries.get(text)
+                if entry is None:
+                    entry = self.entries[text] = Entry(text)
+            entry.add(seconds, view)
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+            self.started = time.time()
+
+    def snapshot(self, view=None):
+        """Записи, отсортированные по суммарному времени; view - только
+        запросы этой страницы (число и время берутся по ней)."""
+        with self.lock:
+            entries = list(self.entries.values())
+        rows = []
+        for entry in entries:
+            timing = entry if view is None else entry.views.get(view)
+            if timing is None:
+                continue
+            rows.append((entry, timing))
+        rows.sort(key=lambda row: row[1].total, reverse=True)
+        return rows
+
+    def views(self):
+        """Сводка по страницам: {имя URL: Timing}."""
+        summary = {}
+        with self.lock:
+            for entry in self.entries.values():
+                for view, timing in list(entry.views.items()):
+                    total = summary.setdefault(view, Timing())
+                    total.count += timing.count
+                    total.total += timing.total
+                    total.max = max(total.max, timing.max)
+        return summary
+
+
+log = SqlLog()
+
+
+def current_view():
+    return getattr(_local, 'view', None) or BACKGROUND
+
+
+def set_view(name):
+    _local.view = name
+
+
+def explain(connection, sql, params):
+    """План запроса; EXPLAIN идет мимо журнала."""
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return '\n'.join(
+                ' '.join(str(value) for value in row)
+                for row in cursor.fetchall()
+            )
+    except DatabaseError as error:
+        return f'EXPLAIN не выполнен: {error}'
+    finally:
+        _local.explaining = False
+
+
+def record(execute, sql, params, many, context):
+    """Обертка для connection.execute_wrappers."""
+    if getattr(_local, 'explaining', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    done = False
+    try:
+        result = execute(sql, params, many, context)
+        done = True
+        return result
+    finally:
+        seconds = time.perf_counter() - started
+        view = current_view()
+        entry = log.add(sql, seconds, view)
+        if seconds >= settings.SQL_SLOW_THRESHOLD:
+            entry.slow += 1
+            # План только для удачного SELECT: после ошибки транзакция
+            # может быть сломана.
+            plan = None
+            if done and not many and sql.lstrip()[:6].upper() == 'SELECT':
+                plan = entry.plan = explain(
+                    context['connection'], sql, params)
+            logger.warning(
+                'Медленный SQL %.1f мс [%s] %s: %s\nПлан:\n%s',
+                seconds * 1000, entry.digest, view, sql, plan or 'нет')
+
+
+def install(sender, connection, **kwargs):
+    """Приемник connection_created: ставит record() на соединение.
+
+    Соединение может открыться внутри блока connection.execute_wrapper(),
+    который на выходе снимает последнюю обертку списка, поэтому record()
+    встает в начало.
+    """
+    if record not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record)
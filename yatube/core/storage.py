@@ -0,0 +1,70 @@
+"""Хранилище файлов с адресацией по содержимому."""
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+DIGEST_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+def is_digest_name(name):
+    """Имя файла выдано ContentAddressedStorage."""
+    return bool(name and DIGEST_NAME.search(name))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, где каждый файл лежит один раз под своим sha256.
+
+    Имя получается из каталога upload_to, хэша и расширения, например
+    posts/3f/3f9a...e1.jpg. Повторная загрузка того же содержимого не
+    пишет файл заново и возвращает то же имя. Запись идет во временный
+    файл и атомарно переносится на место, поэтому параллельные загрузки
+    одной картинки не мешают друг другу.
+    """
+
+    def digest(self, content):
+        sha = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            sha.update(chunk)
+        content.seek(0)
+        return sha.hexdigest()
+
+    def digest_name(self, name, content):
+        digest = self.digest(content)
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(
+            posixpath.dirname(name), digest[:2], digest + extension)
+
+    def get_available_name(self, name, max_length=None):
+        # Имя все равно заменяется хэшем в _save
+        return name
+
+    def _save(self, name, content):
+        name = self.digest_name(name, content)
+        if self.exists(name):
+            return name
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    temp.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+
+post_images = ContentAddressedStorage()
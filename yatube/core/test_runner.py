@@ -0,0 +1,20 @@
+"""Окружение тестов: без потоков фоновых задач и без лога каждого запроса.
+
+manage.py test ставит его через TEST_RUNNER, pytest - фикстурой из
+tests/conftest.py.
+"""
+import logging
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+def setup_test_environment():
+    settings.JOBS_WORKERS = 0
+    logging.getLogger('yatube.requests').setLevel(logging.WARNING)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        setup_test_environment()
@@ -0,0 +1,146 @@
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from core.cache.fake_redis import FakeRedisServer
+from core.cache.redis import Connection
+
+
+class SharedCacheTestMixin:
+    """Поднимает fake Redis и подключает к нему алиасы shared/default."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeRedisServer().__enter__()
+        cls.settings_override = override_settings(CACHES={
+            'shared': {
+                'BACKEND': 'core.cache.redis.RedisCache',
+                'LOCATION': cls.server.location,
+            },
+            'default': {
+                'BACKEND': 'core.cache.tiered.TieredCache',
+                'OPTIONS': {'SHARED': 'shared', 'L1_MAX_ENTRIES': 10},
+            },
+        })
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        cls.server.__exit__()
+
+    def setUp(self):
+        caches['default'].clear()
+
+
+class RedisCacheTest(SharedCacheTestMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = caches['shared']
+
+    def test_set_get_delete(self):
+        """Значения любых типов сохраняются и удаляются."""
+        self.cache.set('dict', {'a': [1, 2]})
+        self.cache.set('number', 42)
+        self.assertEqual(self.cache.get('dict'), {'a': [1, 2]})
+        self.assertEqual(self.cache.get('number'), 42)
+        self.cache.delete('dict')
+        self.assertIsNone(self.cache.get('dict'))
+        self.assertEqual(self.cache.get('dict', 'default'), 'default')
+
+    def test_add_and_incr(self):
+        """add не перезаписывает ключ, incr требует существующий ключ."""
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.assertEqual(self.cache.decr('counter'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_not_integer(self):
+        """incr нечислового значения - ValueError, как у других бэкендов."""
+        self.cache.set('text', 'строка')
+        with self.assertRaises(ValueError):
+            self.cache.incr('text')
+
+    def lose_first_reply(self):
+        """Первый ответ сервера теряется, как при обрыве соединения."""
+        original = Connection.read_reply
+        lost = []
+
+        def read_reply(connection):
+            reply = original(connection)
+            if not lost:
+                lost.append(reply)
+                raise ConnectionError('обрыв')
+            return reply
+        return mock.patch.object(Connection, 'read_reply', read_reply)
+
+    def test_read_retried_after_lost_reply(self):
+        """Чтение после обрыва повторяется на новом соединении."""
+        self.cache.set('key', 'value')
+        with self.lose_first_reply():
+            self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_incr_not_retried_after_lost_reply(self):
+        """Отправленный INCRBY не повторяется: счетчик растет один раз."""
+        self.cache.set('counter', 1)
+        with self.lose_first_reply(), self.assertRaises(ConnectionError):
+            self.cache.incr('counter')
+        self.assertEqual(self.cache.get('counter'), 2)
+
+    def test_many(self):
+        """get_many/set_many/delete_many работают пачками."""
+        self.cache.set_many({'a': 1, 'b': 'два'})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 'два'})
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_timeout(self):
+        """Ключ истекает по таймауту."""
+        self.cache.set('short', 'value', 0.05)
+        self.assertTrue(self.cache.has_key('short'))
+        time.sleep(0.1)
+        self.assertFalse(self.cache.has_key('short'))
+
+
+class TieredCacheTest(SharedCacheTestMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = caches['default']
+
+    def test_write_goes_to_shared_cache(self):
+        """Запись видна в общем кэше, то есть другим процессам."""
+        self.cache.set('key', 'value')
+        self.assertEqual(caches['shared'].get('key'), 'value')
+
+    def test_read_served_from_local_tier(self):
+        """Повторное чтение берется из кэша процесса."""
+        caches['shared'].set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        caches['shared'].delete('key')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_local_tier_bounded(self):
+        """Кэш процесса не растет больше L1_MAX_ENTRIES."""
+        for i in range(50):
+            self.cache.set(f'key{i}', i)
+        self.assertLessEqual(len(self.cache.local._cache), 10)
+        self.assertEqual(self.cache.get('key0'), 0)
+
+    def test_get_many_fills_local_tier(self):
+        """get_many дочитывает промахи из общего кэша."""
+        caches['shared'].set_many({'a': 1, 'b': 2})
+        self.cache.set('c', 3)
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(self.cache.local.get('a'), 1)
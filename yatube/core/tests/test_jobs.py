@@ -0,0 +1,118 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+HANDLED = []
+
+
+@jobs.handler('tests.record')
+def record(object_id):
+    HANDLED.append(object_id)
+
+
+@jobs.handler('tests.fail')
+def fail(object_id):
+    raise ValueError(object_id)
+
+
+@override_settings(JOBS_RETRY_DELAY=0, JOBS_MAX_ATTEMPTS=2)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        HANDLED.clear()
+
+    def test_enqueue_is_idempotent(self):
+        """Повторная постановка той же задачи не плодит записи."""
+        jobs.enqueue('tests.record', 1)
+        jobs.enqueue('tests.record', 1)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_one_pending_job_per_object(self):
+        """Вторую ожидающую задачу для объекта не дает создать БД."""
+        Job.objects.create(kind='tests.record', object_id=1)
+        Job.objects.create(
+            kind='tests.record', object_id=1, status=Job.FAILED)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Job.objects.create(kind='tests.record', object_id=1)
+
+    def test_failed_job_replaced_by_new_one(self):
+        """Если объект поставили заново, пока задача падала, остается
+        только новая задача."""
+        jobs.enqueue('tests.fail', 7)
+        job = jobs.claim()
+        jobs.enqueue('tests.fail', 7)
+        self.assertFalse(jobs.run(job))
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.attempts, 0)
+
+    def test_run_pending_executes_and_deletes(self):
+        """Выполненные задачи удаляются из очереди."""
+        jobs.enqueue('tests.record', 1)
+        jobs.enqueue('tests.record', 2)
+        self.assertEqual(jobs.run_pending(), 2)
+        self.assertEqual(sorted(HANDLED), [1, 2])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_job_retried_then_marked_failed(self):
+        """Упавшая задача повторяется до JOBS_MAX_ATTEMPTS."""
+        jobs.enqueue('tests.fail', 7)
+        self.assertEqual(jobs.run_pending(), 2)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn('ValueError', job.error)
+
+    @override_settings(JOBS_RETRY_DELAY=60)
+    def test_failed_job_postponed(self):
+        """Повтор упавшей задачи откладывается."""
+        jobs.enqueue('tests.fail', 7)
+        self.assertEqual(jobs.run_pending(), 1)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertGreater(job.run_after, timezone.now())
+
+    def test_stale_running_job_reclaimed(self):
+        """Задача упавшего воркера снова берется в работу."""
+        Job.objects.create(
+            kind='tests.record', object_id=3, status=Job.RUNNING,
+            locked_at=timezone.now() - timedelta(days=1)
+        )
+        Job.objects.create(
+            kind='tests.record', object_id=4, status=Job.RUNNING,
+            locked_at=timezone.now()
+        )
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(HANDLED, [3])
+
+    def test_run_jobs_command(self):
+        """Команда run_jobs разбирает очередь."""
+        jobs.enqueue('tests.record', 5)
+        out = StringIO()
+        call_command('run_jobs', stdout=out)
+        self.assertEqual(HANDLED, [5])
+        self.assertIn('Выполнено задач: 1', out.getvalue())
+
+    def test_run_jobs_loop_summary(self):
+        """run_jobs --loop до Ctrl+C считает задачи всех проходов."""
+        jobs.enqueue('tests.record', 5)
+
+        def sleep(seconds):
+            if HANDLED == [5]:
+                jobs.enqueue('tests.record', 6)
+                return
+            raise KeyboardInterrupt
+
+        out = StringIO()
+        with mock.patch(
+                'core.management.commands.run_jobs.time.sleep', sleep):
+            call_command('run_jobs', loop=True, stdout=out)
+        self.assertEqual(HANDLED, [5, 6])
+        self.assertIn('Выполнено задач: 2', out.getvalue())
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase
+
+from core import metrics, prometheus
+from core.metrics import collect, measure
+
+User = get_user_model()
+
+
+class MeasureTest(TestCase):
+    def test_counts_queries(self):
+        with measure() as result:
+            User.objects.count()
+            User.objects.exists()
+        self.assertEqual(result.queries, 2)
+        self.assertGreaterEqual(result.total_ms, result.sql_ms)
+        self.assertEqual(
+            set(result.as_dict()),
+            {'queries', 'sql_ms', 'render_ms', 'total_ms'}
+        )
+
+    def test_nested_templates_counted_once(self):
+        """Время вложенного шаблона входит во время внешнего один раз."""
+        inner = Template('{{ value }}')
+        outer = Template('{% for _ in items %}{% include inner %}{% endfor %}')
+        with collect() as stats:
+            outer.render(Context({'items': range(50), 'inner': inner}))
+        self.assertGreater(stats.render_seconds, 0)
+        self.assertEqual(stats.render_depth, 0)
+        self.assertIsNone(metrics.current())
+
+    def test_nested_collectors(self):
+        """Внешний сборщик получает замеры вложенного."""
+        with collect() as outer:
+            with collect() as inner:
+                Template('{{ value }}').render(Context({'value': 1}))
+                User.objects.count()
+        self.assertEqual(inner.queries.count, 1)
+        self.assertEqual(outer.queries.count, 1)
+        self.assertEqual(outer.render_seconds, inner.render_seconds)
+
+    def test_cache_hits_and_misses(self):
+        cache.set('metrics-test', 0)
+        with collect() as stats:
+            self.assertEqual(cache.get('metrics-test', 'default'), 0)
+            self.assertEqual(cache.get('metrics-missing', 'no'), 'no')
+            cache.get_many(['metrics-test', 'metrics-missing'])
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (2, 2))
+
+    def test_timer(self):
+        histogram = prometheus.Histogram('test_seconds', 'Тест.')
+        with collect() as stats:
+            with metrics.timer('thumb', histogram):
+                pass
+        self.assertIn('thumb', stats.timers)
+        self.assertEqual(histogram.count(), 1)
+        self.assertIn('thumb;dur=', stats.server_timing())
+
+
+class PrometheusTest(TestCase):
+    def test_histogram_exposition(self):
+        histogram = prometheus.Histogram(
+            'test_duration_seconds', 'Время "теста".', ['view'],
+            buckets=(0.1, 1))
+        histogram.observe(0.05, view='index')
+        histogram.observe(0.5, view='index')
+        histogram.observe(5, view='index')
+        lines = histogram.exposition()
+        self.assertEqual(
+            lines[0], '# HELP test_duration_seconds Время \\"теста\\".')
+        self.assertEqual(lines[1], '# TYPE test_duration_seconds histogram')
+        self.assertEqual(lines[2:], [
+            'test_duration_seconds_bucket{view="index",le="0.1"} 1',
+            'test_duration_seconds_bucket{view="index",le="1"} 2',
+            'test_duration_seconds_bucket{view="index",le="+Inf"} 3',
+            'test_duration_seconds_sum{view="index"} 5.55',
+            'test_duration_seconds_count{view="index"} 3',
+        ])
+
+    def test_counter_labels(self):
+        counter = prometheus.Counter('test_events', 'События.', ['kind'])
+        counter.inc(kind='a')
+        counter.inc(2, kind='a')
+        self.assertEqual(counter.value(kind='a'), 3)
+        self.assertEqual(
+            counter.exposition()[-1], 'test_events_total{kind="a"} 3')
+        with self.assertRaises(ValueError):
+            counter.inc(other='a')
+
+    def test_register_returns_existing(self):
+        first = prometheus.counter('test_registered', 'Тест.')
+        self.assertIs(prometheus.counter('test_registered', 'Тест.'), first)
+        with self.assertRaises(ValueError):
+            prometheus.histogram('test_registered', 'Тест.')
@@ -0,0 +1,73 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import REQUEST_SECONDS
+
+User = get_user_model()
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for name in ('db;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            self.assertIn(name, timing)
+
+    def test_server_timing_hidden_from_visitors(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        with override_settings(SERVER_TIMING_PUBLIC=True):
+            response = self.client.get(reverse('posts:index'))
+        self.assertTrue(response.has_header('Server-Timing'))
+
+    def test_log_line(self):
+        with self.assertLogs('yatube.requests', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db_queries'], 0)
+        self.assertGreater(record['cache_misses'], 0)
+
+    def test_histograms(self):
+        labels = {'view': 'posts:index', 'method': 'GET', 'status': '2xx'}
+        before = REQUEST_SECONDS.count(**labels)
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(REQUEST_SECONDS.count(**labels), before + 1)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram', body)
+        self.assertIn('view="posts:index"', body)
+        self.assertIn('yatube_cache_requests_total{result="miss"}', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint_closed_without_token(self):
+        for authorization in ('', 'Bearer wrong'):
+            with self.subTest(authorization=authorization):
+                response = self.client.get(
+                    reverse('metrics'), HTTP_AUTHORIZATION=authorization)
+                self.assertEqual(response.status_code, 404)
+
+    def test_metrics_endpoint_for_staff_and_listed_addresses(self):
+        url = reverse('metrics')
+        with override_settings(METRICS_ALLOWED_IPS=['127.0.0.1']):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
@@ -0,0 +1,108 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import profiler
+
+TEMP_DIR = tempfile.mkdtemp()
+
+
+def slow_exposition():
+    time.sleep(0.05)
+    return ''
+
+
+def caller(stop):
+    return callee(stop)
+
+
+def callee(stop):
+    return profiler.collapse(sys._getframe(), stop)
+
+
+class ProfilerTest(TestCase):
+    def tearDown(self):
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def test_collapse_stops_at_code(self):
+        self.assertEqual(caller(caller.__code__), f'{__name__}:callee')
+        method = 'test_collapse_stops_at_code'
+        if sys.version_info >= (3, 11):
+            method = f'ProfilerTest.{method}'
+        self.assertEqual(caller(None).split(';')[-3:], [
+            f'{__name__}:{method}',
+            f'{__name__}:caller',
+            f'{__name__}:callee',
+        ])
+
+    def test_write_and_read(self):
+        path = profiler.write(TEMP_DIR, 'posts:profile', {'a;b': 3, 'a': 1})
+        self.assertEqual(os.path.basename(path), 'posts_profile.folded')
+        profiler.write(TEMP_DIR, 'posts:profile', {'a;b': 2})
+        self.assertEqual(
+            list(profiler.read(path)), [('a;b', 3), ('a', 1), ('a;b', 2)])
+        self.assertEqual(
+            profiler.profile_paths(TEMP_DIR, ['posts:profile']), [path])
+        self.assertEqual(profiler.profile_paths(TEMP_DIR, ['posts:index']), [])
+
+    def test_hot_functions(self):
+        total, functions = profiler.hot_functions(
+            [('a;b;a', 2), ('a;c', 1), ('a', 1)])
+        self.assertEqual(total, 4)
+        self.assertEqual(functions['a'], [3, 4])
+        self.assertEqual(functions['b'], [0, 2])
+        self.assertEqual(functions['c'], [1, 1])
+
+    @override_settings(
+        SLOW_REQUEST_PROFILER=True, SLOW_REQUEST_THRESHOLD=0.01,
+        SLOW_REQUEST_PROFILE_INTERVAL=0.002,
+        SLOW_REQUEST_PROFILE_DIR=TEMP_DIR, METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_middleware_writes_slow_request(self):
+        with mock.patch(
+                'core.views.prometheus.exposition', slow_exposition), \
+                self.assertLogs('yatube.profiler', 'WARNING'):
+            self.client.get(reverse('metrics'))
+        stacks = list(profiler.read(os.path.join(TEMP_DIR, 'metrics.folded')))
+        self.assertTrue(stacks)
+        # Пара сэмплов может прийтись на код вокруг вью, основная масса -
+        # на sleep внутри slow_exposition.
+        total = sum(count for _, count in stacks)
+        slow = sum(
+            count for stack, count in stacks
+            if stack.split(';')[-1] == f'{__name__}:slow_exposition'
+        )
+        self.assertGreater(slow, total / 2)
+        self.assertNotIn('SlowRequestProfilerMiddleware', stacks[0][0])
+
+    @override_settings(
+        SLOW_REQUEST_PROFILER=True, SLOW_REQUEST_THRESHOLD=10,
+        SLOW_REQUEST_PROFILE_DIR=TEMP_DIR)
+    def test_middleware_skips_fast_request(self):
+        self.client.get(reverse('metrics'))
+        self.assertFalse(os.path.exists(TEMP_DIR))
+
+    def test_report_command(self):
+        profiler.write(TEMP_DIR, 'posts:profile', {'a;b': 3, 'a;c': 1})
+        profiler.write(TEMP_DIR, 'posts:index', {'a;d': 4})
+        out = StringIO()
+        call_command(
+            'profile_report', dir=TEMP_DIR, view=['posts:profile'],
+            limit=2, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'Файлов: 1, сэмплов: 4')
+        self.assertTrue(lines[2].endswith('  b'))
+        self.assertIn('75.0', lines[2])
+        self.assertEqual(len(lines), 4)
+
+    def test_report_without_profiles(self):
+        with self.assertRaises(CommandError):
+            call_command('profile_report', dir=TEMP_DIR, stdout=StringIO())
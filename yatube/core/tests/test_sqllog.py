@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import sqllog
+from posts.models import Post
+
+User = get_user_model()
+
+
+class FingerprintTest(TestCase):
+    def test_values_replaced(self):
+        self.assertEqual(
+            sqllog.fingerprint(
+                "SELECT  \"t\".\"id\"\n FROM \"t\" WHERE \"t\".\"name\" = "
+                "'it''s' AND \"t\".\"v2\" > 10 AND \"t\".\"x\" = %s LIMIT 21"),
+            'SELECT "t"."id" FROM "t" WHERE "t"."name" = ? '
+            'AND "t"."v2" > ? AND "t"."x" = ? LIMIT ?'
+        )
+
+    def test_lists_collapsed(self):
+        self.assertEqual(
+            sqllog.fingerprint('SELECT 1 FROM t WHERE id IN (%s, %s, %s)'),
+            sqllog.fingerprint('SELECT 1 FROM t WHERE id IN (%s)'),
+        )
+        self.assertEqual(
+            sqllog.fingerprint(
+                'INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)'),
+            'INSERT INTO t (a, b) VALUES (?, ?), ...'
+        )
+
+
+class SqlLogTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        sqllog.log.clear()
+
+    def test_wrapper_installed(self):
+        self.assertIn(sqllog.record, connection.execute_wrappers)
+
+    def test_wrapper_kept_when_connection_opened_in_block(self):
+        connection.close()
+        with connection.execute_wrapper(lambda *args: args[0](*args[1:])):
+            Post.objects.count()
+        self.assertEqual(connection.execute_wrappers, [sqllog.record])
+
+    def test_queries_grouped_by_view(self):
+        self.client.get(reverse('posts:index'))
+        views = sqllog.log.views()
+        self.assertIn('posts:index', views)
+        self.assertGreater(views['posts:index'].count, 0)
+        rows = sqllog.log.snapshot('posts:index')
+        self.assertTrue(rows)
+        self.assertTrue(all(
+            timing is entry.views['posts:index'] for entry, timing in rows))
+
+    def test_background_queries(self):
+        Post.objects.count()
+        Post.objects.count()
+        entry, timing = sqllog.log.snapshot(sqllog.BACKGROUND)[0]
+        self.assertEqual(timing.count, 2)
+        self.assertIn('COUNT(*)', entry.sql)
+
+    @override_settings(SQL_SLOW_THRESHOLD=0)
+    def test_slow_query_explained(self):
+        with self.assertLogs('yatube.sql', 'WARNING') as logs:
+            Post.objects.filter(text='кот').count()
+        entry, _ = sqllog.log.snapshot()[0]
+        self.assertEqual(entry.slow, 1)
+        self.assertTrue(entry.plan)
+        self.assertIn(entry.plan, logs.output[0])
+
+    @override_settings(SQL_LOG_MAX_ENTRIES=1)
+    def test_entries_limited(self):
+        Post.objects.count()
+        User.objects.count()
+        entries = [entry.sql for entry, _ in sqllog.log.snapshot()]
+        self.assertEqual(len(entries), 2)
+        self.assertIn(sqllog.OTHER, entries)
+
+
+class SqlReportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        sqllog.log.clear()
+        self.client.force_login(self.admin)
+
+    def test_report(self):
+        Post.objects.count()
+        response = self.client.get(reverse('sql_report'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'COUNT(*)')
+        response = self.client.get(
+            reverse('sql_report'), {'view': sqllog.BACKGROUND})
+        self.assertEqual(response.context['selected'], sqllog.BACKGROUND)
+
+    def test_reset(self):
+        Post.objects.count()
+        response = self.client.post(reverse('sql_report'))
+        self.assertRedirects(response, reverse('sql_report'))
+        self.assertEqual(
+            [entry.sql for entry, _ in sqllog.log.snapshot()
+             if 'COUNT(*)' in entry.sql and 'posts_post' in entry.sql], [])
+
+    def test_staff_only(self):
+        self.client.logout()
+        response = self.client.get(reverse('sql_report'))
+        self.assertEqual(response.status_code, 302)
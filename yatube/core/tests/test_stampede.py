@@ -0,0 +1,82 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core.cache.stampede import get_or_compute
+
+
+class StampedeTest(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f'value {self.calls}'
+
+    def get(self, **kwargs):
+        kwargs.setdefault('beta', 0)
+        return get_or_compute(cache, 'key', self.compute, 60, **kwargs)
+
+    def expire(self):
+        value, expires_at, delta = cache.get('key')
+        cache.set('key', (value, time.time() - 1, delta))
+
+    def test_fresh_value_not_recomputed(self):
+        """Свежее значение берется из кэша."""
+        self.assertEqual(self.get(), 'value 1')
+        self.assertEqual(self.get(), 'value 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_expired_value_recomputed_once(self):
+        """Просроченное значение пересчитывает тот, кто взял блокировку."""
+        self.get()
+        self.expire()
+        self.assertEqual(self.get(), 'value 2')
+        self.assertEqual(self.get(), 'value 2')
+
+    def test_stale_value_served_while_locked(self):
+        """Пока другой процесс пересчитывает, отдается старая копия."""
+        self.get()
+        self.expire()
+        cache.add('key:lock', 1)
+        self.assertEqual(self.get(), 'value 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_fallback_served_for_new_version(self):
+        """Для новой версии ключа отдается последняя копия без версии."""
+        get_or_compute(
+            cache, 'key:v1', self.compute, 60, fallback_key='key:latest')
+        cache.add('key:v2:lock', 1)
+        value = get_or_compute(
+            cache, 'key:v2', self.compute, 60, fallback_key='key:latest')
+        self.assertEqual(value, 'value 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_wait_bounded(self):
+        """Без копии чужой пересчет ждут не дольше wait_timeout."""
+        cache.add('key:lock', 1)
+        with mock.patch('core.cache.stampede.time.sleep') as sleep:
+            self.assertEqual(self.get(wait_timeout=0), 'value 1')
+        sleep.assert_not_called()
+
+    def test_early_recompute_is_probabilistic(self):
+        """XFetch: при большом beta пересчет начинается до срока."""
+        self.get()
+        self.assertEqual(self.get(beta=0), 'value 1')
+        value, expires_at, delta = cache.get('key')
+        cache.set('key', (value, expires_at, 1e6))
+        with mock.patch('core.cache.stampede.random.random', return_value=0):
+            self.assertEqual(self.get(beta=1), 'value 1')
+        with mock.patch(
+                'core.cache.stampede.random.random', return_value=0.5):
+            self.assertEqual(self.get(beta=1), 'value 2')
+
+    def test_none_not_cached(self):
+        """Результат None не кэшируется."""
+        get_or_compute(cache, 'key', lambda: None, 60)
+        self.assertIsNone(cache.get('key'))
+        self.assertIsNone(cache.get('key:lock'))
@@ -1,4 +1,9 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from . import prometheus
 
 
 def page_not_found(request, exception):
@@ -15,3 +20,22 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def _metrics_allowed(request):
+    if request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    if token and constant_time_compare(
+            request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics(request):
+    """Метрики процесса для Prometheus: сотрудникам, по METRICS_TOKEN или
+    с адресов METRICS_ALLOWED_IPS, остальным 404."""
+    if not _metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        prometheus.exposition(), content_type=prometheus.CONTENT_TYPE)
@@ -1,8 +1,25 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 
+from . import counters, fulltext
 from .models import Group, Post
 
 
+class EstimatedCountPaginator(Paginator):
+    """Число постов без фильтров берется из кэша счетчиков, а не COUNT(*).
+
+    С фильтром или поиском считается точно: выборка уже сужена индексом.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            return counters.feed_count()
+        return super().count
+
+
 class PostAdmin(admin.ModelAdmin):
     list_display = (
         'pk',
@@ -11,12 +28,28 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group',
     )
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    autocomplete_fields = ('author', 'group')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по полнотекстовому индексу вместо LIKE по тексту."""
+        if not search_term.strip():
+            return queryset, False
+        return fulltext.filter_posts(queryset, search_term), False
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug')
+    search_fields = ('title', 'slug')
     empty_value_display = '-пусто-'
 
 
 admin.site.register(Post, PostAdmin)
 
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
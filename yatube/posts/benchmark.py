@@ -0,0 +1,370 @@
+"""Нагрузочный прогон страниц постов без внешних инструментов.
+
+Виртуальные пользователи (потоки) в замкнутом цикле выбирают страницу по
+весам MIX и шлют запросы либо прямо в WSGI-обработчик Django в этом же
+процессе (LocalClient, с подсчетом SQL-запросов), либо по HTTP на
+запущенный сервер (HttpClient). Итог - перцентили задержки, пропускная
+способность и число запросов к БД по каждой странице; его можно сохранить
+в JSON и сравнить с прогоном на другом коммите.
+"""
+import http.cookiejar
+import itertools
+import math
+import platform
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Group, Post
+
+User = get_user_model()
+
+# Доли страниц в смеси: чтение лент и постов преобладает над записью.
+MIX = {
+    'index': 30,
+    'group_list': 12,
+    'profile': 12,
+    'post_detail': 25,
+    'follow_index': 10,
+    'post_create': 3,
+    'add_comment': 8,
+}
+# Страница: метод, имя URL и набор целей для аргумента URL.
+ROUTES = {
+    'index': ('get', 'posts:index', None),
+    'group_list': ('get', 'posts:group_list', 'groups'),
+    'profile': ('get', 'posts:profile', 'usernames'),
+    'post_detail': ('get', 'posts:post_detail', 'posts'),
+    'follow_index': ('get', 'posts:follow_index', None),
+    'post_create': ('post', 'posts:post_create', None),
+    'add_comment': ('post', 'posts:add_comment', 'posts'),
+}
+LOGIN_REQUIRED = {'follow_index', 'post_create', 'add_comment'}
+# Доля чтений публичных страниц анонимными посетителями.
+ANONYMOUS_SHARE: float = 0.7
+SAMPLE_SIZE: int = 200
+PERCENTILES = (50, 95, 99)
+TEXT: str = 'Запись нагрузочного теста'
+
+
+def parse_mix(value):
+    """Смесь из строки вида 'index=30,post_detail=25'."""
+    mix = {}
+    for item in filter(None, value.split(',')):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ROUTES:
+            raise ValueError(f'Неизвестная страница: {name}')
+        mix[name] = float(weight)
+    return mix
+
+
+def _sample(queryset, field, rng, size=SAMPLE_SIZE):
+    """Случайные значения поля: поиск по индексу pk, без ORDER BY RANDOM().
+    """
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return []
+    values = queryset.order_by('pk').values_list(field, flat=True)
+    return [
+        values.filter(
+            pk__gte=rng.randint(bounds['low'], bounds['high'])).first()
+        for _ in range(size)
+    ]
+
+
+class Targets:
+    """Посты, группы и авторы, к которым обращаются запросы."""
+
+    def __init__(self, rng, size=SAMPLE_SIZE):
+        self.posts = _sample(Post.objects.all(), 'pk', rng, size)
+        self.groups = _sample(Group.objects.all(), 'slug', rng, size)
+        self.usernames = _sample(User.objects.all(), 'username', rng, size)
+
+    def request(self, name, rng):
+        """Метод, путь и данные формы для запроса к странице."""
+        method, url_name, target = ROUTES[name]
+        args = [rng.choice(getattr(self, target))] if target else []
+        data = {'text': TEXT} if method == 'post' else None
+        return method, reverse(url_name, args=args), data
+
+    def available(self, mix):
+        """Смесь без страниц, для которых в базе нет целей."""
+        return {
+            name: weight for name, weight in mix.items()
+            if weight > 0 and (
+                ROUTES[name][2] is None or getattr(self, ROUTES[name][2]))
+        }
+
+
+class LocalClient:
+    """Запросы в WSGI-обработчик Django в этом же процессе."""
+
+    def __init__(self, user=None):
+        # Адрес не из INTERNAL_IPS: панель отладки не должна попадать
+        # в замеры.
+        self.client = Client(HTTP_HOST='localhost', REMOTE_ADDR='192.0.2.1')
+        if user is not None:
+            self.client.force_login(user)
+
+    def request(self, method, path, data=None):
+        """Код ответа и число SQL-запросов потока за время запроса.
+
+        Тестовый клиент пробрасывает исключения вью; здесь это ответ 500.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            try:
+                status = getattr(self.client, method)(path, data).status_code
+            except Exception:
+                status = 500
+        return status, len(queries)
+
+    def close(self):
+        connection.close()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpClient:
+    """Запросы по HTTP к запущенному серверу; SQL-запросы не считаются."""
+
+    def __init__(self, base_url, user=None, password=None):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+        if user is not None:
+            self.login(user.username, password)
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == settings.CSRF_COOKIE_NAME:
+                return cookie.value
+        return ''
+
+    def request(self, method, path, data=None):
+        url = self.base_url + path
+        body, headers = None, {}
+        if method == 'post':
+            token = self.csrf_token()
+            body = urlencode({**(data or {}), 'csrfmiddlewaretoken': token})
+            body = body.encode()
+            headers = {'X-CSRFToken': token, 'Referer': url}
+        request = urllib.request.Request(
+            url, body, headers, method=method.upper())
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status, None
+        except urllib.error.HTTPError as error:
+            error.read()
+            return error.code, None
+
+    def login(self, username, password):
+        path = reverse('users:login')
+        self.request('get', path)
+        status, _ = self.request(
+            'post', path, {'username': username, 'password': password})
+        if status != 302:
+            raise ValueError(f'Не удалось войти как {username}')
+
+    def close(self):
+        pass
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу; values отсортированы."""
+    if not values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def summarize(samples, elapsed):
+    """Сводка по выборке (страница, код, секунды, SQL-запросы)."""
+    latencies = sorted(seconds * 1000 for _, _, seconds, _ in samples)
+    queries = [count for *_, count in samples if count is not None]
+    summary = {
+        'requests': len(samples),
+        'errors': sum(1 for _, status, *_ in samples if status >= 400),
+        'rps': round(len(samples) / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            f'p{percent}': round(percentile(latencies, percent), 2)
+            for percent in PERCENTILES
+        },
+        'queries': None,
+    }
+    summary['latency_ms']['mean'] = round(sum(latencies) / len(latencies), 2)
+    summary['latency_ms']['max'] = round(latencies[-1], 2)
+    if queries:
+        summary['queries'] = {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        }
+    return summary
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip()
+
+
+class Benchmark:
+    """Прогон: concurrency потоков делят общий счетчик запросов."""
+
+    def __init__(self, requests=1000, concurrency=4, warmup=50, seed=0,
+                 mix=None, users=20, base_url=None, password=None):
+        self.requests = requests
+        self.concurrency = concurrency
+        self.warmup = warmup
+        self.seed = seed
+        self.base_url = base_url
+        self.password = password
+        rng = random.Random(seed)
+        self.targets = Targets(rng)
+        self.mix = self.targets.available(mix or MIX)
+        self.users = list(User.objects.filter(
+            username__in=self.targets.usernames[:users]))
+        if not self.users:
+            self.mix = {
+                name: weight for name, weight in self.mix.items()
+                if name not in LOGIN_REQUIRED
+            }
+        self.samples = []
+        self.errors = []
+        self.lock = threading.Lock()
+
+    def client(self, user=None):
+        if self.base_url:
+            return HttpClient(self.base_url, user, self.password)
+        return LocalClient(user)
+
+    def worker(self, number, counter, marks):
+        try:
+            self.load(number, counter, marks)
+        except Exception as error:
+            self.errors.append(error)
+
+    def load(self, number, counter, marks):
+        rng = random.Random(self.seed + number + 1)
+        anonymous = self.client()
+        user = self.users[number % len(self.users)] if self.users else None
+        logged_in = self.client(user) if user is not None else anonymous
+        names, weights = list(self.mix), list(self.mix.values())
+        try:
+            while True:
+                position = next(counter)
+                if position >= self.warmup + self.requests:
+                    return
+                name = rng.choices(names, weights)[0]
+                client = logged_in
+                if name not in LOGIN_REQUIRED and (
+                        rng.random() < ANONYMOUS_SHARE):
+                    client = anonymous
+                method, path, data = self.targets.request(name, rng)
+                started = time.perf_counter()
+                status, queries = client.request(method, path, data)
+                finished = time.perf_counter()
+                if position < self.warmup:
+                    continue
+                with self.lock:
+                    marks.append((started, finished))
+                    self.samples.append(
+                        (name, status, finished - started, queries))
+        finally:
+            anonymous.close()
+
+    def run(self):
+        """Прогоняет нагрузку и возвращает результат для JSON."""
+        counter = itertools.count()
+        marks = []
+        threads = [
+            threading.Thread(target=self.worker, args=(number, counter, marks))
+            for number in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self.errors:
+            raise self.errors[0]
+        if not self.samples:
+            raise ValueError('Не измерено ни одного запроса.')
+        elapsed = 0
+        if marks:
+            elapsed = max(end for _, end in marks) - min(
+                start for start, _ in marks)
+        views = defaultdict(list)
+        for sample in self.samples:
+            views[sample[0]].append(sample)
+        return {
+            'meta': self.meta(),
+            'total': summarize(self.samples, elapsed),
+            'views': {
+                name: summarize(samples, elapsed)
+                for name, samples in sorted(views.items())
+            },
+        }
+
+    def meta(self):
+        return {
+            'commit': git_commit(),
+            'created': timezone.now().isoformat(),
+            'target': self.base_url or 'in-process',
+            'database': connection.vendor,
+            'debug': settings.DEBUG,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'requests': self.requests,
+            'concurrency': self.concurrency,
+            'warmup': self.warmup,
+            'seed': self.seed,
+            'mix': self.mix,
+        }
+
+
+def compare(old, new):
+    """Строки сравнения p95 и числа SQL-запросов двух прогонов."""
+    lines = []
+    for name in sorted(set(old['views']) | set(new['views'])):
+        before, after = old['views'].get(name), new['views'].get(name)
+        if before is None or after is None:
+            lines.append(f'{name}: нет в одном из прогонов')
+            continue
+        p95_before = before['latency_ms']['p95']
+        p95_after = after['latency_ms']['p95']
+        change = 0
+        if p95_before:
+            change = (p95_after - p95_before) / p95_before * 100
+        line = f'{name}: p95 {p95_before} -> {p95_after} мс ({change:+.0f}%)'
+        if before['queries'] and after['queries']:
+            line += (
+                f', SQL {before["queries"]["mean"]}'
+                f' -> {after["queries"]["mean"]}'
+            )
+        lines.append(line)
+    return lines
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from . import thumbnails, variants, versions
+
+CARD_TEMPLATE: str = 'posts/includes/post_card.html'
+CARD_THUMBNAIL: str = '500x150'
+
+
+def card_timeout():
+    return getattr(settings, 'POST_CARD_TIMEOUT', 60 * 60 * 24)
+
+
+def version_key(scope, pk):
+    return versions.version_key('post_card', f'{scope}:{pk}')
+
+
+def bump_version(scope, pk):
+    """Делает недействительными карточки автора или группы."""
+    versions.bump(version_key(scope, pk))
+
+
+def _versions(posts):
+    keys = set()
+    for post in posts:
+        keys.add(version_key('user', post.author_id))
+        if post.group_id is not None:
+            keys.add(version_key('group', post.group_id))
+    return versions.get_versions(keys)
+
+
+def card_key(post, card_versions, size=CARD_THUMBNAIL):
+    group_version = ''
+    if post.group_id is not None:
+        group_version = card_versions[version_key('group', post.group_id)]
+    return 'post_card:{}:{}:{}:{}:{}'.format(
+        post.pk,
+        size,
+        post.updated.timestamp(),
+        card_versions[version_key('user', post.author_id)],
+        group_version,
+    )
+
+
+def render_cards(posts, size=CARD_THUMBNAIL):
+    """HTML карточек постов с миниатюрой size; готовые берутся из кэша
+    одним get_many."""
+    posts = list(posts)
+    card_versions = _versions(posts)
+    keys = [card_key(post, card_versions, size) for post in posts]
+    cards = cache.get_many(keys)
+    missed = [
+        (post, key) for post, key in zip(posts, keys) if key not in cards]
+    ready = thumbnails.ready_thumbnails(
+        [post.image for post, _ in missed], size)
+    ready_variants = variants.for_posts(
+        [post for post, _ in missed if ready.get(post.image.name)], size)
+    height = variants.parse_geometry(size)[1]
+    rendered = {}
+    for post, key in missed:
+        rendered[key] = render_to_string(CARD_TEMPLATE, {
+            'post': post,
+            'thumbnail': ready.get(post.image.name),
+            'variants': ready_variants.get(post.pk, []),
+            'size': size,
+            'height': height,
+        })
+    if rendered:
+        cache.set_many(rendered, card_timeout())
+        cards.update(rendered)
+    return [cards[key] for key in keys]
@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from . import timeline
+from .models import Post
+
+COUNT_CACHE_TIMEOUT: int = 60 * 60 * 24
+COUNT_KEY_PREFIX: str = 'posts_count'
+
+
+def count_key(scope, pk=None):
+    """Ключ счетчика: общая лента или лента подписок пользователя."""
+    if pk is None:
+        return f'{COUNT_KEY_PREFIX}:{scope}'
+    return f'{COUNT_KEY_PREFIX}:{scope}:{pk}'
+
+
+def estimate_count(model):
+    """Оценка числа строк по статистике СУБД, None если оценки нет."""
+    table = model._meta.db_table
+    queries = {
+        'postgresql': (
+            'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'),
+        'mysql': (
+            'SELECT table_rows FROM information_schema.tables '
+            'WHERE table_schema = DATABASE() AND table_name = %s'),
+    }
+    query = queries.get(connection.vendor)
+    if query is None:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(query, [table])
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def cached_count(key, count, estimate=None):
+    """Число записей из кэша; при промахе - оценка или точный COUNT."""
+    value = cache.get(key)
+    if value is None:
+        if estimate is not None:
+            value = estimate()
+        if value is None:
+            value = count()
+        cache.set(key, value, COUNT_CACHE_TIMEOUT)
+    return value
+
+
+def feed_count():
+    estimate = None
+    if getattr(settings, 'POSTS_COUNT_APPROXIMATE', False):
+        def estimate():
+            return estimate_count(Post)
+    return cached_count(count_key('all'), Post.objects.count, estimate)
+
+
+def follow_count(user):
+    return cached_count(
+        count_key('follow', user.pk), lambda: timeline.feed(user).count())
+
+
+def _incr(keys, delta):
+    for key in keys:
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            pass
+
+
+def change_count(keys, delta):
+    """Сдвигает закэшированные счетчики после коммита; отсутствующие не
+    создаются. При откате транзакции счетчики не трогаются."""
+    keys = list(keys)
+    transaction.on_commit(lambda: _incr(keys, delta))
+
+
+def post_keys(follower_ids=()):
+    """Счетчики лент, в которые попадает пост автора с такими подписчиками."""
+    keys = [count_key('all')]
+    keys.extend(count_key('follow', pk) for pk in follower_ids)
+    return keys
+
+
+def reset_follow_count(user_id):
+    """Сброс после коммита: иначе параллельное чтение закэширует старое
+    число до конца транзакции."""
+    key = count_key('follow', user_id)
+    transaction.on_commit(lambda: cache.delete(key))
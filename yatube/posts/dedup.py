@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models import Count, F
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from core.storage import is_digest_name, post_images
+
+from .models import Post, StoredImage
+
+
+def acquire(name):
+    """Добавляет ссылку поста на файл из хранилища по хэшу."""
+    if not is_digest_name(name):
+        return
+    with transaction.atomic():
+        stored, _ = StoredImage.objects.select_for_update().get_or_create(
+            name=name)
+        StoredImage.objects.filter(pk=stored.pk).update(
+            references=F('references') + 1)
+
+
+def delete_file(name):
+    """Удаляет файл вместе с миниатюрами sorl и записями KV-хранилища."""
+    delete_with_thumbnails(ImageFile(name, post_images))
+
+
+def release(name):
+    """Убирает ссылку на файл; последний освобожденный файл удаляется."""
+    if not is_digest_name(name):
+        return
+    with transaction.atomic():
+        stored = StoredImage.objects.select_for_update().filter(
+            name=name).first()
+        if stored is None:
+            return
+        if stored.references > 1:
+            StoredImage.objects.filter(pk=stored.pk).update(
+                references=F('references') - 1)
+            return
+        stored.delete()
+        transaction.on_commit(lambda: delete_file(name))
+
+
+def recount(names=None):
+    """Пересчитывает ссылки по постам и удаляет файлы без ссылок.
+
+    names ограничивает пересчет этими файлами. Возвращает число удаленных
+    файлов.
+    """
+    posts = Post.objects.exclude(image='')
+    stored_images = StoredImage.objects.all()
+    if names is not None:
+        names = list(names)
+        posts = posts.filter(image__in=names)
+        stored_images = stored_images.filter(name__in=names)
+    totals = posts.order_by().values(
+        'image').annotate(total=Count('pk')).values_list('image', 'total')
+    used = {name: total for name, total in totals if is_digest_name(name)}
+    removed = 0
+    with transaction.atomic():
+        for stored in stored_images.select_for_update():
+            if stored.name not in used:
+                stored.delete()
+                transaction.on_commit(
+                    lambda name=stored.name: delete_file(name))
+                removed += 1
+            elif stored.references != used[stored.name]:
+                stored.references = used[stored.name]
+                stored.save(update_fields=['references'])
+        known = set(stored_images.values_list('name', flat=True))
+        StoredImage.objects.bulk_create([
+            StoredImage(name=name, references=total)
+            for name, total in used.items() if name not in known
+        ])
+    return removed
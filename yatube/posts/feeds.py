@@ -0,0 +1,95 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from core.cache.stampede import get_or_compute
+
+from . import versions
+
+
+def feed_timeout():
+    return getattr(settings, 'FEED_CACHE_TIMEOUT', 60 * 60 * 3)
+
+
+def feed_stale_timeout():
+    """Сколько после срока страницу еще можно отдать, пока она строится."""
+    return getattr(settings, 'FEED_STALE_TIMEOUT', 60 * 10)
+
+
+def feed_wait_timeout():
+    """Сколько запрос ждет страницу, которую строит другой процесс, если
+    прошлой копии нет; потом строит ее сам."""
+    return getattr(settings, 'FEED_WAIT_TIMEOUT', 0.2)
+
+
+def feed_key(scope, value=None):
+    """Ключ версии ленты: общей, группы по slug или автора по username.
+
+    Значение хэшируется: в slug и username бывают не-ASCII символы, а
+    длина ключа memcached ограничена.
+    """
+    if value is None:
+        return versions.version_key('feed', scope)
+    digest = hashlib.md5(str(value).encode()).hexdigest()
+    return versions.version_key('feed', f'{scope}:{digest}')
+
+
+def bump_feeds(*keys):
+    versions.bump(*keys)
+
+
+def page_id(request, scope):
+    """Страница ленты для конкретного адреса и пользователя."""
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    viewer = request.user.pk if request.user.is_authenticated else 'anon'
+    return f'feed_page:{scope}:{viewer}:{path}'
+
+
+def cached_feed_page(key_for_request):
+    """Кэширует страницу ленты под ключом с версией ленты.
+
+    При изменении ленты версия меняется и старые страницы больше не
+    находятся, поэтому время жизни можно держать большим. Пересчет
+    защищен от лавины: страницу строит один процесс, остальные в это
+    время получают предыдущую копию.
+
+    Страница хранится с кодом ответа и всеми заголовками, которые
+    поставило представление. Ответы с cookie не кэшируются, как и в
+    UpdateCacheMiddleware: чужой Set-Cookie нельзя отдавать из кэша.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            scope = key_for_request(*args, **kwargs)
+            version = versions.get_versions([scope])[scope]
+            page = page_id(request, scope)
+            rendered = {}
+
+            def compute():
+                response = view(request, *args, **kwargs)
+                rendered['response'] = response
+                if (response.status_code != 200 or response.streaming
+                        or response.cookies):
+                    return None
+                return response.content, list(response.items())
+
+            cached = get_or_compute(
+                cache, f'{page}:{version}', compute, feed_timeout(),
+                stale_timeout=feed_stale_timeout(),
+                fallback_key=f'{page}:latest',
+                wait_timeout=feed_wait_timeout(),
+            )
+            if 'response' in rendered:
+                return rendered['response']
+            content, headers = cached
+            response = HttpResponse(content)
+            for name, value in headers:
+                response[name] = value
+            return response
+        return wrapper
+    return decorator
@@ -1,5 +1,6 @@
 from django import forms
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -9,6 +10,14 @@ class PostForm(forms.ModelForm):
         help_texts = {'group': 'Выберите группу', 'text': 'Введите ссообщение'}
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        """Размер проверяется по заголовку; кадры анимации декодируются,
+        только пока их сумма укладывается в лимит точек."""
+        image = self.cleaned_data['image']
+        if getattr(image, 'image', None) is not None:
+            uploads.check_upload(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,227 @@
+"""Полнотекстовый поиск постов по основам слов.
+
+На SQLite с FTS5 индекс - виртуальная таблица posts_search с ранжированием
+bm25. На других СУБД (или при POSTS_SEARCH_BACKEND='index') - обратный
+индекс SearchPosting с ранжированием tf-idf. Оба индекса хранят основы
+слов из posts.stemmer и обновляются сигналами сохранения и удаления поста.
+"""
+import math
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.expressions import RawSQL
+
+from . import counters, querysets
+from .models import Post, SearchPosting
+from .stemmer import terms
+
+FTS_TABLE: str = 'posts_search'
+
+
+def create_fts_table(schema_editor):
+    """Создает таблицу FTS5, если ее поддерживает СУБД; True при успехе."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    try:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+            f"USING fts5(body, tokenize='unicode61 remove_diacritics 0')"
+        )
+    except DatabaseError:
+        return False
+    schema_editor.connection._posts_fts_available = None
+    return True
+
+
+def fts_available():
+    """Таблица FTS5 есть в текущей БД; ответ запоминается в соединении."""
+    available = getattr(connection, '_posts_fts_available', None)
+    if available is None:
+        available = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+        connection._posts_fts_available = available
+    return available
+
+
+def backend():
+    name = getattr(settings, 'POSTS_SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        return 'fts5' if fts_available() else 'index'
+    return name
+
+
+def _body(text):
+    return ' '.join(terms(text))
+
+
+def index_post(post):
+    """Заносит пост в индекс текущего бэкенда."""
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {FTS_TABLE}(rowid, body) '
+                'VALUES (%s, %s)', [post.pk, _body(post.text)]
+            )
+        return
+    SearchPosting.objects.filter(post_id=post.pk).delete()
+    SearchPosting.objects.bulk_create([
+        SearchPosting(term=term[:64], post_id=post.pk, frequency=frequency)
+        for term, frequency in Counter(terms(post.text)).items()
+    ])
+
+
+def remove_post(post_id):
+    """Убирает пост из индекса FTS5; записи SearchPosting удалит каскад."""
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def _insert(use_fts, batch):
+    """Заносит в индекс пары (id, текст) постов, которых там еще нет."""
+    if use_fts:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE}(rowid, body) VALUES (%s, %s)',
+                [(pk, _body(text)) for pk, text in batch]
+            )
+    else:
+        SearchPosting.objects.bulk_create([
+            SearchPosting(term=term[:64], post_id=pk, frequency=frequency)
+            for pk, text in batch
+            for term, frequency in Counter(terms(text)).items()
+        ])
+
+
+def index_new_posts(posts):
+    """Заносит в индекс пачку только что созданных постов."""
+    _insert(backend() == 'fts5', [(post.pk, post.text) for post in posts])
+
+
+def rebuild(batch_size=1000):
+    """Перестраивает индекс текущего бэкенда по всем постам."""
+    use_fts = backend() == 'fts5'
+    if use_fts:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        SearchPosting.objects.all().delete()
+    indexed = last_pk = 0
+    posts = Post.objects.order_by('pk').values_list('pk', 'text')
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return indexed
+        _insert(use_fts, batch)
+        indexed += len(batch)
+        last_pk = batch[-1][0]
+
+
+def _posts(ids):
+    """Карточки постов в порядке ids."""
+    posts = querysets.post_cards().in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+class FtsResults:
+    """Результаты FTS5 по релевантности bm25; режутся срезом для Paginator.
+    """
+
+    def __init__(self, query_terms):
+        self.match = ' AND '.join(
+            '"{}"'.format(term.replace('"', '""')) for term in query_terms)
+
+    def post_ids(self):
+        """Подзапрос id найденных постов для фильтра pk__in."""
+        return RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [self.match]
+        )
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s', [self.match]
+            )
+            return cursor.fetchone()[0]
+
+    def __getitem__(self, page):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}), rowid DESC LIMIT %s OFFSET %s',
+                [self.match, page.stop - page.start, page.start]
+            )
+            return _posts([row[0] for row in cursor.fetchall()])
+
+
+class IndexResults:
+    """Результаты обратного индекса по tf-idf; все основы обязательны."""
+
+    def __init__(self, query_terms):
+        self.terms = query_terms
+        self._ranked = None
+
+    def postings(self):
+        return SearchPosting.objects.filter(term__in=self.terms)
+
+    def post_ids(self):
+        """Подзапрос id постов, где есть все основы, для фильтра pk__in."""
+        return (
+            self.postings().values('post_id')
+            .annotate(matched=Count('term'))
+            .filter(matched=len(self.terms))
+            .values('post_id')
+        )
+
+    def ranked(self):
+        if self._ranked is None:
+            postings = self.postings()
+            found = dict(postings.values('term').annotate(
+                posts=Count('post_id')).values_list('term', 'posts'))
+            total = max(counters.feed_count(), 1)
+            weights = [
+                When(term=term, then=Value(math.log(1 + total / posts)))
+                for term, posts in found.items()
+            ]
+            score = Sum(
+                F('frequency') * Case(*weights, output_field=FloatField()),
+                output_field=FloatField()
+            ) if weights else Value(0.0, output_field=FloatField())
+            self._ranked = (
+                postings.values('post_id')
+                .annotate(matched=Count('term'), score=score)
+                .filter(matched=len(self.terms))
+                .order_by('-score', '-post_id')
+            )
+        return self._ranked
+
+    def count(self):
+        return self.ranked().count()
+
+    def __getitem__(self, page):
+        return _posts([row['post_id'] for row in self.ranked()[page]])
+
+
+def search(query):
+    """Посты по запросу: объект с count() и срезами для Paginator."""
+    query_terms = list(dict.fromkeys(term[:64] for term in terms(query)))
+    if not query_terms:
+        return []
+    if backend() == 'fts5':
+        return FtsResults(query_terms)
+    return IndexResults(query_terms)
+
+
+def filter_posts(queryset, query):
+    """Сужает queryset постов до найденных по запросу, без ранжирования."""
+    results = search(query)
+    if not results:
+        return queryset.none()
+    return queryset.filter(pk__in=results.post_ids())
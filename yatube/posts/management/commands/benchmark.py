@@ -0,0 +1,90 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон страниц постов: перцентили задержки, запросы '
+        'в секунду и число SQL-запросов на страницу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Число одновременных виртуальных пользователей.'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=50,
+            help='Сколько первых запросов не учитывать.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--mix', default='',
+            help='Веса страниц, например index=30,post_detail=25.'
+        )
+        parser.add_argument(
+            '--users', type=int, default=20,
+            help='Сколько пользователей из базы заходят на сайт.'
+        )
+        parser.add_argument(
+            '--base-url', default=None,
+            help='Адрес запущенного сервера; без него - в этом процессе.'
+        )
+        parser.add_argument(
+            '--password', default='bench',
+            help='Пароль пользователей для входа по HTTP (см. seed_bench).'
+        )
+        parser.add_argument('--output', help='Файл для результата в JSON.')
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения.')
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stderr.write(
+                'DEBUG=True: замеры медленнее, чем в рабочем режиме.')
+        try:
+            run = benchmark.Benchmark(
+                requests=options['requests'],
+                concurrency=options['concurrency'],
+                warmup=options['warmup'],
+                seed=options['seed'],
+                mix=benchmark.parse_mix(options['mix']) or None,
+                users=options['users'],
+                base_url=options['base_url'],
+                password=options['password'],
+            )
+            if not run.mix:
+                raise CommandError('В базе нет данных для запросов.')
+            result = run.run()
+        except ValueError as error:
+            raise CommandError(error)
+        self.report(result)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(result, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                for line in benchmark.compare(json.load(file), result):
+                    self.stdout.write(line)
+
+    def report(self, result):
+        self.stdout.write(
+            f'{"страница":<14}{"запросов":>9}{"ошибок":>8}{"p50":>9}'
+            f'{"p95":>9}{"p99":>9}{"SQL":>7}'
+        )
+        rows = list(result['views'].items()) + [('total', result['total'])]
+        for name, summary in rows:
+            latency = summary['latency_ms']
+            queries = summary['queries']
+            self.stdout.write(
+                f'{name:<14}{summary["requests"]:>9}{summary["errors"]:>8}'
+                f'{latency["p50"]:>9}{latency["p95"]:>9}{latency["p99"]:>9}'
+                f'{queries["mean"] if queries else "-":>7}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Запросов в секунду: {result["total"]["rps"]}'))
@@ -0,0 +1,62 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from core.storage import is_digest_name, post_images
+from posts import dedup, thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище по хэшу, объединяет '
+        'дубликаты и пересчитывает ссылки на файлы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов читать за один запрос.'
+        )
+
+    def legacy_posts(self, batch_size):
+        posts = Post.objects.exclude(image='').only('id', 'image')
+        last_pk = 0
+        while True:
+            batch = list(
+                posts.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not batch:
+                return
+            yield from (
+                post for post in batch if not is_digest_name(post.image.name))
+            last_pk = batch[-1].pk
+
+    def move(self, post):
+        """Кладет файл поста в хранилище по хэшу; None, если файла нет."""
+        old_name = post.image.name
+        if not post_images.exists(old_name):
+            return None
+        with post_images.open(old_name) as file:
+            post.image.name = post_images.save(old_name, File(file))
+        post.save(update_fields=['image', 'updated'])
+        thumbnails.schedule(post)
+        return old_name
+
+    def handle(self, *args, **options):
+        moved = missing = 0
+        legacy, stored = set(), set()
+        for post in self.legacy_posts(options['batch_size']):
+            old_name = self.move(post)
+            if old_name is None:
+                missing += 1
+                continue
+            moved += 1
+            legacy.add(old_name)
+            stored.add(post.image.name)
+        for name in legacy:
+            if not Post.objects.filter(image=name).exists():
+                dedup.delete_file(name)
+        removed = dedup.recount()
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено картинок: {moved}, уникальных файлов: {len(stored)}, '
+            f'файлов не найдено: {missing}, удалено без ссылок: {removed}'
+        ))
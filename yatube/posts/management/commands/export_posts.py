@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии и подписки в NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл NDJSON (- для stdout) или каталог для CSV-файлов.'
+        )
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default='ndjson',
+            help='Формат выгрузки.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=transfer.CHUNK_SIZE,
+            help='Сколько строк читать из базы за один раз.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        # При выгрузке в stdout ход работы пишется в stderr.
+        log = self.stderr if path == '-' else self.stdout
+
+        def progress(table, count):
+            log.write(f'{table}: выгружено {count}')
+
+        chunk_size = options['chunk_size']
+        if options['format'] == 'csv':
+            transfer.write_csv(path, chunk_size, progress)
+        elif path == '-':
+            transfer.write_ndjson(sys.stdout, chunk_size, progress)
+        else:
+            with open(path, 'w', encoding='utf-8') as stream:
+                transfer.write_ndjson(stream, chunk_size, progress)
+        log.write(self.style.SUCCESS('Готово'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import variants
+
+
+class Command(BaseCommand):
+    help = 'Показывает вес вариантов картинок и экономию относительно JPEG.'
+
+    def handle(self, *args, **options):
+        report = variants.savings()
+        if not report:
+            self.stdout.write('Вариантов картинок пока нет.')
+            return
+        for row in report:
+            line = (
+                f'{row["geometry"]:>10} {row["format"]:<5} '
+                f'файлов: {row["files"]:>6} байт: {row["bytes"]:>12}'
+            )
+            if row['saved'] is not None:
+                line += f' экономия к JPEG: {row["saved"]}%'
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            'Доступные форматы: ' + ', '.join(variants.available_formats())
+        ))
@@ -0,0 +1,54 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии и подписки из NDJSON или CSV '
+        'и пересчитывает счетчики и поисковый индекс.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл NDJSON (- для stdin) или каталог с CSV-файлами.'
+        )
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default=None,
+            help='Формат; по умолчанию csv для каталога, иначе ndjson.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.CHUNK_SIZE,
+            help='Сколько записей писать одной транзакцией.'
+        )
+
+    def progress(self, loaded):
+        self.stdout.write(', '.join(
+            f'{table}: {count}' for table, count in loaded.items()))
+
+    def load(self, records, batch_size):
+        try:
+            return transfer.load(records, batch_size, self.progress)
+        except (KeyError, TypeError, ValueError) as error:
+            raise CommandError(f'Ошибка в данных: {error!r}')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if os.path.isdir(path) else 'ndjson')
+        batch_size = options['batch_size']
+        if fmt == 'csv':
+            loaded = self.load(transfer.read_csv(path), batch_size)
+        elif path == '-':
+            loaded = self.load(transfer.read_ndjson(sys.stdin), batch_size)
+        else:
+            with open(path, encoding='utf-8') as stream:
+                loaded = self.load(transfer.read_ndjson(stream), batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            'Загружено записей: ' + ', '.join(
+                f'{table}: {count}' for table, count in loaded.items())
+        ))
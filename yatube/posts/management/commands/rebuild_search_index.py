@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import fulltext
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов индексировать за один запрос.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed = fulltext.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {indexed} '
+            f'(индекс: {fulltext.backend()})'
+        ))
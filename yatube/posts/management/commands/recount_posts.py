@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики профилей и групп.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Размер пачки при создании недостающих профилей.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = stats.create_missing_profiles(options['batch_size'])
+            profiles = stats.recount_profiles()
+            groups = stats.recount_groups()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано профилей: {created}, '
+            f'пересчитано профилей: {profiles}, групп: {groups}'
+        ))
@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями, подписками и картинками для нагрузочных тестов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument(
+            '--follows', type=float, default=20,
+            help='Среднее число подписок пользователя.'
+        )
+        parser.add_argument(
+            '--comments', type=float, default=2,
+            help='Среднее число комментариев к посту.'
+        )
+        parser.add_argument(
+            '--images', type=int, default=20,
+            help='Сколько разных картинок создать для постов.'
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=0.2,
+            help='Доля постов с картинкой.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько последних дней распределить посты.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=seeding.BATCH_SIZE,
+            help='Сколько строк писать одной транзакцией.'
+        )
+
+    def progress(self, stage, count):
+        self.stdout.write(
+            f'{stage}: {count} ({time.monotonic() - self.started:.1f} с)')
+
+    def handle(self, *args, **options):
+        self.started = time.monotonic()
+        if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+            # Генерацию можно повторить, поэтому fsync на каждый коммит
+            # не нужен (внутри транзакции режим не меняется).
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous = OFF')
+        seeder = seeding.Seeder(
+            options['seed'], options['batch_size'], options['days'],
+            self.progress
+        )
+        seeder.users(options['users'])
+        seeder.groups(options['groups'])
+        seeder.make_images(options['images'])
+        saved = seeder.posts(
+            options['posts'], options['comments'], options['image_share'])
+        follows = seeder.follows(options['follows'])
+        self.stdout.write('Пересчет счетчиков, индекса и лент...')
+        entries = seeder.finish()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - self.started:.1f} с: '
+            f'постов {saved["posts"]}, комментариев {saved["comments"]}, '
+            f'подписок {follows}, записей в лентах {entries}'
+        ))
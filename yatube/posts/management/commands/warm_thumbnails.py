@@ -0,0 +1,66 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _generate(post_id):
+    try:
+        thumbnails.generate(post_id)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Создает недостающие миниатюры картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько постов проверять одним запросом к KV-хранилищу.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число потоков; 1 - генерировать в текущем потоке.'
+        )
+
+    def batches(self, batch_size):
+        """Пачки постов по pk; курсор не держится открытым во время работы."""
+        posts = Post.objects.exclude(image='').only('id', 'image')
+        last_pk = 0
+        while True:
+            batch = list(
+                posts.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not batch:
+                return
+            yield batch
+            last_pk = batch[-1].pk
+
+    def handle(self, *args, **options):
+        checked = generated = 0
+        workers = options['workers']
+        executor = ThreadPoolExecutor(workers) if workers > 1 else None
+        try:
+            for batch in self.batches(options['batch_size']):
+                missing = [
+                    post.pk for post in thumbnails.missing_thumbnails(batch)]
+                if executor is None:
+                    for post_id in missing:
+                        thumbnails.generate(post_id)
+                else:
+                    list(executor.map(_generate, missing))
+                checked += len(batch)
+                generated += len(missing)
+                self.stdout.write(
+                    f'Проверено постов: {checked}, '
+                    f'создано миниатюр для: {generated}'
+                )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: проверено {checked}, обработано {generated}'))
@@ -0,0 +1,64 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def _count(model, field, outer='pk'):
+    counted = model.objects.filter(
+        **{field: models.OuterRef(outer)}
+    ).order_by().values(field).annotate(
+        total=models.Count('pk')).values('total')
+    return Coalesce(
+        models.Subquery(counted, output_field=models.IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Group = apps.get_model('posts', 'Group')
+    Profile = apps.get_model('posts', 'Profile')
+    Profile.objects.bulk_create(
+        Profile(user_id=pk)
+        for pk in User.objects.values_list('pk', flat=True).iterator()
+    )
+    Profile.objects.update(
+        posts_count=_count(Post, 'author', 'user_id'),
+        comments_count=_count(Comment, 'author', 'user_id'),
+        followers_count=_count(Follow, 'author', 'user_id'),
+    )
+    Group.objects.update(posts_count=_count(Post, 'group'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0004_follow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Число постов'),
+        ),
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='Число комментариев')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Число подписчиков')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL, verbose_name='Юзер')),
+            ],
+            options={
+                'verbose_name_plural': 'Профили',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
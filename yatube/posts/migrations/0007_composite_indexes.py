@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:46
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    """Удаляет повторные подписки и пересчитывает число подписчиков.
+
+    Исторические модели не шлют сигналов, а followers_count заполнен в
+    0005 еще с учетом дублей.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    Profile = apps.get_model('posts', 'Profile')
+    keep = Follow.objects.order_by().values('user', 'author').annotate(
+        first_id=Min('id')).values_list('first_id', flat=True)
+    Follow.objects.exclude(id__in=list(keep)).delete()
+    followers = Follow.objects.filter(
+        author=OuterRef('user_id')).order_by().values('author').annotate(
+        total=Count('pk')).values('total')
+    Profile.objects.update(followers_count=Coalesce(
+        Subquery(followers, output_field=models.IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_timeline'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-pub_date'], name='post_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date'], name='post_author_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date'], name='post_group_date_idx'),
+        ),
+        migrations.RunPython(
+            remove_duplicate_follows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, verbose_name='Исходная картинка')),
+                ('geometry', models.CharField(max_length=20, verbose_name='Размер на странице')),
+                ('format', models.CharField(max_length=10, verbose_name='Формат')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(verbose_name='Высота')),
+                ('file', models.FileField(upload_to='posts/variants/', verbose_name='Файл')),
+                ('size', models.PositiveIntegerField(verbose_name='Размер, байт')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_variants', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name_plural': 'Варианты картинок',
+                'unique_together': {('post', 'geometry', 'format', 'width')},
+            },
+        ),
+    ]
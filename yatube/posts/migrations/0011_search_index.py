@@ -0,0 +1,78 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:13
+
+from collections import Counter
+
+from django.db import DatabaseError, migrations, models
+import django.db.models.deletion
+
+
+FTS_TABLE = 'posts_search'
+BATCH_SIZE = 1000
+
+
+def build_index(apps, schema_editor):
+    # Стеммер - чистая функция без моделей; индекс должен строиться тем же
+    # стеммером, которым потом разбирается запрос поиска.
+    from posts.stemmer import terms
+
+    Post = apps.get_model('posts', 'Post')
+    SearchPosting = apps.get_model('posts', 'SearchPosting')
+    use_fts = False
+    if schema_editor.connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING '
+                f"fts5(body, tokenize='unicode61 remove_diacritics 0')"
+            )
+            use_fts = True
+        except DatabaseError:
+            pass
+    schema_editor.connection._posts_fts_available = None
+    posts = Post.objects.order_by('pk').values_list('pk', 'text')
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            return
+        if use_fts:
+            with schema_editor.connection.cursor() as cursor:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE}(rowid, body) VALUES (%s, %s)',
+                    [(pk, ' '.join(terms(text))) for pk, text in batch]
+                )
+        else:
+            SearchPosting.objects.bulk_create([
+                SearchPosting(term=term[:64], post_id=pk, frequency=frequency)
+                for pk, text in batch
+                for term, frequency in Counter(terms(text)).items()
+            ])
+        last_pk = batch[-1][0]
+
+
+def drop_fts_table(apps, schema_editor):
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    schema_editor.connection._posts_fts_available = None
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_stored_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('frequency', models.PositiveIntegerField(verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name_plural': 'Поисковый индекс',
+                'unique_together': {('term', 'post')},
+            },
+        ),
+        migrations.RunPython(build_index, drop_fts_table),
+    ]
@@ -2,12 +2,15 @@ from django.db import models
 
 from django.contrib.auth import get_user_model
 
+from core.storage import post_images
+
 User = get_user_model()
 
 
 class Post(models.Model):
     text = models.TextField('Текст поста', help_text='Введите текст поста')
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -31,18 +34,27 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=post_images,
         blank=True
     )
 
     class Meta:
         verbose_name_plural = 'Посты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date'], name='post_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date'], name='post_author_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date'], name='post_group_date_idx'),
+        ]
 
 
 class Group(models.Model):
     title = models.CharField('Название группы', max_length=200)
     description = models.TextField()
     slug = models.SlugField(max_length=20, unique=True,)
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
     verbose_name_plural = 'Группы'
 
     def __str__(self) -> str:
@@ -71,6 +83,12 @@ class Comment(models.Model):
         auto_now_add=True,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'], name='comment_post_created_idx'),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -85,3 +103,111 @@ class Follow(models.Model):
         verbose_name='Автор',
         related_name='following'
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'),
+        ]
+
+
+class Profile(models.Model):
+    """Денормализованные счетчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Юзер',
+        related_name='profile'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0)
+
+    class Meta:
+        verbose_name_plural = 'Профили'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Юзер',
+        related_name='timeline_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name_plural = 'Ленты подписок'
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_idx'
+            ),
+        ]
+
+
+class ImageVariant(models.Model):
+    """Перекодированная копия картинки поста для <picture>/srcset."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='image_variants'
+    )
+    source = models.CharField('Исходная картинка', max_length=255)
+    geometry = models.CharField('Размер на странице', max_length=20)
+    format = models.CharField('Формат', max_length=10)
+    width = models.PositiveIntegerField('Ширина')
+    height = models.PositiveIntegerField('Высота')
+    file = models.FileField('Файл', upload_to='posts/variants/')
+    size = models.PositiveIntegerField('Размер, байт')
+
+    class Meta:
+        verbose_name_plural = 'Варианты картинок'
+        unique_together = ('post', 'geometry', 'format', 'width')
+
+    def __str__(self):
+        return f'{self.file.name} ({self.size} Б)'
+
+
+class StoredImage(models.Model):
+    """Файл картинки в хранилище по хэшу и число постов, которые на него
+    ссылаются. Файл удаляется, когда ссылок не остается."""
+    name = models.CharField('Файл', max_length=255, unique=True)
+    references = models.PositiveIntegerField('Число ссылок', default=0)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
+
+
+class SearchPosting(models.Model):
+    """Запись обратного индекса поиска: основа слова и пост с ней."""
+    term = models.CharField('Основа слова', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='search_postings'
+    )
+    frequency = models.PositiveIntegerField('Число вхождений')
+
+    class Meta:
+        verbose_name_plural = 'Поисковый индекс'
+        unique_together = ('term', 'post')
@@ -0,0 +1,26 @@
+from .models import Post
+
+# Поля, которые нужны карточке поста (posts/includes/post_card.html).
+CARD_FIELDS = (
+    'text', 'pub_date', 'updated', 'image', 'author', 'group',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__title', 'group__slug',
+)
+COMMENT_FIELDS = ('text', 'created', 'post', 'author', 'author__username')
+
+
+def post_cards(queryset=None):
+    """Посты для списков: автор и группа в том же запросе, без лишних
+    колонок, чтобы шаблон не делал запросов на каждый пост."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    return queryset.select_related('author', 'group').only(*CARD_FIELDS)
+
+
+def post_detail():
+    return Post.objects.select_related('author__profile', 'group')
+
+
+def post_comments(post):
+    return post.comments.select_related('author').only(
+        *COMMENT_FIELDS).order_by('created', 'pk')
@@ -0,0 +1,283 @@
+"""Синтетические данные для нагрузочного тестирования.
+
+Объемы задаются параметрами, результат определяется seed (и текущей датой,
+от которой отсчитываются даты постов). Faker заполняет небольшие пулы
+предложений и имен, а строки собираются из пулов. Пользователи и группы
+пишутся bulk_create, а посты, комментарии и подписки - кортежами через
+executemany без создания моделей: на миллионах строк сборка объектов
+Django стоила больше самой вставки.
+Популярность авторов подчиняется степенному закону: у немногих авторов
+большинство подписчиков, у немногих (других) - большинство постов; число
+подписок пользователя и комментариев к посту распределено с тяжелым
+хвостом.
+"""
+import io
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from core.storage import post_images
+
+from . import transfer
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE: int = 5000
+PASSWORD: str = 'bench'
+SENTENCE_POOL: int = 2000
+NAME_POOL: int = 300
+IMAGE_SIZE = (960, 640)
+# Показатели степенного закона для подписчиков и числа постов автора.
+FOLLOW_ALPHA: float = 1.1
+POST_ALPHA: float = 0.8
+# Параметр Парето для числа подписок и комментариев: чем ближе к 1,
+# тем тяжелее хвост.
+PARETO_ALPHA: float = 1.5
+MAX_COMMENTS: int = 1000
+POST_COLUMNS = (
+    'id', 'author_id', 'group_id', 'text', 'pub_date', 'updated', 'image')
+COMMENT_COLUMNS = ('id', 'post_id', 'author_id', 'text', 'created')
+
+
+def _chunks(objects, size):
+    iterator = iter(objects)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _cum_weights(count, alpha):
+    """Накопленные веса Ципфа: ранг r выбирается с весом 1 / r**alpha."""
+    return list(itertools.accumulate(
+        (rank + 1) ** -alpha for rank in range(count)))
+
+
+def _next_id(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+def _insert(model, columns, rows, ignore_conflicts=False):
+    """Пишет кортежи в таблицу модели одним executemany."""
+    ops = connection.ops
+    table = ops.quote_name(model._meta.db_table)
+    names = ', '.join(ops.quote_name(column) for column in columns)
+    values = ', '.join(['%s'] * len(columns))
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=ignore_conflicts)} '
+        f'{table} ({names}) VALUES ({values})'
+    )
+    if ignore_conflicts:
+        suffix = ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+        if suffix:
+            sql = f'{sql} {suffix}'
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+class Seeder:
+    """Генератор связанных данных; progress(stage, count) после пачки."""
+
+    def __init__(self, seed=0, batch_size=BATCH_SIZE, days=365,
+                 progress=None):
+        self.rng = random.Random(seed)
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(seed)
+        self.batch_size = batch_size
+        self.progress = progress
+        self.now = timezone.now().replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        self.period = timedelta(days=days).total_seconds()
+        self.sentences = [
+            self.fake.sentence(nb_words=self.rng.randint(4, 14))
+            for _ in range(SENTENCE_POOL)
+        ]
+        self.user_ids = []
+        self.popular = []
+        self.prolific = []
+        self.group_ids = []
+        self.images = []
+
+    def _heavy_tail(self, mean, limit):
+        """Целое с тяжелым хвостом (Парето) и средним около mean."""
+        value = (self.rng.paretovariate(PARETO_ALPHA) - 1) * (
+            PARETO_ALPHA - 1) * mean
+        return min(int(value), limit)
+
+    def _save(self, stage, model, objects, **kwargs):
+        saved = 0
+        for batch in _chunks(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, **kwargs)
+            saved += len(batch)
+            if self.progress is not None:
+                self.progress(stage, saved)
+        return saved
+
+    def users(self, count):
+        start = _next_id(User)
+        password = make_password(PASSWORD)
+        first_names = [self.fake.first_name() for _ in range(NAME_POOL)]
+        last_names = [self.fake.last_name() for _ in range(NAME_POOL)]
+        self.user_ids = list(range(start, start + count))
+        self.popular = self.user_ids[:]
+        self.rng.shuffle(self.popular)
+        self.prolific = self.user_ids[:]
+        self.rng.shuffle(self.prolific)
+        return self._save('users', User, (
+            User(
+                id=pk,
+                username=f'bench{pk}',
+                email=f'bench{pk}@example.com',
+                first_name=self.rng.choice(first_names),
+                last_name=self.rng.choice(last_names),
+                password=password,
+            )
+            for pk in self.user_ids
+        ))
+
+    def groups(self, count):
+        start = _next_id(Group)
+        self.group_ids = list(range(start, start + count))
+        return self._save('groups', Group, (
+            Group(
+                id=pk,
+                slug=f'bench-{pk}',
+                title=' '.join(self.fake.words(2)).capitalize(),
+                description=self.fake.sentence(),
+            )
+            for pk in self.group_ids
+        ))
+
+    def _color(self):
+        return tuple(self.rng.randrange(256) for _ in range(3))
+
+    def make_images(self, count):
+        """Пул разных JPEG в хранилище картинок постов."""
+        width, height = IMAGE_SIZE
+        for number in range(count):
+            image = Image.new('RGB', IMAGE_SIZE, self._color())
+            draw = ImageDraw.Draw(image)
+            for _ in range(12):
+                left = self.rng.randrange(width)
+                top = self.rng.randrange(height)
+                draw.rectangle((
+                    left, top,
+                    left + self.rng.randrange(40, 400),
+                    top + self.rng.randrange(40, 300),
+                ), fill=self._color())
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=85)
+            self.images.append(post_images.save(
+                f'posts/bench-{number}.jpg', ContentFile(buffer.getvalue())))
+        if self.progress is not None:
+            self.progress('images', count)
+        return count
+
+    def _date(self, value):
+        return connection.ops.adapt_datetimefield_value(value)
+
+    def _post(self, pk, author_cum, image_share):
+        """Строка posts_post и дата поста для его комментариев."""
+        rng = self.rng
+        pub_date = self.now - timedelta(seconds=rng.uniform(0, self.period))
+        image = ''
+        if self.images and rng.random() < image_share:
+            image = rng.choice(self.images)
+        group_id = None
+        if self.group_ids and rng.random() < 0.7:
+            group_id = rng.choice(self.group_ids)
+        stored = self._date(pub_date)
+        return (
+            pk,
+            rng.choices(self.prolific, cum_weights=author_cum)[0],
+            group_id,
+            ' '.join(rng.choices(self.sentences, k=rng.randint(1, 6))),
+            stored,
+            stored,
+            image,
+        ), pub_date
+
+    def _comments(self, post_id, pub_date, start, mean):
+        rng = self.rng
+        window = min((self.now - pub_date).total_seconds(), 7 * 86400)
+        return [
+            (
+                start + number,
+                post_id,
+                rng.choice(self.user_ids),
+                rng.choice(self.sentences),
+                self._date(pub_date + timedelta(
+                    seconds=rng.uniform(0, window))),
+            )
+            for number in range(self._heavy_tail(mean, MAX_COMMENTS))
+        ]
+
+    def posts(self, count, comments_mean=2, image_share=0.2):
+        """Посты и комментарии к ним; пишутся в одной транзакции на пачку.
+        """
+        author_cum = _cum_weights(len(self.prolific), POST_ALPHA)
+        post_id = _next_id(Post)
+        comment_id = _next_id(Comment)
+        saved = {'posts': 0, 'comments': 0}
+        for numbers in _chunks(range(count), self.batch_size):
+            generated = [
+                self._post(post_id + number, author_cum, image_share)
+                for number in numbers
+            ]
+            posts = [row for row, _ in generated]
+            comments = []
+            for row, pub_date in generated:
+                post_comments = self._comments(
+                    row[0], pub_date, comment_id, comments_mean)
+                comments.extend(post_comments)
+                comment_id += len(post_comments)
+            with transaction.atomic():
+                _insert(Post, POST_COLUMNS, posts)
+                _insert(Comment, COMMENT_COLUMNS, comments)
+            saved['posts'] += len(posts)
+            saved['comments'] += len(comments)
+            if self.progress is not None:
+                self.progress('posts', saved['posts'])
+        return saved
+
+    def _follows(self, mean):
+        follow_cum = _cum_weights(len(self.popular), FOLLOW_ALPHA)
+        limit = len(self.user_ids) - 1
+        for user_id in self.user_ids:
+            authors = set(self.rng.choices(
+                self.popular, cum_weights=follow_cum,
+                k=self._heavy_tail(mean, limit)))
+            authors.discard(user_id)
+            for author_id in sorted(authors):
+                yield user_id, author_id
+
+    def follows(self, mean):
+        saved = 0
+        for batch in _chunks(self._follows(mean), self.batch_size):
+            with transaction.atomic():
+                _insert(
+                    Follow, ('user_id', 'author_id'), batch,
+                    ignore_conflicts=True)
+            saved += len(batch)
+            if self.progress is not None:
+                self.progress('follows', saved)
+        return saved
+
+    def finish(self):
+        """Счетчики, ссылки на картинки, поиск и ленты подписок."""
+        entries = transfer.refresh(self.batch_size)
+        if self.progress is not None:
+            self.progress('refresh', entries)
+        return entries
@@ -0,0 +1,213 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cards, counters, dedup, feeds, fulltext, stats, timeline
+from .models import (
+    Comment, Follow, Group, ImageVariant, Post, Profile, User
+)
+
+
+def _follower_ids(author_id):
+    return Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True)
+
+
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Profile.objects.get_or_create(user=instance)
+
+
+def _only_last_login(update_fields):
+    return update_fields is not None and set(update_fields) == {'last_login'}
+
+
+def _group_slugs(*group_ids):
+    group_ids = [pk for pk in group_ids if pk is not None]
+    if not group_ids:
+        return []
+    return Group.objects.filter(
+        pk__in=group_ids).values_list('slug', flat=True)
+
+
+def _post_feed_keys(post, *group_ids):
+    """Версии лент, в которые входит пост: общая, групп и автора."""
+    username = User.objects.filter(
+        pk=post.author_id).values_list('username', flat=True).first()
+    keys = [feeds.feed_key('all'), feeds.feed_key('author', username)]
+    keys.extend(
+        feeds.feed_key('group', slug) for slug in _group_slugs(*group_ids))
+    return keys
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    instance._old_username = None
+    if instance.pk is not None and not _only_last_login(update_fields):
+        instance._old_username = User.objects.filter(
+            pk=instance.pk).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_pages(sender, instance, update_fields=None, **kwargs):
+    """Сбрасывает карточки и ленты с именем автора; вход не в счет."""
+    if _only_last_login(update_fields):
+        return
+    cards.bump_version('user', instance.pk)
+    usernames = {instance.username, getattr(instance, '_old_username', None)}
+    feeds.bump_feeds(feeds.feed_key('all'), *[
+        feeds.feed_key('author', username)
+        for username in usernames if username is not None
+    ])
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_pages(sender, instance, **kwargs):
+    cards.bump_version('user', instance.pk)
+    feeds.bump_feeds(
+        feeds.feed_key('all'), feeds.feed_key('author', instance.username))
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance._old_slug = None
+    if instance.pk is not None:
+        instance._old_slug = Group.objects.filter(
+            pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    cards.bump_version('group', instance.pk)
+    slugs = {instance.slug, getattr(instance, '_old_slug', None)}
+    feeds.bump_feeds(feeds.feed_key('all'), *[
+        feeds.feed_key('group', slug) for slug in slugs if slug is not None
+    ])
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_deleted_group_pages(sender, instance, **kwargs):
+    """Посты группы отвязываются SQL-запросом без сигналов и без
+    смены updated."""
+    cards.bump_version('group', instance.pk)
+    feeds.bump_feeds(
+        feeds.feed_key('all'), feeds.feed_key('group', instance.slug))
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    """Запоминает прежние группу и картинку поста для счетчиков."""
+    instance._old_group_id = instance._old_image = None
+    if instance.pk is not None:
+        instance._old_group_id, instance._old_image = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'image').first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        stats.post_created(instance)
+        timeline.fan_out(instance)
+        counters.change_count(counters.post_keys(
+            _follower_ids(instance.author_id)), 1)
+        return
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if old_group_id != instance.group_id:
+        stats.post_moved(old_group_id, instance.group_id)
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_image = getattr(instance, '_old_image', None)
+    if instance.image.name != old_image:
+        dedup.acquire(instance.image.name)
+        dedup.release(old_image)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post_feeds(sender, instance, raw=False, **kwargs):
+    if not raw:
+        feeds.bump_feeds(*_post_feed_keys(
+            instance, instance.group_id,
+            getattr(instance, '_old_group_id', None)
+        ))
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_feeds(sender, instance, **kwargs):
+    feeds.bump_feeds(*_post_feed_keys(instance, instance.group_id))
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw=False, update_fields=None,
+                     **kwargs):
+    if not raw and (update_fields is None or 'text' in update_fields):
+        fulltext.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    fulltext.remove_post(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_post_image(sender, instance, **kwargs):
+    dedup.release(instance.image.name)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    stats.post_deleted(instance)
+    counters.change_count(counters.post_keys(
+        _follower_ids(instance.author_id)), -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.change_profile(instance.author_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    stats.change_profile(instance.author_id, 'comments_count', -1)
+
+
+def _invalidate_author_feed(author_id):
+    """Кнопка подписки на странице автора зависит от Follow."""
+    username = User.objects.filter(
+        pk=author_id).values_list('username', flat=True).first()
+    if username is not None:
+        feeds.bump_feeds(feeds.feed_key('author', username))
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.change_profile(instance.author_id, 'followers_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+    counters.reset_follow_count(instance.user_id)
+    _invalidate_author_feed(instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    stats.change_profile(instance.author_id, 'followers_count', -1)
+    timeline.prune(instance.user_id, instance.author_id)
+    timeline.follower_removed(instance.author_id)
+    counters.reset_follow_count(instance.user_id)
+    _invalidate_author_feed(instance.author_id)
+
+
+@receiver(post_delete, sender=ImageVariant)
+def delete_variant_file(sender, instance, **kwargs):
+    """Файл варианта удаляется, если его не делят посты-дубликаты."""
+    shared = ImageVariant.objects.filter(file=instance.file.name).exists()
+    if not shared:
+        instance.file.delete(save=False)
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, Profile
+
+User = get_user_model()
+
+
+def _add(queryset, field, delta):
+    """Сдвигает счетчик одним UPDATE с F(), не уходя ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_profile(user_id, field, delta):
+    if _add(Profile.objects.filter(user_id=user_id), field, delta):
+        return
+    if delta > 0:
+        profile, created = Profile.objects.get_or_create(user_id=user_id)
+        if created:
+            recount_profiles(Profile.objects.filter(pk=profile.pk))
+        else:
+            _add(Profile.objects.filter(pk=profile.pk), field, delta)
+
+
+def profile_for(user):
+    """Профиль пользователя; недостающий создается с пересчетом."""
+    try:
+        return user.profile
+    except Profile.DoesNotExist:
+        profile, created = Profile.objects.get_or_create(user=user)
+        if created:
+            recount_profiles(Profile.objects.filter(pk=profile.pk))
+            profile.refresh_from_db()
+        return profile
+
+
+def change_group(group_id, delta):
+    if group_id is not None:
+        _add(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def post_created(post):
+    with transaction.atomic():
+        change_profile(post.author_id, 'posts_count', 1)
+        change_group(post.group_id, 1)
+
+
+def post_deleted(post):
+    with transaction.atomic():
+        change_profile(post.author_id, 'posts_count', -1)
+        change_group(post.group_id, -1)
+
+
+def post_moved(old_group_id, new_group_id):
+    with transaction.atomic():
+        change_group(old_group_id, -1)
+        change_group(new_group_id, 1)
+
+
+def _count(model, field, outer='pk'):
+    """Подзапрос COUNT(*) по связанной таблице для UPDATE ... SET."""
+    counted = model.objects.filter(
+        **{field: OuterRef(outer)}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def recount_profiles(queryset=None):
+    """Пересчитывает счетчики профилей одним UPDATE на все строки."""
+    if queryset is None:
+        queryset = Profile.objects.all()
+    return queryset.update(
+        posts_count=_count(Post, 'author', 'user_id'),
+        comments_count=_count(Comment, 'author', 'user_id'),
+        followers_count=_count(Follow, 'author', 'user_id'),
+    )
+
+
+def recount_groups(queryset=None):
+    """Пересчитывает число постов в группах одним UPDATE."""
+    if queryset is None:
+        queryset = Group.objects.all()
+    return queryset.update(posts_count=_count(Post, 'group'))
+
+
+def create_missing_profiles(batch_size=1000, users=None):
+    """Создает профили для пользователей users (по умолчанию всех), у
+    которых их еще нет."""
+    if users is None:
+        users = User.objects.all()
+    user_ids = users.filter(
+        profile__isnull=True).values_list('pk', flat=True)
+    created = 0
+    batch = []
+    for pk in user_ids.iterator(chunk_size=batch_size):
+        batch.append(Profile(user_id=pk))
+        if len(batch) == batch_size:
+            created += len(Profile.objects.bulk_create(batch))
+            batch = []
+    if batch:
+        created += len(Profile.objects.bulk_create(batch))
+    return created
@@ -0,0 +1,130 @@
+"""Стеммер Snowball для русского языка и разбиение текста на термы."""
+import re
+from functools import lru_cache
+
+WORD = re.compile(r'\w+')
+VOWELS = 'аеиоуыэюя'
+
+# Окончания с флагом: True - должно стоять после «а» или «я»
+PERFECTIVE_GERUND = [
+    ('в', True), ('вши', True), ('вшись', True),
+    ('ив', False), ('ивши', False), ('ившись', False),
+    ('ыв', False), ('ывши', False), ('ывшись', False),
+]
+ADJECTIVE = [(ending, False) for ending in (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)]
+PARTICIPLE = [
+    ('ем', True), ('нн', True), ('вш', True), ('ющ', True), ('щ', True),
+    ('ивш', False), ('ывш', False), ('ующ', False),
+]
+REFLEXIVE = [('ся', False), ('сь', False)]
+VERB = [(ending, True) for ending in (
+    'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+    'ют', 'ны', 'ть', 'ешь', 'нно',
+)] + [(ending, False) for ending in (
+    'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+    'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+    'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+)]
+NOUN = [(ending, False) for ending in (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)]
+SUPERLATIVE = [('ейше', False), ('ейш', False)]
+DERIVATIONAL = [('ость', False), ('ост', False)]
+
+
+def _longest_first(endings):
+    return sorted(endings, key=lambda item: len(item[0]), reverse=True)
+
+
+PERFECTIVE_GERUND = _longest_first(PERFECTIVE_GERUND)
+ADJECTIVE = _longest_first(ADJECTIVE)
+PARTICIPLE = _longest_first(PARTICIPLE)
+VERB = _longest_first(VERB)
+NOUN = _longest_first(NOUN)
+
+
+def _regions(word):
+    """Начала областей RV и R2 алгоритма Snowball."""
+    rv = r1 = r2 = len(word)
+    for index, char in enumerate(word):
+        if char in VOWELS:
+            rv = index + 1
+            break
+    for index in range(1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            r1 = index + 1
+            break
+    for index in range(r1 + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            r2 = index + 1
+            break
+    return rv, r2
+
+
+def _strip(word, start, endings):
+    """Отрезает самое длинное подходящее окончание из области start.
+
+    Возвращает None, если ни одно окончание не подошло.
+    """
+    for ending, after_a in endings:
+        cut = len(word) - len(ending)
+        if cut < start or not word.endswith(ending):
+            continue
+        if after_a and (cut - 1 < start or word[cut - 1] not in 'ая'):
+            continue
+        return word[:cut]
+    return None
+
+
+def _step1(word, rv):
+    stripped = _strip(word, rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    word = _strip(word, rv, REFLEXIVE) or word
+    adjective = _strip(word, rv, ADJECTIVE)
+    if adjective is not None:
+        participle = _strip(adjective, rv, PARTICIPLE)
+        return adjective if participle is None else participle
+    for endings in (VERB, NOUN):
+        stripped = _strip(word, rv, endings)
+        if stripped is not None:
+            return stripped
+    return word
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    """Основа слова; нерусские слова возвращаются в нижнем регистре.
+
+    Словарь текстов невелик, поэтому основы кэшируются: при перестроении
+    индекса большинство слов не разбирается заново.
+    """
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = _regions(word)
+    if rv == len(word) or not any(char in VOWELS for char in word):
+        return word
+    word = _step1(word, rv)
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    derivational = _strip(word, r2, DERIVATIONAL)
+    if derivational is not None:
+        word = derivational
+    superlative = _strip(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+    if word.endswith('нн') and len(word) - 1 >= rv:
+        word = word[:-1]
+    elif superlative is None and word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+def terms(text):
+    """Основы слов текста в порядке следования."""
+    return [stem(word) for word in WORD.findall(text)]
@@ -0,0 +1,13 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.cards import CARD_THUMBNAIL, render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, size=CARD_THUMBNAIL):
+    """Список HTML карточек постов: {% post_cards page_obj as cards %};
+    размер миниатюры - вторым аргументом, по умолчанию CARD_THUMBNAIL."""
+    return [mark_safe(card) for card in render_cards(posts, size)]
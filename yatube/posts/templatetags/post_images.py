@@ -0,0 +1,23 @@
+from django import template
+
+from posts.thumbnails import ready_thumbnail as get_ready_thumbnail
+from posts.variants import parse_geometry, picture_sources
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(image, geometry):
+    """Миниатюра или None: {% ready_thumbnail img "500x150" as im %}."""
+    return get_ready_thumbnail(image, geometry)
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def picture(thumbnail, variants, geometry):
+    """<picture> с вариантами по форматам; в <img> остается миниатюра."""
+    width = parse_geometry(geometry)[0]
+    return {
+        'thumbnail': thumbnail,
+        'sources': picture_sources(variants),
+        'sizes': f'(max-width: {width}px) 100vw, {width}px',
+    }
@@ -0,0 +1,79 @@
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import fulltext
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'pass')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.admin, group=cls.group, text='Красивые книги')
+        Post.objects.create(author=cls.admin, text='Про погоду')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def changelist_queries(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries]
+
+    def test_queries_do_not_grow_with_rows(self):
+        """Автор и группа приходят одним запросом со списком постов."""
+        self.changelist_queries()
+        _, before = self.changelist_queries()
+        for number in range(5):
+            Post.objects.create(
+                author=self.admin, group=self.group, text=f'Пост {number}')
+        _, after = self.changelist_queries()
+        self.assertEqual(len(before), len(after))
+
+    def test_unfiltered_count_is_cached(self):
+        """Без фильтров список не считает все посты через COUNT(*)."""
+        self.changelist_queries()
+        response, queries = self.changelist_queries()
+        self.assertEqual(response.context['cl'].result_count, 2)
+        table = Post._meta.db_table
+        self.assertFalse([
+            sql for sql in queries
+            if 'COUNT(' in sql and f'FROM "{table}"' in sql
+        ])
+
+    def test_search_uses_word_forms(self):
+        """Поиск идет по индексу и находит другие словоформы."""
+        response, _ = self.changelist_queries({'q': 'книга'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.post])
+
+    @override_settings(POSTS_SEARCH_BACKEND='index')
+    def test_search_with_term_index(self):
+        """Без FTS5 поиск идет по обратному индексу."""
+        fulltext.rebuild()
+        response, _ = self.changelist_queries({'q': 'красивая книга'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.post])
+
+    def test_change_form_uses_autocomplete(self):
+        """Автор и группа выбираются автокомплитом, а не полным списком."""
+        response = self.client.get(
+            reverse('admin:posts_post_change', args=(self.post.pk,)))
+        fields = response.context['adminform'].form.fields
+        for name in ('author', 'group'):
+            with self.subTest(field=name):
+                self.assertIsInstance(
+                    fields[name].widget.widget, AutocompleteSelect)
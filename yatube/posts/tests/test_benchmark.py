@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase
+
+from posts import benchmark
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class SummaryTest(SimpleTestCase):
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
+
+    def test_summarize(self):
+        samples = [('index', 200, 0.010, 2), ('index', 500, 0.030, 4)]
+        summary = benchmark.summarize(samples, elapsed=0.5)
+        self.assertEqual(summary['requests'], 2)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['rps'], 4.0)
+        self.assertEqual(summary['latency_ms']['p50'], 10.0)
+        self.assertEqual(summary['latency_ms']['p99'], 30.0)
+        self.assertEqual(summary['queries'], {'mean': 3.0, 'max': 4})
+
+    def test_parse_mix(self):
+        self.assertEqual(
+            benchmark.parse_mix('index=3, post_detail=1'),
+            {'index': 3.0, 'post_detail': 1.0}
+        )
+        with self.assertRaises(ValueError):
+            benchmark.parse_mix('admin=1')
+
+    def test_compare(self):
+        def run(p95, queries):
+            return {'views': {'index': {
+                'latency_ms': {'p95': p95}, 'queries': {'mean': queries}}}}
+        self.assertEqual(
+            benchmark.compare(run(10, 2), run(15, 1)),
+            ['index: p95 10 -> 15 мс (+50%), SQL 2 -> 1']
+        )
+
+
+class BenchmarkRunTest(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        for number in range(3):
+            Post.objects.create(
+                author=self.author, group=self.group, text=f'Пост {number}')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def test_every_page_is_measured(self):
+        result = benchmark.Benchmark(
+            requests=60, concurrency=1, warmup=5, seed=1,
+            mix=dict.fromkeys(benchmark.ROUTES, 1),
+        ).run()
+        self.assertEqual(result['total']['requests'], 60)
+        self.assertEqual(result['total']['errors'], 0)
+        self.assertEqual(set(result['views']), set(benchmark.ROUTES))
+        self.assertGreater(result['views']['post_detail']['queries']['max'], 0)
+        self.assertEqual(result['meta']['target'], 'in-process')
+        json.dumps(result)
+
+    def test_command_saves_json(self):
+        # Несколько потоков над общей БД SQLite в памяти ловят блокировку
+        # таблиц shared cache, поэтому поток здесь один.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'result.json')
+            out = StringIO()
+            call_command(
+                'benchmark', requests=20, concurrency=1, warmup=0,
+                mix='index=1,profile=1,group_list=1', output=path,
+                compare=None, stdout=out, stderr=StringIO()
+            )
+            with open(path, encoding='utf-8') as file:
+                result = json.load(file)
+        self.assertEqual(result['total']['requests'], 20)
+        self.assertIn('Запросов в секунду', out.getvalue())
@@ -0,0 +1,91 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.cards import _versions, card_key, render_cards
+from posts.models import Group, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostCardsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def posts(self):
+        return Post.objects.select_related('author', 'group')
+
+    def test_cards_cached(self):
+        """Повторный рендер карточек не обращается к БД."""
+        posts = list(self.posts())
+        first = render_cards(posts)
+        with self.assertNumQueries(0):
+            self.assertEqual(render_cards(posts), first)
+
+    def test_cards_shared_between_pages(self):
+        """Карточка, отрендеренная на одной странице, берется на другой."""
+        self.guest_client.get(reverse('posts:profile', args=['auth']))
+        post = self.posts().get(pk=self.post.pk)
+        post.text = 'Подмена без сохранения'
+        card = render_cards([post])[0]
+        self.assertIn('Тестовый пост', card)
+
+    def test_post_edit_visible_immediately(self):
+        """Правка поста сразу видна на странице группы."""
+        url = reverse('posts:group_list', args=['test_slug'])
+        self.guest_client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Измененный пост'
+        post.save()
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Измененный пост')
+
+    def test_author_and_group_change_invalidate(self):
+        """Изменение автора или группы сбрасывает карточки."""
+        url = reverse('posts:profile', args=['auth'])
+        self.guest_client.get(url)
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Алексей'
+        user.save()
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'new_slug'
+        group.save()
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Алексей')
+        self.assertContains(response, '/group/new_slug/')
+
+    def test_author_and_group_delete_invalidate(self):
+        """Удаление автора или группы сбрасывает их карточки."""
+        post = self.posts().get(pk=self.post.pk)
+        before = card_key(post, _versions([post]))
+        Group.objects.get(pk=self.group.pk).delete()
+        after_group = card_key(post, _versions([post]))
+        self.assertNotEqual(after_group, before)
+        User.objects.get(pk=self.user.pk).delete()
+        self.assertNotEqual(card_key(post, _versions([post])), after_group)
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import utils
+from posts.models import Comment, Post
+
+User = get_user_model()
+COMMENTS_COUNT = utils.LIMIT_COMMENTS_ON_PAGE + 5
+
+
+class CommentsPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        for number in range(COMMENTS_COUNT):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {number}')
+        cls.detail_url = reverse('posts:post_detail', args=[cls.post.id])
+        cls.comments_url = reverse('posts:post_comments', args=[cls.post.id])
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def texts(self, comments):
+        return [comment.text for comment in comments]
+
+    def test_post_detail_shows_first_batch(self):
+        """На странице поста только первая порция комментариев."""
+        response = self.guest_client.get(self.detail_url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), utils.LIMIT_COMMENTS_ON_PAGE)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertContains(response, comments.next_cursor)
+
+    def test_newest_order(self):
+        """?order=newest показывает сначала новые комментарии."""
+        response = self.guest_client.get(self.detail_url, {'order': 'newest'})
+        comments = response.context['comments']
+        self.assertEqual(
+            comments[0].text, f'Комментарий {COMMENTS_COUNT - 1}')
+
+    def test_fragment_returns_next_batch(self):
+        """Фрагмент по курсору отдает оставшиеся комментарии."""
+        first = self.guest_client.get(self.detail_url).context['comments']
+        response = self.guest_client.get(
+            self.comments_url, {'cursor': first.next_cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        comments = response.context['comments']
+        self.assertEqual(
+            self.texts(comments),
+            [f'Комментарий {number}' for number in range(
+                utils.LIMIT_COMMENTS_ON_PAGE, COMMENTS_COUNT)]
+        )
+        self.assertIsNone(comments.next_cursor)
+        self.assertNotContains(response, '<html')
+
+    def test_json_batches_cover_all_comments(self):
+        """JSON-порции по ссылке next проходят все комментарии."""
+        url = f'{self.comments_url}?order=newest&format=json'
+        texts = []
+        while url:
+            data = self.guest_client.get(url).json()
+            texts.extend(comment['text'] for comment in data['comments'])
+            url = data['next']
+        self.assertEqual(
+            texts,
+            [f'Комментарий {number}'
+             for number in reversed(range(COMMENTS_COUNT))]
+        )
+
+    def test_comments_of_missing_post(self):
+        """Комментарии несуществующего поста отдают 404."""
+        response = self.guest_client.get(
+            reverse('posts:post_comments', args=[self.post.id + 100]))
+        self.assertEqual(response.status_code, 404)
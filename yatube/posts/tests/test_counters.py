@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from posts import counters
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        Post.objects.create(author=cls.user, text='Пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self):
+        return counters.feed_count(), counters.follow_count(self.follower)
+
+    def test_counts_match_database(self):
+        """Счетчики при промахе кэша совпадают с COUNT."""
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_counts_read_from_cache(self):
+        """Повторное чтение счетчиков не обращается к БД."""
+        self.counts()
+        with self.assertNumQueries(0):
+            self.counts()
+
+    @override_settings(POSTS_COUNT_APPROXIMATE=True)
+    def test_approximate_falls_back_to_count(self):
+        """Без статистики СУБД используется точный COUNT."""
+        self.assertEqual(counters.feed_count(), 1)
+
+
+class PostCountersCommitTest(TransactionTestCase):
+    """Счетчики сдвигаются в on_commit, поэтому нужны настоящие коммиты."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.follower = User.objects.create_user(username='follower')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=self.follower, author=self.user)
+        Post.objects.create(author=self.user, text='Пост', group=self.group)
+
+    def counts(self):
+        return counters.feed_count(), counters.follow_count(self.follower)
+
+    def test_create_and_delete_update_counts(self):
+        """Создание и удаление поста сдвигают счетчики без пересчета."""
+        self.counts()
+        post = Post.objects.create(
+            author=self.user, text='Новый пост', group=self.group)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.counts(), (2, 2))
+        post.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.counts(), (1, 1))
+
+    def test_follow_resets_feed_count(self):
+        """Подписка сбрасывает счетчик ленты подписок."""
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост автора')
+        self.assertEqual(counters.follow_count(self.follower), 1)
+        Follow.objects.create(user=self.follower, author=author)
+        self.assertEqual(counters.follow_count(self.follower), 2)
+
+    def test_rollback_keeps_counts(self):
+        """Откат транзакции не сдвигает закэшированные счетчики."""
+        self.counts()
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Post.objects.create(author=self.user, text='Откат')
+                raise RuntimeError
+        with self.assertNumQueries(0):
+            self.assertEqual(self.counts(), (1, 1))
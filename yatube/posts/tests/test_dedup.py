@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+
+from core.storage import is_digest_name, post_images
+from posts import dedup, thumbnails
+from posts.models import ImageVariant, Post, StoredImage
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def jpeg(color):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 20), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class DedupStorageTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+
+    def create_post(self, content, name='meme.jpg'):
+        post = Post(author=self.user, text='Мем')
+        post.image.save(name, ContentFile(content))
+        return post
+
+    def test_duplicates_share_one_file(self):
+        """Одинаковые картинки хранятся одним файлом со счетчиком ссылок."""
+        first = self.create_post(jpeg('red'), 'a.jpg')
+        second = self.create_post(jpeg('red'), 'b.jpg')
+        other = self.create_post(jpeg('blue'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertTrue(is_digest_name(first.image.name))
+        self.assertEqual(
+            StoredImage.objects.get(name=first.image.name).references, 2)
+
+    def test_file_deleted_with_last_reference(self):
+        """Файл и его миниатюры удаляются с последним постом."""
+        first = self.create_post(jpeg('red'))
+        second = self.create_post(jpeg('red'))
+        thumbnails.generate(first.pk)
+        name = first.image.name
+        thumbnail = thumbnails.ready_thumbnail(first.image, '500x150')
+        first.delete()
+        self.assertTrue(post_images.exists(name))
+        second.delete()
+        self.assertFalse(post_images.exists(name))
+        self.assertFalse(thumbnail.exists())
+        self.assertFalse(StoredImage.objects.exists())
+
+    def test_duplicates_share_thumbnails_and_variants(self):
+        """Дубликат получает готовые миниатюры и варианты оригинала."""
+        first = self.create_post(jpeg('red'))
+        thumbnails.generate(first.pk)
+        second = self.create_post(jpeg('red'))
+        self.assertIsNotNone(
+            thumbnails.ready_thumbnail(second.image, '500x150'))
+        thumbnails.generate(second.pk)
+        files = set(ImageVariant.objects.filter(
+            post=first).values_list('file', flat=True))
+        self.assertEqual(set(ImageVariant.objects.filter(
+            post=second).values_list('file', flat=True)), files)
+        first.delete()
+        for name in files:
+            self.assertTrue(post_images.exists(name))
+
+    def test_dedupe_images_command(self):
+        """Команда переносит старые файлы в хранилище по хэшу."""
+        legacy = FileSystemStorage()
+        names = [
+            legacy.save('posts/one.jpg', ContentFile(jpeg('red'))),
+            legacy.save('posts/two.jpg', ContentFile(jpeg('red'))),
+            legacy.save('posts/three.jpg', ContentFile(jpeg('blue'))),
+        ]
+        for name in names:
+            post = Post.objects.create(author=self.user, text='Старый')
+            Post.objects.filter(pk=post.pk).update(image=name)
+        StoredImage.objects.create(name='posts/00/' + '0' * 64 + '.jpg')
+        out = StringIO()
+        call_command('dedupe_images', stdout=out)
+        self.assertIn(
+            'Перенесено картинок: 3, уникальных файлов: 2', out.getvalue())
+        self.assertIn('удалено без ссылок: 1', out.getvalue())
+        for name in names:
+            self.assertFalse(legacy.exists(name))
+        references = dict(
+            StoredImage.objects.values_list('name', 'references'))
+        self.assertEqual(sorted(references.values()), [1, 2])
+        for post in Post.objects.all():
+            self.assertIn(post.image.name, references)
+
+    def test_recount_fixes_references(self):
+        """recount восстанавливает счетчики по постам."""
+        post = self.create_post(jpeg('red'))
+        StoredImage.objects.update(references=5)
+        self.assertEqual(dedup.recount(), 0)
+        self.assertEqual(
+            StoredImage.objects.get(name=post.image.name).references, 1)
@@ -0,0 +1,88 @@
+import json
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import LIMIT_POSTS_ON_PAGE
+
+User = get_user_model()
+
+# Бюджеты страниц общие с тестами pytest (tests/fixtures/fixture_budget.py);
+# здесь берется только наибольшее число SQL-запросов при пустом кэше.
+BUDGET_PATH = os.path.join(
+    os.path.dirname(settings.BASE_DIR), 'tests', 'budgets.json')
+
+
+def query_budgets(path=BUDGET_PATH):
+    with open(path, encoding='utf-8') as file:
+        return {
+            name: budget['queries'] for name, budget in json.load(file).items()
+        }
+
+
+class QueryBudgetTest(TestCase):
+    """Число запросов страницы не зависит от числа постов на ней."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.post = Post.objects.create(
+            author=cls.author, text='Первый пост', group=cls.group)
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ком')
+        cls.urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', args=[cls.group.slug]),
+            'posts:profile': reverse(
+                'posts:profile', args=[cls.author.username]),
+            'posts:post_detail': reverse(
+                'posts:post_detail', args=[cls.post.id]),
+            'posts:follow_index': reverse('posts:follow_index'),
+        }
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            self.authorized_client.get(url)
+        return len(captured)
+
+    def fill_page(self):
+        commenters = [
+            User.objects.create_user(username=f'reader{i}')
+            for i in range(LIMIT_POSTS_ON_PAGE)
+        ]
+        for reader in commenters:
+            Post.objects.create(
+                author=self.author, text='Пост', group=self.group)
+            Comment.objects.create(post=self.post, author=reader, text='Ком')
+
+    def test_query_budget(self):
+        """Запросы укладываются в бюджет и не растут с размером страницы."""
+        budgets = query_budgets()
+        single = {name: self.count_queries(url)
+                  for name, url in self.urls.items()}
+        self.fill_page()
+        for name, url in self.urls.items():
+            with self.subTest(view=name):
+                full = self.count_queries(url)
+                self.assertEqual(full, single[name])
+                self.assertLessEqual(full, budgets[name])
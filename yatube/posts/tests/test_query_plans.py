@@ -0,0 +1,98 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?P<table>\w+)( AS \w+)?$')
+# Справочники, которые читаются целиком намеренно (выбор группы в форме).
+ALLOWED_SCANS = ('posts_group',)
+
+
+class QueryPlanTest(TestCase):
+    """EXPLAIN QUERY PLAN запросов страниц не содержит полных сканов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author, text=f'Пост {i}', group=cls.group)
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Коммент')
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.author.username]),
+            reverse('posts:post_detail', args=[cls.post.id]),
+            reverse('posts:follow_index'),
+            reverse('posts:post_create'),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def full_scans(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            details = [row[-1] for row in cursor.fetchall()]
+        scans = []
+        for detail in details:
+            match = FULL_SCAN.match(detail)
+            if match and match.group('table') not in ALLOWED_SCANS:
+                scans.append(detail)
+        return scans
+
+    def assertNoFullScans(self, captured):
+        for query in captured:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            with self.subTest(sql=sql):
+                self.assertEqual(self.full_scans(sql), [])
+
+    def test_list_and_detail_pages(self):
+        """Страницы со списками и постом читают данные по индексам."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as captured:
+                    first_page = self.authorized_client.get(url)
+                self.assertNoFullScans(captured)
+                page_obj = first_page.context.get('page_obj')
+                if page_obj is None or page_obj.next_cursor is None:
+                    continue
+                with CaptureQueriesContext(connection) as captured:
+                    self.authorized_client.get(
+                        url, {'cursor': page_obj.next_cursor})
+                self.assertNoFullScans(captured)
+
+    def test_write_views(self):
+        """Подписка, отписка и комментарий не сканируют таблицы."""
+        requests = (
+            ('get', reverse('posts:profile_unfollow', args=['author'])),
+            ('get', reverse('posts:profile_follow', args=['author'])),
+            ('post', reverse('posts:add_comment', args=[self.post.id])),
+        )
+        for method, url in requests:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as captured:
+                    getattr(self.authorized_client, method)(
+                        url, {'text': 'Коммент'})
+                self.assertNoFullScans(captured)
@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import fulltext
+from posts.models import Post
+from posts.stemmer import stem
+from posts.utils import LIMIT_POSTS_ON_PAGE
+
+User = get_user_model()
+
+
+class StemmerTest(TestCase):
+    def test_russian_word_forms(self):
+        """Словоформы сводятся к одной основе."""
+        for words in (
+            ('кошка', 'кошки', 'кошками', 'кошкой'),
+            ('бегать', 'бегают', 'бегала'),
+            ('красивый', 'красивая', 'красивыми'),
+            ('ёлка', 'елки'),
+        ):
+            with self.subTest(words=words):
+                self.assertEqual(len({stem(word) for word in words}), 1)
+
+
+class SearchTestMixin:
+    """Общие проверки поиска для обоих бэкендов."""
+    backend = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.often = Post.objects.create(
+            author=cls.user, text='Кот, кот и еще раз кот у собаки')
+        cls.once = Post.objects.create(
+            author=cls.user, text='Кот живет с собакой, садом и машиной')
+        cls.fish = Post.objects.create(
+            author=cls.user, text='Кошки любят рыбу')
+
+    def setUp(self):
+        self.client = Client()
+
+    def found(self, query, page=None):
+        params = {'q': query}
+        if page:
+            params['page'] = page
+        response = self.client.get(reverse('posts:search'), params)
+        page_obj = response.context['page_obj']
+        return [post.pk for post in page_obj] if page_obj else []
+
+    def test_backend(self):
+        self.assertEqual(fulltext.backend(), self.backend)
+
+    def test_word_forms_found(self):
+        """Поиск находит пост по другой словоформе."""
+        self.assertEqual(self.found('кошка'), [self.fish.pk])
+        self.assertEqual(self.found('РЫБОЙ'), [self.fish.pk])
+
+    def test_ranked_and_all_terms_required(self):
+        """Чаще встречающееся слово выше; нужны все слова запроса."""
+        self.assertEqual(self.found('кот'), [self.often.pk, self.once.pk])
+        self.assertEqual(self.found('кот сад'), [self.once.pk])
+        self.assertEqual(self.found('кот рыба'), [])
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.create(author=self.user, text='Жираф')
+        self.assertEqual(self.found('жирафы'), [post.pk])
+        post.text = 'Слон'
+        post.save()
+        self.assertEqual(self.found('жирафы'), [])
+        self.assertEqual(self.found('слоны'), [post.pk])
+        post.delete()
+        self.assertEqual(self.found('слоны'), [])
+
+    def test_pagination(self):
+        """Результаты делятся на страницы."""
+        for number in range(LIMIT_POSTS_ON_PAGE + 2):
+            Post.objects.create(author=self.user, text=f'Пингвин {number}')
+        self.assertEqual(len(self.found('пингвины')), LIMIT_POSTS_ON_PAGE)
+        self.assertEqual(len(self.found('пингвины', page=2)), 2)
+
+    def test_empty_query(self):
+        """Пустой запрос не ищет."""
+        response = self.client.get(reverse('posts:search'), {'q': ' '})
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_rebuild_command(self):
+        """Команда перестраивает индекс с нуля."""
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Проиндексировано постов: 3', out.getvalue())
+        self.assertEqual(self.found('кошка'), [self.fish.pk])
+
+
+class FtsSearchTest(SearchTestMixin, TestCase):
+    backend = 'fts5'
+
+
+@override_settings(POSTS_SEARCH_BACKEND='index')
+class IndexSearchTest(SearchTestMixin, TestCase):
+    backend = 'index'
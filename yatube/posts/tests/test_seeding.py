@@ -0,0 +1,65 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import F, Sum
+from django.test import TestCase, override_settings
+
+from posts import seeding
+from posts.models import (Comment, Follow, Group, Post, Profile,
+                          StoredImage, TimelineEntry)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedBenchTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def seed(self, **options):
+        options = {
+            'users': 40, 'groups': 3, 'posts': 300, 'follows': 5,
+            'comments': 2, 'images': 2, 'image_share': 0.5, 'seed': 7,
+            'batch_size': 64, **options,
+        }
+        call_command('seed_bench', stdout=StringIO(), **options)
+
+    def test_volumes_and_derived_data(self):
+        self.seed()
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertTrue(Comment.objects.exists())
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        self.assertEqual(StoredImage.objects.count(), 2)
+        self.assertEqual(
+            Profile.objects.aggregate(total=Sum('posts_count'))['total'],
+            300
+        )
+        follow = Follow.objects.filter(author__posts__isnull=False).first()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=follow.user, post__author=follow.author).exists())
+
+    def test_comments_follow_their_post(self):
+        self.seed()
+        self.assertFalse(Comment.objects.filter(
+            created__lt=F('post__pub_date')).exists())
+
+    def test_same_seed_same_data(self):
+        """Один seed дает те же тексты и ту же форму графа подписок."""
+        runs = []
+        for _ in range(2):
+            seeder = seeding.Seeder(seed=3, batch_size=50)
+            seeder.users(20)
+            seeder.posts(30)
+            seeder.follows(4)
+            posts = Post.objects.order_by('-pk')[:30]
+            runs.append((
+                [post.text for post in posts],
+                Follow.objects.filter(user__in=seeder.user_ids).count(),
+            ))
+        self.assertEqual(runs[0], runs[1])
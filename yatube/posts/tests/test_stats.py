@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Group, Post, Profile
+
+User = get_user_model()
+
+
+class DenormalizedCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_slug',
+            description='Тестовое описание',
+        )
+
+    def assertCounters(self, user, posts, comments, followers):
+        profile = Profile.objects.get(user=user)
+        self.assertEqual(
+            (profile.posts_count, profile.comments_count,
+             profile.followers_count),
+            (posts, comments, followers)
+        )
+
+    def test_profile_created_with_user(self):
+        """Профиль создается вместе с пользователем."""
+        self.assertCounters(self.user, 0, 0, 0)
+
+    def test_counters_follow_changes(self):
+        """Счетчики меняются при создании и удалении записей."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Коммент')
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        self.assertCounters(self.user, 1, 0, 1)
+        self.assertCounters(self.reader, 0, 1, 0)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        comment.delete()
+        follow.delete()
+        post.delete()
+        self.assertCounters(self.user, 0, 0, 0)
+        self.assertCounters(self.reader, 0, 0, 0)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+
+    def test_group_change_moves_counter(self):
+        """Перенос поста в другую группу переносит счетчик."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group)
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+    def test_recount_command(self):
+        """Команда recount_posts восстанавливает счетчики."""
+        Post.objects.create(author=self.user, text='Пост', group=self.group)
+        Follow.objects.create(user=self.reader, author=self.user)
+        Profile.objects.update(posts_count=0, followers_count=5)
+        Profile.objects.filter(user=self.reader).delete()
+        Group.objects.update(posts_count=7)
+        call_command('recount_posts', stdout=StringIO())
+        self.assertCounters(self.user, 1, 0, 1)
+        self.assertCounters(self.reader, 0, 0, 0)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
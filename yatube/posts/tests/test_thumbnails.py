@@ -0,0 +1,179 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core import jobs
+from core.models import Job
+from posts import thumbnails
+from posts.models import Follow, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+PLACEHOLDER = 'Изображение обрабатывается'
+
+
+def gif(number):
+    """Картинки с разным содержимым: одинаковые хранилище объединит."""
+    buffer = BytesIO()
+    Image.new('RGB', (2, 1), (number, 0, 0)).save(buffer, 'GIF')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailJobsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self):
+        image = SimpleUploadedFile(
+            name='small.gif', content=SMALL_GIF, content_type='image/gif')
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': image}
+        )
+        return Post.objects.get()
+
+    def test_upload_schedules_thumbnails(self):
+        """Сохранение картинки ставит задачу, а не режет ее в запросе."""
+        post = self.create_post()
+        self.assertTrue(Job.objects.filter(
+            kind=thumbnails.JOB_KIND, object_id=post.pk).exists())
+        self.assertIsNone(thumbnails.ready_thumbnail(post.image, '500x150'))
+
+    def test_placeholder_until_thumbnails_ready(self):
+        """До готовности миниатюр страницы показывают заглушку."""
+        post = self.create_post()
+        profile_url = reverse('posts:profile', args=[self.user.username])
+        detail_url = reverse('posts:post_detail', args=[post.pk])
+        for url in (profile_url, detail_url):
+            self.assertContains(self.authorized_client.get(url), PLACEHOLDER)
+        self.assertEqual(jobs.run_pending(), 1)
+        post.refresh_from_db()
+        pages = ((profile_url, '500x150'), (detail_url, '960x339'))
+        for url, geometry in pages:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertNotContains(response, PLACEHOLDER)
+                self.assertContains(
+                    response,
+                    thumbnails.ready_thumbnail(post.image, geometry).url
+                )
+
+    def test_follow_page_keeps_large_thumbnail(self):
+        """Лента подписок показывает миниатюру 960x339, а не 500x150."""
+        post = self.create_post()
+        jobs.run_pending()
+        post.refresh_from_db()
+        follower = User.objects.create_user(username='follower')
+        Follow.objects.create(user=follower, author=self.user)
+        client = Client()
+        client.force_login(follower)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertContains(
+            response, thumbnails.ready_thumbnail(post.image, '960x339').url)
+        self.assertNotContains(
+            response, thumbnails.ready_thumbnail(post.image, '500x150').url)
+
+    def test_edit_without_image_not_scheduled(self):
+        """Правка текста без новой картинки не ставит задачу."""
+        post = self.create_post()
+        jobs.run_pending()
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            data={'text': 'Новый текст'}
+        )
+        self.assertFalse(Job.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailResolverTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user,
+                text=f'Пост {number}',
+                image=SimpleUploadedFile(
+                    name=f'small_{number}.gif',
+                    content=gif(number),
+                    content_type='image/gif'
+                )
+            )
+            for number in range(3)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def images(self):
+        return [post.image for post in Post.objects.all()]
+
+    def names(self, ready):
+        return {
+            image: thumbnail and thumbnail.name
+            for image, thumbnail in ready.items()
+        }
+
+    def test_batch_lookup(self):
+        """Миниатюры страницы берутся одним запросом, затем из кэша."""
+        for post in self.posts[:2]:
+            thumbnails.generate(post.pk)
+        cache.clear()
+        images = self.images()
+        with self.assertNumQueries(1):
+            ready = self.names(
+                thumbnails.ready_thumbnails(images, '500x150'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(
+                thumbnails.ready_thumbnails(images, '500x150')), ready)
+        self.assertEqual(sum(1 for name in ready.values() if name), 2)
+        for image in images:
+            with self.subTest(image=image.name):
+                thumbnail = thumbnails.ready_thumbnail(image, '500x150')
+                self.assertEqual(
+                    ready[image.name], thumbnail and thumbnail.name)
+
+    def test_warm_thumbnails_command(self):
+        """Команда создает миниатюры всех размеров только там, где их нет."""
+        thumbnails.generate(self.posts[0].pk)
+        out = StringIO()
+        call_command('warm_thumbnails', workers=1, stdout=out)
+        self.assertIn('проверено 3, обработано 2', out.getvalue())
+        self.assertEqual(
+            thumbnails.missing_thumbnails(Post.objects.all()), [])
@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+from posts.utils import CursorPaginator
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+
+    def feed_posts(self):
+        return list(timeline.feed(self.reader).order_by('-feed_date', '-pk'))
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed_posts(), [self.old_post])
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает в ленты подписчиков при записи."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(self.feed_posts(), [post, self.old_post])
+
+    def test_fan_out_to_many_followers(self):
+        """Рассылка большой пачкой укладывается в лимиты СУБД."""
+        User.objects.bulk_create(
+            User(username=f'follower{number}') for number in range(600))
+        followers = User.objects.filter(username__startswith='follower')
+        Follow.objects.bulk_create(
+            Follow(user=user, author=self.author) for user in followers)
+        post = Post.objects.create(author=self.author, text='Всем')
+        self.assertEqual(post.timeline_entries.count(), 600)
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        follow.delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed_posts(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_read_on_demand(self):
+        """Посты авторов с большим числом подписчиков читаются из Post."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed_posts(), [post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_below_limit_again(self):
+        """Когда автор снова опускается до лимита, его посты и подписки
+        времен «знаменитости» остаются в ленте."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+        Follow.objects.get(user=other).delete()
+        self.assertEqual(self.feed_posts(), [post, self.old_post])
+
+    @override_settings(TIMELINE_BACKFILL_LIMIT=1)
+    def test_backfill_only_recent_posts(self):
+        """При подписке в ленту попадают только последние
+        TIMELINE_BACKFILL_LIMIT постов автора."""
+        post = Post.objects.create(author=self.author, text='Новый')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed_posts(), [post])
+
+    def test_feed_cursor_pagination(self):
+        """Лента подписок листается курсором по feed_date."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый')
+        paginator = CursorPaginator(
+            timeline.feed(self.reader), 1, date_field='feed_date')
+        first_page = paginator.get_page(None)
+        last_page = paginator.get_page(first_page.next_cursor)
+        self.assertEqual(list(first_page), [post])
+        self.assertEqual(list(last_page), [self.old_post])
+        self.assertIsNone(last_page.next_cursor)
@@ -0,0 +1,174 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from posts import feeds, fulltext, versions
+from posts.models import (
+    Comment, Follow, Group, Post, Profile, TimelineEntry
+)
+
+User = get_user_model()
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Красивые книги')
+        cls.pub_date = timezone.now() - timedelta(days=30)
+        Post.objects.filter(pk=cls.post.pk).update(pub_date=cls.pub_date)
+        Post.objects.create(author=cls.reader, text='Без группы')
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def clear(self):
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+    def assert_restored(self):
+        post = Post.objects.select_related('author', 'group').get(
+            pk=self.post.pk)
+        self.assertEqual(post.text, 'Красивые книги')
+        self.assertEqual(post.author.username, 'author')
+        self.assertEqual(post.group.slug, 'group')
+        self.assertEqual(post.pub_date, self.pub_date)
+        self.assertEqual(Post.objects.filter(group=None).count(), 1)
+        comment = Comment.objects.get(pk=self.comment.pk)
+        self.assertEqual(
+            (comment.post_id, comment.author.username, comment.created),
+            (post.pk, 'reader', self.comment.created)
+        )
+        reader = User.objects.get(username='reader')
+        self.assertTrue(Follow.objects.filter(
+            user=reader, author=post.author).exists())
+        self.assertFalse(reader.has_usable_password())
+
+    def assert_derived(self):
+        """Счетчики, лента подписок и поиск пересчитаны после загрузки."""
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.author.profile.posts_count, 1)
+        self.assertEqual(post.author.profile.followers_count, 1)
+        self.assertEqual(post.group.posts_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user__username='reader', post=post).exists())
+        self.assertEqual(list(fulltext.search('книга')[0:10]), [post])
+
+    def test_ndjson_round_trip(self):
+        path = os.path.join(self.tmp.name, 'posts.ndjson')
+        call_command('export_posts', path, stdout=StringIO())
+        with open(path, encoding='utf-8') as file:
+            self.assertEqual(len(file.readlines()), 5)
+        self.clear()
+        out = StringIO()
+        call_command('import_posts', path, stdout=out)
+        self.assertIn('post: 2', out.getvalue())
+        self.assert_restored()
+        self.assert_derived()
+
+    def test_csv_round_trip(self):
+        call_command(
+            'export_posts', self.tmp.name, format='csv', stdout=StringIO())
+        self.assertTrue(
+            os.path.exists(os.path.join(self.tmp.name, 'posts.csv')))
+        self.clear()
+        call_command('import_posts', self.tmp.name, stdout=StringIO())
+        self.assert_restored()
+        self.assert_derived()
+
+    def test_import_is_idempotent_and_batched(self):
+        """Повторная загрузка не дублирует записи, пачки любого размера."""
+        path = os.path.join(self.tmp.name, 'posts.ndjson')
+        call_command('export_posts', path, stdout=StringIO())
+        for _ in range(2):
+            call_command(
+                'import_posts', path, batch_size=1, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assert_restored()
+
+    def export(self):
+        path = os.path.join(self.tmp.name, 'posts.ndjson')
+        call_command('export_posts', path, stdout=StringIO())
+        return path
+
+    def test_import_into_site_with_same_ids(self):
+        """Занятые чужими постами id заменяются, комментарий остается у
+        своего поста, повторная загрузка ничего не дублирует."""
+        path = self.export()
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        self.clear()
+        local = User.objects.create_user(username='local')
+        local_posts = [
+            Post.objects.create(id=pk, author=local, text='Местный пост')
+            for pk in post_ids
+        ]
+        for _ in range(2):
+            call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 4)
+        for post in local_posts:
+            post.refresh_from_db()
+            self.assertEqual(post.text, 'Местный пост')
+        imported = Post.objects.get(text='Красивые книги')
+        self.assertNotIn(imported, local_posts)
+        comment = Comment.objects.get()
+        self.assertEqual(comment.post, imported)
+        self.assertEqual(comment.text, 'Комментарий')
+
+    def test_imported_posts_reach_local_followers(self):
+        """Новые посты автора попадают в ленту его местных подписчиков."""
+        path = self.export()
+        self.clear()
+        author = User.objects.create_user(username='author')
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=fan, author=author)
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=fan, post__text='Красивые книги').exists())
+
+    def test_import_keeps_unrelated_cache(self):
+        """Загрузка меняет версии лент, а не очищает весь кэш."""
+        path = self.export()
+        key = feeds.feed_key('group', 'group')
+        version = versions.get_versions([key])[key]
+        cache.set('unrelated', 'value')
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(cache.get('unrelated'), 'value')
+        self.assertNotEqual(versions.get_versions([key])[key], version)
+
+    def test_import_refreshes_only_loaded_data(self):
+        """Загрузка пересчитывает только своих пользователей, группы и
+        посты, остальная база не перебирается."""
+        path = self.export()
+        self.clear()
+        other = User.objects.create_user(username='other')
+        Post.objects.create(author=other, text='Чужие книги')
+        Profile.objects.filter(user=other).update(posts_count=42)
+        fulltext.rebuild()
+        fulltext.remove_post(Post.objects.get(author=other).pk)
+        call_command('import_posts', path, stdout=StringIO())
+        self.assert_derived()
+        self.assertEqual(
+            Profile.objects.get(user=other).posts_count, 42)
+        self.assertEqual(
+            [post.text for post in fulltext.search('книга')[0:10]],
+            ['Красивые книги']
+        )
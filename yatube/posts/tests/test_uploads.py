@@ -0,0 +1,206 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import thumbnails, uploads
+from posts.models import Post, StoredImage
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_bytes(size, image_format='JPEG', mode='RGB', **options):
+    buffer = BytesIO()
+    Image.new(mode, size, 'red').save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def animation_bytes(size, count):
+    """GIF из count разных кадров: одинаковые Pillow склеил бы в один."""
+    frames = [
+        Image.new('RGB', size, (number, 255 - number, 0))
+        for number in range(count)
+    ]
+    buffer = BytesIO()
+    frames[0].save(
+        buffer, 'GIF', save_all=True, append_images=frames[1:], duration=40)
+    return buffer.getvalue()
+
+
+def exif_bytes():
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera'
+    exif[0x0112] = 6
+    return exif.tobytes()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POST_IMAGE_MAX_SIDE=400,
+    POST_IMAGE_MAX_PIXELS=1_000_000,
+)
+class UploadNormalizeTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self, name, content):
+        post = Post(author=self.user, text='Пост')
+        post.image.save(name, ContentFile(content))
+        return post
+
+    def stored_image(self, post):
+        post.refresh_from_db()
+        with post.image.open('rb') as file:
+            image = Image.open(file)
+            image.load()
+        return image
+
+    def test_large_image_downscaled_without_exif(self):
+        """Крупная картинка уменьшается, EXIF удаляется, ориентация учтена."""
+        post = self.create_post(
+            'camera.jpg', image_bytes((800, 600), exif=exif_bytes()))
+        old_name = post.image.name
+        thumbnails.generate(post.pk)
+        image = self.stored_image(post)
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (300, 400))
+        self.assertNotIn('exif', image.info)
+        self.assertFalse(StoredImage.objects.filter(name=old_name).exists())
+
+    def test_foreign_format_reencoded(self):
+        """Картинка в формате не из KEEP_FORMATS пережимается в JPEG."""
+        post = self.create_post('scan.bmp', image_bytes((100, 50), 'BMP'))
+        thumbnails.generate(post.pk)
+        image = self.stored_image(post)
+        self.assertEqual(image.format, 'JPEG')
+        self.assertTrue(post.image.name.endswith('.jpg'))
+
+    def test_transparent_image_kept_as_png(self):
+        """Прозрачность сохраняется: такая картинка остается PNG."""
+        post = self.create_post(
+            'logo.png', image_bytes((600, 100), 'PNG', mode='RGBA'))
+        thumbnails.generate(post.pk)
+        image = self.stored_image(post)
+        self.assertEqual(image.format, 'PNG')
+        self.assertEqual(image.size, (400, 67))
+
+    def test_transparent_image_without_exif(self):
+        """EXIF удаляется и из PNG; повторная обработка файл не меняет."""
+        post = self.create_post('photo.png', image_bytes(
+            (200, 100), 'PNG', mode='RGBA', exif=exif_bytes()))
+        thumbnails.generate(post.pk)
+        image = self.stored_image(post)
+        self.assertEqual(image.format, 'PNG')
+        self.assertEqual(image.size, (100, 200))
+        self.assertNotIn('exif', image.info)
+        name = post.image.name
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, name)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=2_000_000)
+    def test_animation_keeps_frames(self):
+        """Уменьшенная анимация GIF сохраняет все кадры."""
+        frames = [
+            Image.new('RGB', (800, 600), color)
+            for color in ('red', 'green', 'blue')
+        ]
+        buffer = BytesIO()
+        frames[0].save(
+            buffer, 'GIF', save_all=True, append_images=frames[1:],
+            duration=80, loop=0)
+        post = self.create_post('anim.gif', buffer.getvalue())
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        with post.image.open('rb') as file, Image.open(file) as image:
+            self.assertEqual(image.format, 'GIF')
+            self.assertEqual(image.size, (400, 300))
+            self.assertEqual(image.n_frames, 3)
+            self.assertEqual(image.info['duration'], 80)
+
+    def test_new_upload_not_overwritten(self):
+        """Картинка, загруженная во время обработки, не затирается."""
+        post = self.create_post('camera.jpg', image_bytes((800, 600)))
+        new_post = self.create_post('new.jpg', image_bytes((50, 50)))
+        normalize = uploads.normalize
+        normalized = []
+
+        def normalize_and_upload(post):
+            replaced = normalize(post)
+            normalized.append(post.image.name)
+            Post.objects.filter(pk=post.pk).update(image=new_post.image.name)
+            return replaced
+
+        with mock.patch.object(uploads, 'normalize', normalize_and_upload):
+            thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, new_post.image.name)
+        self.assertFalse(
+            StoredImage.objects.filter(name=normalized[0]).exists())
+
+    def test_animation_frames_count_to_pixels(self):
+        """Лимит точек считается по всем кадрам анимации."""
+        content = animation_bytes((100, 100), 150)
+        upload = SimpleUploadedFile('long.gif', content, 'image/gif')
+        response = self.authorized_client.post(
+            reverse('posts:post_create'), data={'text': 'Т', 'image': upload})
+        self.assertFormError(
+            response, 'form', 'image',
+            'Слишком длинная анимация: при 100×100 точек допустимо '
+            'не больше 100 кадров.'
+        )
+        post = self.create_post('long.gif', content)
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        self.assertFalse(post.image)
+
+    def test_small_image_untouched(self):
+        """Картинка в лимитах без EXIF не перекодируется."""
+        content = image_bytes((100, 100))
+        post = self.create_post('small.jpg', content)
+        name = post.image.name
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, name)
+        with post.image.open('rb') as file:
+            self.assertEqual(file.read(), content)
+
+    def test_form_rejects_too_many_pixels(self):
+        """Форма отклоняет картинку сверх лимита точек."""
+        upload = SimpleUploadedFile(
+            'huge.png', image_bytes((2000, 1000), 'PNG'), 'image/png')
+        response = self.authorized_client.post(
+            reverse('posts:post_create'), data={'text': 'Т', 'image': upload})
+        self.assertFormError(
+            response, 'form', 'image',
+            'Слишком большое изображение: 2000×1000 точек.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1000)
+    def test_worker_drops_too_many_pixels(self):
+        """Картинка сверх лимита, миновавшая форму, удаляется воркером."""
+        post = self.create_post('huge.jpg', image_bytes((100, 100)))
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        self.assertFalse(post.image)
@@ -0,0 +1,116 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import thumbnails, variants
+from posts.models import ImageVariant, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def jpeg(width, height):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, 'JPEG')
+    return ContentFile(buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageVariantsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post(author=self.user, text='Пост с картинкой')
+        self.post.image.save('photo.jpg', jpeg(600, 400))
+
+    def test_variants_generated_with_sizes(self):
+        """Варианты создаются по слотам и форматам, вес записан."""
+        thumbnails.generate(self.post.pk)
+        formats = variants.available_formats()
+        self.assertIn('JPEG', formats)
+        expected = {
+            (geometry, image_format, size)
+            for geometry in thumbnails.SIZES
+            for size in variants.variant_sizes(geometry, 600)
+            for image_format in formats
+        }
+        found = set()
+        for variant in ImageVariant.objects.filter(post=self.post):
+            found.add((
+                variant.geometry, variant.format,
+                (variant.width, variant.height)
+            ))
+            self.assertEqual(variant.size, variant.file.size)
+            self.assertEqual(variant.source, self.post.image.name)
+        self.assertEqual(found, expected)
+        self.assertNotIn((1000, 300), variants.variant_sizes('500x150', 600))
+
+    def test_new_image_replaces_variants(self):
+        """Новая картинка заменяет варианты, старые файлы удаляются."""
+        thumbnails.generate(self.post.pk)
+        old = ImageVariant.objects.filter(post=self.post).first()
+        storage, old_name = old.file.storage, old.file.name
+        self.post.image.save('other.jpg', jpeg(800, 600))
+        self.assertEqual(variants.missing([self.post]), [self.post])
+        thumbnails.generate(self.post.pk)
+        self.assertFalse(storage.exists(old_name))
+        self.assertFalse(ImageVariant.objects.exclude(
+            source=self.post.image.name).exists())
+        self.assertEqual(variants.missing([self.post]), [])
+
+    def test_picture_sources_on_pages(self):
+        """Страницы отдают <picture> с source по форматам."""
+        thumbnails.generate(self.post.pk)
+        ImageVariant.objects.create(
+            post=self.post, source=self.post.image.name, geometry='500x150',
+            format='WEBP', width=500, height=150,
+            file='posts/variants/card.webp', size=1
+        )
+        self.post.save()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, '<picture>')
+        content = response.content.decode()
+        self.assertLess(
+            content.index('type="image/webp"'),
+            content.index('type="image/jpeg"')
+        )
+        self.assertIn('card.webp 500w', content)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        self.assertContains(response, '960w')
+
+    def test_savings_report(self):
+        """Экономия считается к JPEG того же поста, слота и ширины."""
+        for image_format, size, width in (
+            ('JPEG', 1000, 500), ('WEBP', 700, 500), ('JPEG', 400, 250)
+        ):
+            ImageVariant.objects.create(
+                post=self.post, source=self.post.image.name,
+                geometry='500x150', format=image_format, width=width,
+                height=150, file=f'posts/variants/{width}.x', size=size
+            )
+        report = {row['format']: row for row in variants.savings()}
+        self.assertEqual(report['WEBP']['saved'], 30.0)
+        self.assertEqual(report['JPEG']['bytes'], 1400)
+        out = StringIO()
+        call_command('image_variant_stats', stdout=out)
+        self.assertIn('экономия к JPEG: 30.0%', out.getvalue())
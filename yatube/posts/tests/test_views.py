@@ -1,14 +1,19 @@
 import shutil
 import tempfile
+import warnings
 
 from django import forms
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.core.cache import cache
+from django.core.cache import CacheKeyWarning, cache
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase, override_settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.urls import reverse
 
+from posts import feeds
 from posts.models import Comment, Group, Post, Follow
 
 User = get_user_model()
@@ -107,6 +112,7 @@ class PostViewTest(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -210,32 +216,137 @@ class PostViewTest(TestCase):
                 response = self.authorized_client.get(rev_template)
                 self.assertEqual(len(
                     response.context['page_obj']), NUM_POSTS_FIRST_PAGE)
+                next_cursor = response.context['page_obj'].next_cursor
                 response_for_last = self.authorized_client.get(
-                    f"{rev_template}{'?page=2'}")
+                    rev_template, {'cursor': next_cursor})
                 self.assertEquals(len(
                     response_for_last.context['page_obj']),
                     NUM_POSTS_LAST_PAGE
                 )
+                self.assertIsNone(
+                    response_for_last.context['page_obj'].next_cursor)
+
+    def test_paginator_previous_cursor(self):
+        """Курсор назад возвращает на первую страницу."""
+        rev_template = reverse(
+            self.group_list[1], kwargs=self.group_list[2])
+        first_page = self.guest_client.get(rev_template).context['page_obj']
+        last_page = self.guest_client.get(
+            rev_template, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(last_page.number, 2)
+        response = self.guest_client.get(
+            rev_template, {'cursor': last_page.previous_cursor})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 1)
+        self.assertEqual(list(page_obj), list(first_page))
+        self.assertIsNone(page_obj.previous_cursor)
+
+    def test_paginator_broken_cursor(self):
+        """Битый курсор отдает первую страницу."""
+        response = self.guest_client.get(
+            reverse(self.group_list[1], kwargs=self.group_list[2]),
+            {'cursor': 'broken'}
+        )
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(
+            len(response.context['page_obj']), NUM_POSTS_FIRST_PAGE)
 
     def test_index_cache_correct(self):
-        """Кэш index."""
+        """Кэш index: повторный запрос из кэша, изменения видны сразу."""
         index = reverse(self.index[1])
+        cache.clear()
+        content_before = self.guest_client.get(index).content
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.guest_client.get(index).content, content_before)
         cache_post = Post.objects.create(author=self.user, text='Пост кэш')
-        content_after_create = self.authorized_client.get(index).content
+        content_after_create = self.guest_client.get(index).content
+        self.assertIn('Пост кэш'.encode(), content_after_create)
         cache_post.delete()
-        content_after_delete = self.authorized_client.get(index).content
-        cache.clear()
-        content_after_clear = self.authorized_client.get(index).content
-        self.assertEqual(
-            content_after_delete, content_after_create
-        )
-        self.assertNotEqual(
-            content_after_delete, content_after_clear
+        content_after_delete = self.guest_client.get(index).content
+        self.assertNotIn('Пост кэш'.encode(), content_after_delete)
+
+    def test_group_and_profile_cache_invalidated(self):
+        """Правка поста сбрасывает кэш страниц группы и автора."""
+        urls = (
+            reverse(self.group_list[1], kwargs=self.group_list[2]),
+            reverse(self.profile[1], kwargs=self.profile[2]),
         )
+        for url in urls:
+            self.guest_client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Измененный текст'
+        post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.guest_client.get(url), 'Измененный текст')
+
+    def test_group_and_author_delete_invalidate_cache(self):
+        """Удаление группы или автора сбрасывает кэш лент."""
+        index = reverse(self.index[1])
+        group_url = reverse(self.group_list[1], kwargs=self.group_list[2])
+        profile_url = reverse(self.profile[1], kwargs=self.profile[2])
+        for url in (index, group_url, profile_url):
+            self.guest_client.get(url)
+        Group.objects.get(pk=self.group.pk).delete()
+        self.assertNotContains(self.guest_client.get(index), group_url)
+        self.assertEqual(self.guest_client.get(group_url).status_code, 404)
+        User.objects.get(pk=self.user.pk).delete()
+        self.assertNotContains(self.guest_client.get(index), 'Тестовый пост')
+        self.assertEqual(self.guest_client.get(profile_url).status_code, 404)
+
+    def test_feed_cache_keeps_headers(self):
+        """Страница из кэша отдается с заголовками представления, ответ с
+        cookie не кэшируется."""
+        calls = []
+
+        @feeds.cached_feed_page(lambda: feeds.feed_key('test'))
+        def view(request):
+            calls.append(request)
+            response = HttpResponse(
+                'Лента', content_type='text/plain; charset=utf-8')
+            response['Content-Language'] = 'ru'
+            response['Cache-Control'] = 'private'
+            if 'cookie' in request.GET:
+                response.set_cookie('name', 'value')
+            return response
+
+        def get(path):
+            request = RequestFactory().get(path)
+            request.user = AnonymousUser()
+            return view(request)
+
+        get('/feed/')
+        response = get('/feed/')
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(response.content.decode(), 'Лента')
+        self.assertEqual(
+            response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(response['Content-Language'], 'ru')
+        self.assertEqual(response['Cache-Control'], 'private')
+        get('/feed/?cookie=1')
+        response = get('/feed/?cookie=1')
+        self.assertEqual(len(calls), 3)
+        self.assertIn('name', response.cookies)
+
+    def test_feed_keys_valid_for_any_username(self):
+        """Не-ASCII и длинный username не дают недопустимых ключей кэша."""
+        user = User.objects.create_user(username='Автор' + 'я' * 140)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            Post.objects.create(author=user, text='Пост автора')
+            response = self.guest_client.get(
+                reverse(self.profile[1], args=[user.username]))
+        self.assertContains(response, 'Пост автора')
+        self.assertFalse([
+            warning for warning in caught
+            if issubclass(warning.category, CacheKeyWarning)
+        ])
 
     def test_profile_follow(self):
         """Проверка не/отображения поста на странице подписки."""
-        Follow.objects.create(user=self.user, author=self.author_f)
         Post.objects.create(
             text='Тестовый пост подписки',
             author=self.author_f
@@ -243,12 +354,21 @@ class PostViewTest(TestCase):
         response = self.authorized_client.get(reverse(self.follow_index[1]))
         len_correct = len(response.context['page_obj'])
         self.assertEqual(
-            response.context['page_obj'].object_list[1].author.id,
+            response.context['page_obj'].object_list[0].author.id,
             self.author_f.id)
         response = self.authorized_client1.get(reverse(self.follow_index[1]))
         self.assertNotEqual(
             len(response.context['page_obj']), len_correct)
 
+    def test_follow_unique(self):
+        """Повторная подписка на того же автора не создается."""
+        Follow.objects.get_or_create(user=self.user, author=self.author_f)
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Follow.objects.create(user=self.user, author=self.author_f)
+        self.assertEqual(Follow.objects.filter(
+            user=self.user, author=self.author_f).count(), 1)
+
     def test_following(self):
         """Проверка подписки."""
         follower = Follow.objects.filter(user=self.user, author=self.author_f)
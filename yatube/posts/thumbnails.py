@@ -0,0 +1,156 @@
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import jobs, metrics, prometheus
+
+from . import dedup, uploads, variants
+from .models import Post
+
+JOB_KIND: str = 'posts.thumbnails'
+
+# Все размеры, которые используют шаблоны постов
+SIZES = {
+    '500x150': {'crop': 'center', 'upscale': True},
+    '960x339': {'crop': 'center', 'upscale': True},
+}
+
+
+class Backend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, умеющий искать миниатюру без генерации."""
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Миниатюра с тем же именем, что выдал бы get_thumbnail."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def cached_thumbnail(self, file_, geometry_string, **options):
+        """Готовая миниатюра из KV-хранилища или None."""
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, **options))
+
+
+backend = Backend()
+GENERATION_SECONDS = prometheus.histogram(
+    'yatube_thumbnail_generation_seconds',
+    'Время подготовки миниатюр и вариантов картинки поста.')
+
+
+@metrics.timer('thumb')
+def ready_thumbnail(image, geometry):
+    """Готовая миниатюра картинки поста; None, пока ее не сделал воркер."""
+    if not image:
+        return None
+    return backend.cached_thumbnail(image, geometry, **SIZES[geometry])
+
+
+def _get_many_raw(keys):
+    """Сырые значения KV-хранилища cached_db: get_many к кэшу, затем БД.
+
+    Повторяет _get_raw хранилища, включая запоминание промахов в кэше.
+    """
+    kv_cache = default.kvstore.cache
+    values = kv_cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missing).values_list('key', 'value'))
+        fetched = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kv_cache.set_many(fetched, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(fetched)
+    return {
+        key: value for key, value in values.items() if value != EMPTY_VALUE
+    }
+
+
+@metrics.timer('thumb')
+def ready_thumbnails(images, geometry):
+    """Готовые миниатюры для списка картинок: {имя картинки: миниатюра}.
+
+    Метаданные всех миниатюр берутся одним get_many (и одним запросом к БД
+    для промахов) вместо отдельного обращения на каждую карточку.
+    """
+    files = {
+        image.name: backend.thumbnail_file(image, geometry, **SIZES[geometry])
+        for image in images if image
+    }
+    if not hasattr(default.kvstore, 'cache'):
+        return {
+            name: default.kvstore.get(thumbnail)
+            for name, thumbnail in files.items()
+        }
+    keys = {
+        add_prefix(thumbnail.key): name for name, thumbnail in files.items()
+    }
+    values = _get_many_raw(list(keys)) if keys else {}
+    thumbnails = dict.fromkeys(files)
+    for key, value in values.items():
+        thumbnails[keys[key]] = deserialize_image_file(value)
+    return thumbnails
+
+
+def missing_thumbnails(posts):
+    """Посты с картинкой, у которых нет части миниатюр или вариантов."""
+    posts = [post for post in posts if post.image]
+    images = [post.image for post in posts]
+    ready = [ready_thumbnails(images, geometry) for geometry in SIZES]
+    without_variants = set(variants.missing(posts))
+    return [
+        post for post in posts
+        if post in without_variants
+        or not all(thumbnails[post.image.name] for thumbnails in ready)
+    ]
+
+
+def schedule(post):
+    """Ставит генерацию миниатюр поста в фоновую очередь."""
+    if post.image:
+        jobs.enqueue(JOB_KIND, post.pk)
+
+
+@jobs.handler(JOB_KIND)
+def generate(post_id):
+    """Пережимает картинку, готовит миниатюры и варианты для карточек."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    old_name = post.image.name
+    with metrics.timer('thumb_generate', GENERATION_SECONDS):
+        normalized = uploads.normalize(post)
+        if post.image:
+            for geometry, options in SIZES.items():
+                backend.get_thumbnail(post.image, geometry, **options)
+        variants.generate(post, SIZES)
+    if normalized and not _replace_image(post, old_name):
+        return
+    # Новая дата изменения меняет ключ карточки, сигнал сбрасывает ленты
+    post.save(update_fields=['updated'])
+
+
+def _replace_image(post, old_name):
+    """Записывает пережатый файл, только если картинку поста не сменили
+    за время обработки: у новой картинки своя задача."""
+    new_name = post.image.name
+    replaced = Post.objects.filter(pk=post.pk, image=old_name).update(
+        image=new_name)
+    # Сигналы при update не срабатывают, ссылки на файлы ведутся здесь
+    dedup.acquire(new_name)
+    if replaced:
+        dedup.release(old_name)
+    else:
+        dedup.release(new_name)
+    return bool(replaced)
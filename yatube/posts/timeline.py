@@ -0,0 +1,144 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+
+from .models import Follow, Post, Profile, TimelineEntry
+
+FANOUT_BATCH_SIZE: int = 1000
+
+
+def fanout_limit():
+    """Число подписчиков, начиная с которого посты автора не рассылаются."""
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', 5000)
+
+
+def backfill_limit():
+    """Сколько последних постов автора кладется в ленту при подписке."""
+    return getattr(settings, 'TIMELINE_BACKFILL_LIMIT', 1000)
+
+
+def is_celebrity(author_id):
+    return Profile.objects.filter(
+        user_id=author_id, followers_count__gt=fanout_limit()).exists()
+
+
+def _bulk_insert(entries):
+    # batch_size не передается: Django сам ограничит пачку лимитами СУБД
+    # (в SQLite не больше 500 строк в одном INSERT).
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Кладет новый пост в ленты подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    batch = []
+    for user_id in follower_ids.iterator(chunk_size=FANOUT_BATCH_SIZE):
+        batch.append(TimelineEntry(
+            user_id=user_id, post_id=post.pk, pub_date=post.pub_date))
+        if len(batch) == FANOUT_BATCH_SIZE:
+            _bulk_insert(batch)
+            batch = []
+    _bulk_insert(batch)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk').values_list('pk', 'pub_date')
+    _bulk_insert([
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts[:backfill_limit()]
+    ])
+
+
+def prune(user_id, author_id):
+    """Убирает посты автора из ленты после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def _insert_for_author(cursor, author_id):
+    """INSERT ... SELECT последних backfill_limit() постов автора в ленты
+    всех его подписчиков; уже лежащие в лентах посты пропускаются."""
+    entry = TimelineEntry._meta.db_table
+    oldest = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date').values_list('pub_date', flat=True)
+    oldest = list(oldest[backfill_limit() - 1:backfill_limit()])
+    since, params = '', [author_id]
+    if oldest:
+        since = 'AND p.pub_date >= %s '
+        params.append(connection.ops.adapt_datetimefield_value(oldest[0]))
+    cursor.execute(
+        f'INSERT INTO {entry} (user_id, post_id, pub_date) '
+        f'SELECT f.user_id, p.id, p.pub_date '
+        f'FROM {Follow._meta.db_table} f '
+        f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+        f'WHERE f.author_id = %s {since}'
+        f'AND NOT EXISTS (SELECT 1 FROM {entry} e '
+        f'WHERE e.user_id = f.user_id AND e.post_id = p.id)',
+        params
+    )
+    return cursor.rowcount
+
+
+def rebuild(author_ids=None):
+    """Заполняет ленты по подпискам, как backfill() для каждой.
+
+    Нужен после массовой загрузки, когда сигналы не срабатывали. Один
+    INSERT ... SELECT на автора: в ленты его подписчиков попадают последние
+    backfill_limit() постов. author_ids ограничивает пересчет этими
+    авторами. Авторы с огромным числом подписчиков пропускаются.
+    Возвращает число добавленных записей.
+    """
+    follows = Follow.objects.exclude(
+        author__profile__followers_count__gt=fanout_limit())
+    if author_ids is not None:
+        follows = follows.filter(author_id__in=list(author_ids))
+    author_ids = list(follows.order_by('author_id').values_list(
+        'author_id', flat=True).distinct())
+    added = 0
+    with connection.cursor() as cursor:
+        for author_id in author_ids:
+            added += _insert_for_author(cursor, author_id)
+    return added
+
+
+def follower_removed(author_id):
+    """Вызывается после отписки от автора.
+
+    Пока подписчиков больше fanout_limit(), посты автора не рассылаются, а
+    новые подписки не получают backfill: feed() подмешивает его посты при
+    чтении. Когда после отписки автор опускается до лимита, подмешивание
+    прекращается, поэтому ленты всех его подписчиков заполняются заново.
+    """
+    count = Profile.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True).first()
+    if count != fanout_limit():
+        return 0
+    with connection.cursor() as cursor:
+        return _insert_for_author(cursor, author_id)
+
+
+def feed(user):
+    """Лента подписок с полем feed_date для курсорной пагинации.
+
+    Обычно это диапазонное чтение по индексу (user, pub_date) таблицы
+    ленты. Посты авторов с огромным числом подписчиков не рассылаются
+    при записи, а подмешиваются при чтении.
+    """
+    celebrity_ids = list(Follow.objects.filter(
+        user=user,
+        author__profile__followers_count__gt=fanout_limit()
+    ).values_list('author_id', flat=True))
+    if not celebrity_ids:
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'))
+    entries = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(pk__in=entries) | Q(author_id__in=celebrity_ids)
+    ).annotate(feed_date=F('pub_date'))
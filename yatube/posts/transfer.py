@@ -0,0 +1,403 @@
+"""Выгрузка и загрузка групп, постов, комментариев и подписок.
+
+Форматы: NDJSON (одна запись на строку с полем type) и CSV (по файлу на
+таблицу в каталоге). Выгрузка читает таблицы через iterator(), загрузка
+копит записи пачками и пишет их bulk_create в транзакциях, так что память
+зависит только от числа разных авторов и групп. Пользователи и группы
+связываются по username и slug. Посты и комментарии сохраняют свои id, если
+те свободны; занятый чужой записью id заменяется новым (см. Loader.place).
+Сигналы при bulk_create не срабатывают: поиск и ссылки на файлы ведутся
+пачкой в Loader.load_post, остальные производные данные пересчитываются
+в refresh() по загруженным пользователям и группам.
+"""
+import contextlib
+import csv
+import json
+import os
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from . import counters, dedup, feeds, fulltext, stats, timeline
+from .models import Comment, Follow, Group, Post, Profile
+
+User = get_user_model()
+
+CHUNK_SIZE: int = 2000
+# Значений в одном IN при сбросе кэша по авторам.
+LOOKUP_CHUNK: int = 500
+FORMATS = ('ndjson', 'csv')
+
+# Таблицы в порядке зависимостей: поля в файле и пути для values_list.
+TABLES = {
+    'group': (
+        ('slug', 'title', 'description'),
+        ('slug', 'title', 'description'),
+    ),
+    'post': (
+        ('id', 'author', 'group', 'text', 'pub_date', 'updated', 'image'),
+        ('id', 'author__username', 'group__slug', 'text', 'pub_date',
+         'updated', 'image'),
+    ),
+    'comment': (
+        ('id', 'post', 'author', 'text', 'created'),
+        ('id', 'post_id', 'author__username', 'text', 'created'),
+    ),
+    'follow': (
+        ('user', 'author'),
+        ('user__username', 'author__username'),
+    ),
+}
+MODELS = {'group': Group, 'post': Post, 'comment': Comment, 'follow': Follow}
+# Поля, по которым запись из файла узнается в БД под другим id.
+NATURAL_KEYS = {
+    'post': ('author_id', 'pub_date'),
+    'comment': ('post_id', 'author_id', 'created'),
+}
+
+
+def csv_path(directory, table):
+    return os.path.join(directory, f'{table}s.csv')
+
+
+def _chunks(values, size=LOOKUP_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _next_id(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_rows(table, chunk_size=CHUNK_SIZE):
+    """Записи таблицы словарями в порядке pk; курсор читает пачками."""
+    names, paths = TABLES[table]
+    rows = MODELS[table].objects.order_by('pk').values_list(*paths)
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(names, map(_plain, row)))
+
+
+def _counted(table, rows, chunk_size, progress):
+    count = 0
+    for count, row in enumerate(rows, 1):
+        yield row
+        if progress is not None and count % chunk_size == 0:
+            progress(table, count)
+    if progress is not None:
+        progress(table, count)
+
+
+def write_ndjson(stream, chunk_size=CHUNK_SIZE, progress=None):
+    """Пишет все таблицы в поток NDJSON; progress(table, count)."""
+    for table in TABLES:
+        rows = export_rows(table, chunk_size)
+        for row in _counted(table, rows, chunk_size, progress):
+            stream.write(json.dumps(
+                {'type': table, **row}, ensure_ascii=False) + '\n')
+
+
+def write_csv(directory, chunk_size=CHUNK_SIZE, progress=None):
+    """Пишет каждую таблицу в свой CSV-файл каталога."""
+    os.makedirs(directory, exist_ok=True)
+    for table, (names, _) in TABLES.items():
+        with open(csv_path(directory, table), 'w', newline='',
+                  encoding='utf-8') as file:
+            writer = csv.DictWriter(file, names)
+            writer.writeheader()
+            rows = export_rows(table, chunk_size)
+            writer.writerows(_counted(table, rows, chunk_size, progress))
+
+
+def read_ndjson(stream):
+    """Пары (таблица, запись) из потока NDJSON."""
+    for line in stream:
+        if line.strip():
+            record = json.loads(line)
+            yield record.pop('type', None), record
+
+
+def read_csv(directory):
+    """Пары (таблица, запись) из CSV-файлов каталога; пустое поле - None.
+    """
+    for table in TABLES:
+        path = csv_path(directory, table)
+        if not os.path.exists(path):
+            continue
+        with open(path, newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                yield table, {
+                    key: value if value != '' else None
+                    for key, value in row.items()
+                }
+
+
+@contextlib.contextmanager
+def explicit_dates():
+    """Отключает auto_now/auto_now_add, чтобы сохранились даты из файла.
+
+    Флаги полей общие для процесса: пока блок открыт, обычные сохранения в
+    других потоках тоже не получат текущую дату. Поэтому блок - только для
+    команд управления (import_posts, seed_bench), не для веб-процесса.
+    """
+    fields = [
+        field for model in MODELS.values()
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Loader:
+    """Копит записи по таблицам и пишет их пачками в транзакциях."""
+
+    def __init__(self, batch_size=CHUNK_SIZE, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.pending = {table: [] for table in TABLES}
+        self.loaded = dict.fromkeys(TABLES, 0)
+        # Новые id записей, чей id из файла занят: {таблица: {старый: новый}}
+        self.remapped = {table: {} for table in NATURAL_KEYS}
+        # Авторы и группы, чьи страницы нужно сбросить после загрузки.
+        self.usernames = set()
+        self.slugs = set()
+
+    def add(self, table, record):
+        if table not in TABLES:
+            raise ValueError(f'Неизвестный тип записи: {table}')
+        self.pending[table].append(record)
+        if len(self.pending[table]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Пишет накопленное; таблицы идут в порядке зависимостей."""
+        with transaction.atomic(), explicit_dates():
+            for table, records in self.pending.items():
+                if records:
+                    getattr(self, f'load_{table}')(records)
+                    self.loaded[table] += len(records)
+                    self.pending[table] = []
+        if self.progress is not None:
+            self.progress(self.loaded)
+
+    def user_ids(self, usernames):
+        """id пользователей по username; недостающие создаются без пароля.
+        """
+        usernames = set(usernames)
+        self.usernames |= usernames
+        users = User.objects.filter(username__in=usernames)
+        found = dict(users.values_list('username', 'pk'))
+        missing = usernames - found.keys()
+        if missing:
+            password = make_password(None)
+            User.objects.bulk_create([
+                User(username=username, password=password)
+                for username in missing
+            ])
+            found = dict(users.values_list('username', 'pk'))
+        return found
+
+    def place(self, table, objects):
+        """Объекты для вставки; занятые чужими записями id заменяются.
+
+        Свободный id из файла сохраняется. Если id занят той же записью
+        (совпали поля NATURAL_KEYS), она уже загружена и пропускается. Если
+        чужой - берется id ранее загруженной копии или выдается новый.
+        Замены копятся в self.remapped, по ним комментарии находят посты.
+        """
+        model, fields = MODELS[table], NATURAL_KEYS[table]
+
+        def natural_key(obj):
+            return tuple(getattr(obj, name) for name in fields)
+
+        taken = {
+            row[0]: row[1:] for row in model.objects.filter(
+                pk__in=[obj.pk for obj in objects]
+            ).values_list('pk', *fields)
+        }
+        conflicts = [
+            obj for obj in objects
+            if obj.pk in taken and taken[obj.pk] != natural_key(obj)
+        ]
+        if not conflicts:
+            return [obj for obj in objects if obj.pk not in taken]
+        lookup = {
+            f'{name}__in': {getattr(obj, name) for obj in conflicts}
+            for name in fields
+        }
+        known = {
+            row[1:]: row[0] for row in
+            model.objects.filter(**lookup).values_list('pk', *fields)
+        }
+        next_id = max(_next_id(model), max(obj.pk for obj in objects) + 1)
+        fresh = []
+        for obj in objects:
+            source = obj.pk
+            if source not in taken:
+                fresh.append(obj)
+                continue
+            if taken[source] == natural_key(obj):
+                continue
+            pk = known.get(natural_key(obj))
+            if pk is None:
+                pk = obj.pk = next_id
+                next_id += 1
+                fresh.append(obj)
+            self.remapped[table][source] = pk
+        return fresh
+
+    def load_group(self, records):
+        self.slugs.update(record['slug'] for record in records)
+        Group.objects.bulk_create([
+            Group(slug=record['slug'], title=record['title'],
+                  description=record['description'] or '')
+            for record in records
+        ], ignore_conflicts=True)
+
+    def load_post(self, records):
+        users = self.user_ids(record['author'] for record in records)
+        slugs = {record['group'] for record in records if record['group']}
+        self.slugs |= slugs
+        groups = dict(Group.objects.filter(
+            slug__in=slugs).values_list('slug', 'pk'))
+        posts = Post.objects.bulk_create(self.place('post', [
+            Post(
+                id=int(record['id']),
+                author_id=users[record['author']],
+                group_id=groups.get(record['group']),
+                text=record['text'],
+                pub_date=parse_datetime(record['pub_date']),
+                updated=parse_datetime(
+                    record.get('updated') or record['pub_date']),
+                image=record.get('image') or '',
+            )
+            for record in records
+        ]))
+        # Поиск и ссылки на файлы ведутся пачкой вместе с постами
+        fulltext.index_new_posts(posts)
+        dedup.recount({post.image.name for post in posts if post.image})
+
+    def load_comment(self, records):
+        users = self.user_ids(record['author'] for record in records)
+        post_ids = self.remapped['post']
+        Comment.objects.bulk_create(self.place('comment', [
+            Comment(
+                id=int(record['id']),
+                post_id=post_ids.get(int(record['post']), int(record['post'])),
+                author_id=users[record['author']],
+                text=record['text'],
+                created=parse_datetime(record['created']),
+            )
+            for record in records
+        ]))
+
+    def load_follow(self, records):
+        users = self.user_ids(
+            name for record in records
+            for name in (record['user'], record['author'])
+        )
+        pairs = {
+            (users[record['user']], users[record['author']])
+            for record in records
+        }
+        Follow.objects.bulk_create([
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs
+        ], ignore_conflicts=True)
+
+
+def load(records, batch_size=CHUNK_SIZE, progress=None):
+    """Загружает пары (таблица, запись) и пересчитывает производные данные.
+
+    Возвращает число обработанных записей по таблицам.
+    """
+    loader = Loader(batch_size, progress)
+    for table, record in records:
+        loader.add(table, record)
+    loader.flush()
+    refresh(batch_size, loader.usernames, loader.slugs)
+    return loader.loaded
+
+
+def refresh(batch_size=CHUNK_SIZE, usernames=None, slugs=None):
+    """Пересчитывает то, что обычно поддерживают сигналы сохранения.
+
+    Без usernames и slugs пересчитывается вся база, как после seed_posts.
+    С ними - только профили и ленты подписчиков этих пользователей и
+    счетчики этих групп: посты загрузки уже проиндексированы в
+    Loader.load_post. Ленты подписок заполняются timeline.rebuild(): туда
+    попадают и новые подписки, и новые посты авторов, на которых уже
+    подписаны. Кэш сбрасывается по версиям общей ленты, лент авторов
+    usernames и групп slugs. Возвращает число добавленных записей лент.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [User, Group, Post, Comment]):
+                cursor.execute(sql)
+        if usernames is None and slugs is None:
+            stats.create_missing_profiles(batch_size)
+            stats.recount_profiles()
+            stats.recount_groups()
+            dedup.recount()
+            fulltext.rebuild(batch_size)
+            entries = timeline.rebuild()
+        else:
+            entries = _refresh_loaded(batch_size, usernames or (), slugs or ())
+    invalidate(usernames or (), slugs or ())
+    return entries
+
+
+def _refresh_loaded(batch_size, usernames, slugs):
+    """Счетчики и ленты только затронутых загрузкой пользователей и групп.
+    """
+    entries = 0
+    for chunk in _chunks(usernames):
+        users = User.objects.filter(username__in=chunk)
+        stats.create_missing_profiles(batch_size, users)
+        stats.recount_profiles(Profile.objects.filter(user__in=users))
+        # После пересчета подписчиков: rebuild пропускает знаменитостей
+        entries += timeline.rebuild(users.values_list('pk', flat=True))
+    for chunk in _chunks(slugs):
+        stats.recount_groups(Group.objects.filter(slug__in=chunk))
+    return entries
+
+
+def invalidate(usernames=(), slugs=()):
+    """Сбрасывает кэш лент и счетчиков, которые могла изменить загрузка.
+
+    Кэш общий с другими данными, поэтому вместо cache.clear() меняются
+    версии лент, а счетчики лент подписок удаляются у подписчиков авторов.
+    """
+    keys = [feeds.feed_key('all')]
+    keys.extend(feeds.feed_key('author', username) for username in usernames)
+    keys.extend(feeds.feed_key('group', slug) for slug in slugs)
+    feeds.bump_feeds(*keys)
+    count_keys = [counters.count_key('all')]
+    for chunk in _chunks(usernames):
+        follower_ids = Follow.objects.filter(
+            author__username__in=chunk).values_list('user_id', flat=True)
+        count_keys.extend(
+            counters.count_key('follow', pk)
+            for pk in follower_ids.distinct())
+    cache.delete_many(count_keys)
@@ -0,0 +1,155 @@
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, ImageSequence
+
+logger = logging.getLogger(__name__)
+
+# Форматы, которые хранятся как есть, если картинка укладывается в лимиты
+KEEP_FORMATS = ('JPEG', 'PNG', 'GIF')
+
+
+def max_pixels():
+    return getattr(settings, 'POST_IMAGE_MAX_PIXELS', 40_000_000)
+
+
+def max_side():
+    return getattr(settings, 'POST_IMAGE_MAX_SIDE', 2560)
+
+
+def upload_quality():
+    return getattr(settings, 'POST_IMAGE_UPLOAD_QUALITY', 85)
+
+
+def count_frames(image):
+    """Число кадров картинки, но не больше, чем нужно для проверки лимита:
+    декодируется не больше POST_IMAGE_MAX_PIXELS точек."""
+    width, height = image.size
+    limit = max_pixels() // max(width * height, 1)
+    frames = 0
+    for _ in ImageSequence.Iterator(image):
+        frames += 1
+        if frames > limit:
+            break
+    image.seek(0)
+    return frames
+
+
+def check_pixels(width, height, frames=1):
+    """Отклоняет картинку, все кадры которой вместе больше
+    POST_IMAGE_MAX_PIXELS точек."""
+    if width * height > max_pixels():
+        raise ValidationError(
+            'Слишком большое изображение: %(width)s×%(height)s точек.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+    if width * height * frames > max_pixels():
+        raise ValidationError(
+            'Слишком длинная анимация: при %(width)s×%(height)s точек '
+            'допустимо не больше %(limit)s кадров.',
+            code='too_many_frames',
+            params={
+                'width': width, 'height': height,
+                'limit': max_pixels() // (width * height),
+            },
+        )
+
+
+def check_upload(file):
+    """Проверяет загруженный файл по лимиту точек всех кадров."""
+    file.seek(0)
+    with Image.open(file) as image:
+        check_pixels(*image.size, count_frames(image))
+    file.seek(0)
+
+
+def needs_normalizing(image):
+    """Картинку нужно пережать: чужой формат, крупная или с EXIF."""
+    return (
+        image.format not in KEEP_FORMATS
+        or max(image.size) > max_side()
+        or 'exif' in image.info
+    )
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+
+
+def _fit(size):
+    """Размер в пределах POST_IMAGE_MAX_SIDE с сохранением пропорций."""
+    scale = min(1, max_side() / max(size))
+    return tuple(max(1, round(side * scale)) for side in size)
+
+
+def _encode_animation(image):
+    """Уменьшает каждый кадр анимации с сохранением длительностей.
+
+    Полноразмерная RGBA-копия кадра живет только до уменьшения, в памяти
+    копятся уменьшенные кадры.
+    """
+    size = _fit(image.size)
+    frames = []
+    durations = []
+    for frame in ImageSequence.Iterator(image):
+        durations.append(frame.info.get('duration', 100))
+        frames.append(frame.convert('RGBA').resize(size, Image.LANCZOS))
+    buffer = BytesIO()
+    frames[0].save(
+        buffer, 'GIF', save_all=True, append_images=frames[1:],
+        duration=durations, loop=image.info.get('loop', 0), disposal=2
+    )
+    return buffer.getvalue(), 'gif'
+
+
+def _encode(image):
+    """Пережимает картинку без метаданных: анимацию в GIF, PNG с
+    прозрачностью, остальное в JPEG."""
+    if getattr(image, 'is_animated', False):
+        return _encode_animation(image)
+    image = ImageOps.exif_transpose(image)
+    # exif_transpose оставляет EXIF в info, а PNG записал бы его обратно.
+    image.info.pop('exif', None)
+    image.thumbnail((max_side(), max_side()))
+    buffer = BytesIO()
+    if _has_alpha(image):
+        image.convert('RGBA').save(buffer, 'PNG', optimize=True)
+        return buffer.getvalue(), 'png'
+    image.convert('RGB').save(
+        buffer, 'JPEG', quality=upload_quality(),
+        optimize=True, progressive=True
+    )
+    return buffer.getvalue(), 'jpg'
+
+
+def normalize(post):
+    """Приводит картинку поста к лимитам; True, если файл заменен.
+
+    Файл читается из хранилища потоком, пиксели декодируются только если
+    картинку нужно пережать. Картинка сверх лимита точек снимается с поста.
+    Пост не сохраняется: это делает вызывающий код, а прежний файл
+    освобождается по счетчику ссылок при сохранении.
+    """
+    if not post.image:
+        return False
+    with post.image.open('rb') as file, Image.open(file) as image:
+        try:
+            check_pixels(*image.size, count_frames(image))
+        except ValidationError:
+            logger.warning(
+                'Картинка %s поста %s больше лимита точек, удалена',
+                post.image.name, post.pk
+            )
+            post.image = ''
+            return True
+        if not needs_normalizing(image):
+            return False
+        content, extension = _encode(image)
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    post.image.save(f'{stem}.{extension}', ContentFile(content), save=False)
+    return True
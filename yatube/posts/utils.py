@@ -1,10 +1,126 @@
+import base64
+import binascii
+import json
+
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
 
 LIMIT_POSTS_ON_PAGE: int = 10
+LIMIT_COMMENTS_ON_PAGE: int = 20
+CURSOR_PARAM: str = 'cursor'
+ORDER_PARAM: str = 'order'
+
+
+def encode_cursor(forward, number, value, pk):
+    """Упаковывает позицию на ленте в непрозрачный токен для ?cursor=."""
+    raw = json.dumps([int(forward), number, value.isoformat(), pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Разбирает токен курсора, для битого токена возвращает None."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        forward, number, value, pk = json.loads(raw.decode())
+        value = parse_datetime(value)
+        if value is None or int(number) < 1:
+            return None
+        return bool(forward), int(number), value, int(pk)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        return None
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по паре (дата, id) без COUNT(*) и OFFSET.
+
+    Страница выбирается условием WHERE относительно крайней записи
+    соседней страницы, поэтому N-я страница стоит столько же, сколько
+    первая. Номер страницы хранится в самом курсоре. Общее число записей
+    берется из total (например, из кэша счетчиков), а не из COUNT(*).
+    """
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 descending=True, total=None):
+        super().__init__(object_list, per_page)
+        self.date_field = date_field
+        self.descending = descending
+        self.total = total
+        self.number = 1
+        self.has_next_page = False
+
+    @cached_property
+    def count(self):
+        if self.total is not None:
+            return self.total()
+        return super().count
+
+    @property
+    def num_pages(self):
+        """Известное число страниц: текущая и, если есть, следующая."""
+        return self.number + int(self.has_next_page)
+
+    def _ordered(self, forward):
+        desc = self.descending == forward
+        prefix = '-' if desc else ''
+        queryset = self.object_list.order_by(
+            f'{prefix}{self.date_field}', f'{prefix}pk')
+        return queryset, 'lt' if desc else 'gt'
+
+    def _position(self, obj):
+        return getattr(obj, self.date_field), obj.pk
+
+    def get_page(self, token):
+        """Возвращает страницу по токену курсора, без токена - первую."""
+        cursor = decode_cursor(token)
+        forward, number, value, pk = cursor or (True, 1, None, None)
+        queryset, lookup = self._ordered(forward)
+        if cursor is not None:
+            queryset = queryset.filter(
+                Q(**{f'{self.date_field}__{lookup}': value})
+                | Q(**{self.date_field: value, f'pk__{lookup}': pk})
+            )
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if cursor is not None and not rows:
+            return self.get_page(None)
+        if not forward:
+            rows.reverse()
+            number = max(number, 2) if has_more else 1
+            has_more = True
+        self.number = number
+        self.has_next_page = has_more
+        page = self._get_page(rows, number, self)
+        page.next_cursor = page.previous_cursor = None
+        if self.has_next_page:
+            page.next_cursor = encode_cursor(
+                True, number + 1, *self._position(rows[-1]))
+        if number > 1:
+            page.previous_cursor = encode_cursor(
+                False, number - 1, *self._position(rows[0]))
+        return page
+
+
+def paginator(request, post_list, total=None, date_field='pub_date'):
+    return CursorPaginator(
+        post_list, LIMIT_POSTS_ON_PAGE, date_field=date_field, total=total
+    ).get_page(request.GET.get(CURSOR_PARAM))
+
+
+def comments_order(request):
+    """Порядок комментариев: oldest (по умолчанию) или newest."""
+    if request.GET.get(ORDER_PARAM) == 'newest':
+        return 'newest'
+    return 'oldest'
 
 
-def paginator(request, post_list):
-    page_number = request.GET.get('page')
-    paginator = Paginator(post_list, LIMIT_POSTS_ON_PAGE).get_page(page_number)
-    return paginator
+def comments_paginator(request, comments):
+    return CursorPaginator(
+        comments, LIMIT_COMMENTS_ON_PAGE, date_field='created',
+        descending=comments_order(request) == 'newest'
+    ).get_page(request.GET.get(CURSOR_PARAM))
@@ -0,0 +1,165 @@
+import os
+from collections import defaultdict
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Count, OuterRef, Subquery, Sum
+from PIL import Image, ImageOps
+
+from .models import ImageVariant
+
+# Форматы по убыванию предпочтения; JPEG - запасной для <img>
+FORMATS = {
+    'AVIF': ('image/avif', 'avif'),
+    'WEBP': ('image/webp', 'webp'),
+    'JPEG': ('image/jpeg', 'jpg'),
+}
+FALLBACK_FORMAT: str = 'JPEG'
+
+
+def scales():
+    """Во сколько раз варианты шире слота на странице."""
+    return getattr(settings, 'POST_IMAGE_SCALES', (0.5, 1, 2))
+
+
+def quality():
+    return getattr(settings, 'POST_IMAGE_QUALITY', 80)
+
+
+def available_formats():
+    """Форматы, которые умеет сохранять установленный Pillow."""
+    Image.init()
+    return [name for name in FORMATS if name in Image.SAVE]
+
+
+def parse_geometry(geometry):
+    width, height = geometry.split('x')
+    return int(width), int(height)
+
+
+def variant_sizes(geometry, source_width):
+    """Размеры вариантов слота; крупнее исходника не делаются."""
+    width, height = parse_geometry(geometry)
+    sizes = []
+    for scale in scales():
+        size = (round(width * scale), round(height * scale))
+        if scale <= 1 or size[0] <= source_width:
+            sizes.append(size)
+    return sizes
+
+
+def _encode(image, image_format):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=quality(), optimize=True)
+    return buffer.getvalue()
+
+
+def generate(post, geometries):
+    """Создает варианты картинки поста для всех слотов geometries."""
+    post.image_variants.all().delete()
+    if not post.image:
+        return []
+    donor = ImageVariant.objects.filter(
+        source=post.image.name, geometry__in=geometries
+    ).values_list('post_id', flat=True).first()
+    if donor is not None:
+        return share(post, donor, geometries)
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    formats = available_formats()
+    variants = []
+    with post.image.open('rb') as file, Image.open(file) as source:
+        source = ImageOps.exif_transpose(source)
+        for geometry in geometries:
+            for width, height in variant_sizes(geometry, source.width):
+                resized = ImageOps.fit(source, (width, height))
+                for image_format in formats:
+                    content = _encode(resized, image_format)
+                    variant = ImageVariant(
+                        post=post, source=post.image.name,
+                        geometry=geometry, format=image_format,
+                        width=width, height=height, size=len(content)
+                    )
+                    extension = FORMATS[image_format][1]
+                    variant.file.save(
+                        f'{post.pk}/{stem}_{width}x{height}.{extension}',
+                        ContentFile(content), save=False
+                    )
+                    variants.append(variant)
+    return ImageVariant.objects.bulk_create(variants)
+
+
+def share(post, donor_id, geometries):
+    """Дубликат картинки получает варианты другого поста без перекодирования.
+    """
+    shared = ImageVariant.objects.filter(
+        post_id=donor_id, source=post.image.name, geometry__in=geometries)
+    return ImageVariant.objects.bulk_create([
+        ImageVariant(
+            post=post, source=variant.source, geometry=variant.geometry,
+            format=variant.format, width=variant.width,
+            height=variant.height, file=variant.file.name, size=variant.size
+        )
+        for variant in shared
+    ])
+
+
+def for_posts(posts, geometry):
+    """Варианты текущих картинок постов для слота: {pk поста: [...]}."""
+    posts = [post for post in posts if post.image]
+    found = defaultdict(list)
+    if not posts:
+        return found
+    sources = {post.pk: post.image.name for post in posts}
+    variants = ImageVariant.objects.filter(
+        post_id__in=sources, geometry=geometry).order_by('width')
+    for variant in variants:
+        if variant.source == sources[variant.post_id]:
+            found[variant.post_id].append(variant)
+    return found
+
+
+def missing(posts):
+    """Посты, у которых нет вариантов текущей картинки."""
+    posts = [post for post in posts if post.image]
+    ready = set(ImageVariant.objects.filter(
+        post__in=posts).values_list('post_id', 'source').distinct())
+    return [post for post in posts if (post.pk, post.image.name) not in ready]
+
+
+def picture_sources(variants):
+    """srcset по форматам в порядке предпочтения: [(формат, mime, srcset)]."""
+    by_format = defaultdict(list)
+    for variant in variants:
+        by_format[variant.format].append(
+            f'{variant.file.url} {variant.width}w')
+    return [
+        (name, FORMATS[name][0], ', '.join(by_format[name]))
+        for name in FORMATS if by_format[name]
+    ]
+
+
+def savings():
+    """Вес вариантов по слотам и форматам и экономия относительно JPEG.
+
+    Каждый вариант сравнивается с JPEG того же поста, слота и ширины.
+    """
+    jpeg = ImageVariant.objects.filter(
+        post=OuterRef('post'), geometry=OuterRef('geometry'),
+        width=OuterRef('width'), format=FALLBACK_FORMAT
+    ).values('size')[:1]
+    report = list(
+        ImageVariant.objects.annotate(jpeg_size=Subquery(jpeg))
+        .values('geometry', 'format')
+        .annotate(
+            files=Count('pk'), bytes=Sum('size'), jpeg_bytes=Sum('jpeg_size'))
+        .order_by('geometry', 'format')
+    )
+    for row in report:
+        row['saved'] = None
+        if row['jpeg_bytes'] and row['format'] != FALLBACK_FORMAT:
+            ratio = row['bytes'] / row['jpeg_bytes']
+            row['saved'] = round(100 * (1 - ratio), 1)
+    return report
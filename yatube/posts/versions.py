@@ -0,0 +1,29 @@
+import uuid
+
+from django.core.cache import cache
+
+
+def version_key(namespace, scope):
+    return f'{namespace}_version:{scope}'
+
+
+def _token():
+    """Случайная версия, а не счетчик: после вытеснения ключа из кэша
+    новая версия не совпадет ни с одной из прежних."""
+    return uuid.uuid4().hex
+
+
+def get_versions(keys):
+    """Текущие версии для ключей; недостающие заводятся заново."""
+    keys = set(keys)
+    versions = cache.get_many(keys)
+    missing = {key: _token() for key in keys - versions.keys()}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def bump(*keys):
+    """Делает недействительным все, что закэшировано под этими версиями."""
+    cache.set_many({key: _token() for key in keys}, None)
@@ -1,42 +1,54 @@
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.urls import reverse
 
-from . import utils
+from . import (
+    counters, feeds, fulltext, querysets, stats, thumbnails, timeline,
+    utils, variants
+)
 from .forms import CommentForm, PostForm
 from .models import Group, Post, User, Follow
 
 
 LIMIT_POSTS_ON_PAGE: int = 10
+DETAIL_THUMBNAIL: str = '960x339'
 
 
-@cache_page(20, cache='default', key_prefix='index_page')
+@feeds.cached_feed_page(lambda: feeds.feed_key('all'))
 def index(request):
     """Все посты, разбивает по LIMIT_POSTS_ON_PAGE штук на странице"""
-    post_list = Post.objects.select_related('author', 'group')
+    post_list = querysets.post_cards()
     return render(
         request, 'posts/index.html', {
-            'page_obj': utils.paginator(request, post_list),
+            'page_obj': utils.paginator(
+                request, post_list, counters.feed_count),
         }
     )
 
 
+@feeds.cached_feed_page(lambda slug: feeds.feed_key('group', slug))
 def group_posts(request, slug):
     """Посты группы, разбивает по LIMIT_POSTS_ON_PAGE штук на странице."""
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    post_list = querysets.post_cards(group.posts.all())
     context = {
         'group': group,
-        'page_obj': utils.paginator(request, post_list),
+        'page_obj': utils.paginator(
+            request, post_list, lambda: group.posts_count),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@feeds.cached_feed_page(
+    lambda username: feeds.feed_key('author', username))
 def profile(request, username):
     """Посты автора, разбивает по LIMIT_POSTS_ON_PAGE штук на странице."""
-    author = User.objects.get(username=username)
-    post_list = author.posts.all()
-    post_count = post_list.count()
+    author = get_object_or_404(
+        User.objects.select_related('profile'), username=username)
+    post_list = querysets.post_cards(author.posts.all())
+    post_count = stats.profile_for(author).posts_count
     following = True
     if request.user.id is not None:
         user = request.user
@@ -47,7 +59,8 @@ def profile(request, username):
             following = True
     context = {
         'author': author,
-        'page_obj': utils.paginator(request, post_list),
+        'page_obj': utils.paginator(
+            request, post_list, lambda: post_count),
         'posts_count': post_count,
         'following': following,
     }
@@ -56,17 +69,51 @@ def profile(request, username):
 
 def post_detail(request, post_id):
     """Выводит определенный пост и инф о нем."""
-    post = get_object_or_404(Post, pk=post_id)
-    posts_count = Post.objects.filter(author=post.author).count()
+    post = get_object_or_404(querysets.post_detail(), pk=post_id)
+    posts_count = stats.profile_for(post.author).posts_count
     context = {
         'post': post,
         'posts_count': posts_count,
         'form': CommentForm(request.POST or None),
-        'comments': post.comments.all()
+        'comments': utils.comments_paginator(
+            request, querysets.post_comments(post)),
+        'order': utils.comments_order(request),
+        'variants': variants.for_posts(
+            [post], DETAIL_THUMBNAIL).get(post.pk, []),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая порция комментариев: HTML-фрагмент или JSON."""
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    comments = utils.comments_paginator(
+        request, querysets.post_comments(post))
+    order = utils.comments_order(request)
+    if request.GET.get('format') == 'json':
+        next_url = None
+        if comments.next_cursor:
+            next_url = '{}?order={}&cursor={}&format=json'.format(
+                reverse('posts:post_comments', args=[post.id]),
+                order, comments.next_cursor
+            )
+        return JsonResponse({
+            'comments': [{
+                'id': comment.id,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            } for comment in comments],
+            'next': next_url,
+        })
+    context = {
+        'post': post,
+        'comments': comments,
+        'order': order,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
 def post_create(request, is_edit=False):
     """Создание нового поста."""
@@ -75,6 +122,8 @@ def post_create(request, is_edit=False):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:profile', request.user.username)
     return render(request, "posts/create_post.html", {'form': form})
 
@@ -98,6 +147,8 @@ def post_edit(request, post_id):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post_id)
     return render(request, "posts/create_post.html", context)
 
@@ -118,9 +169,12 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     """Посты авторов подписка"""
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = querysets.post_cards(timeline.feed(request.user))
     context = {
-        'page_obj': utils.paginator(request, posts),
+        'page_obj': utils.paginator(
+            request, posts, lambda: counters.follow_count(request.user),
+            date_field='feed_date'
+        ),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -129,9 +183,8 @@ def follow_index(request):
 def profile_follow(request, username):
     """Подписка"""
     author = get_object_or_404(User, username=username)
-    follower = Follow.objects.filter(user=request.user, author=author)
-    if request.user != author and not follower.exists():
-        Follow.objects.create(user=request.user, author=author)
+    if request.user != author:
+        Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username=username)
 
 
@@ -143,3 +196,18 @@ def profile_unfollow(request, username):
     if follower.exists():
         follower.delete()
     return redirect('posts:profile', username=author)
+
+
+def search(request):
+    """Поиск постов по тексту с учетом словоформ."""
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = Paginator(
+            fulltext.search(query), utils.LIMIT_POSTS_ON_PAGE
+        ).get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
@@ -53,6 +53,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.SlowRequestProfilerMiddleware',
+    'core.middleware.SqlLogMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -90,6 +93,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -152,8 +157,132 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# Общий для процессов кэш выбирается переменной окружения CACHE_BACKEND:
+# locmem (по умолчанию), file, memcached или redis; адрес - CACHE_LOCATION.
+# Для общего кэша перед ним ставится небольшой кэш процесса (L1).
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+SHARED_CACHES = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+    'redis': {
+        'BACKEND': 'core.cache.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', '127.0.0.1:6379'),
+    },
+}
+
+CACHES = {
+    'shared': SHARED_CACHES[CACHE_BACKEND],
+    'default': SHARED_CACHES[CACHE_BACKEND],
+}
+if CACHE_BACKEND != 'locmem':
+    CACHES['default'] = {
+        'BACKEND': 'core.cache.tiered.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'L1_TIMEOUT': int(os.environ.get('CACHE_L1_TIMEOUT', 5)),
+            'L1_MAX_ENTRIES': int(os.environ.get('CACHE_L1_MAX_ENTRIES', 1000)),
+        },
     }
+
+# Оценка общего числа постов по статистике СУБД вместо COUNT(*)
+POSTS_COUNT_APPROXIMATE = False
+
+# Лента подписок: авторам с большим числом подписчиков посты не рассылаются.
+# При подписке в ленту кладутся только последние BACKFILL_LIMIT постов
+# автора, более старые в ленте подписок не показываются.
+TIMELINE_FANOUT_LIMIT = 5000
+TIMELINE_BACKFILL_LIMIT = 1000
+
+# Время жизни отрендеренных карточек постов
+POST_CARD_TIMEOUT = 60 * 60 * 24
+
+# Время жизни страниц лент; актуальность держится версиями ключей
+FEED_CACHE_TIMEOUT = 60 * 60 * 3
+FEED_STALE_TIMEOUT = 60 * 10
+# Ожидание чужого пересчета страницы, если устаревшей копии нет (секунды)
+FEED_WAIT_TIMEOUT = 0.2
+
+# Фоновые задачи: очередь в БД, разбор пулом потоков процесса и run_jobs.
+# Под тестами потоки не запускаются (core.test_runner), очередь разбирает
+# сам тест.
+JOBS_WORKERS = int(os.environ.get('JOBS_WORKERS', 2))
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETRY_DELAY = 60
+JOBS_LOCK_TIMEOUT = 60 * 10
+
+# Варианты картинок постов для <picture>: масштабы к слоту и качество
+POST_IMAGE_SCALES = (0.5, 1, 2)
+POST_IMAGE_QUALITY = 80
+
+# Загружаемые картинки: лимит точек всех кадров проверяется в форме,
+# пережатие - в фоне
+POST_IMAGE_MAX_PIXELS = 40_000_000
+POST_IMAGE_MAX_SIDE = 2560
+POST_IMAGE_UPLOAD_QUALITY = 85
+
+# Поиск постов: auto - FTS5 на SQLite, где он есть, иначе обратный индекс
+POSTS_SEARCH_BACKEND = os.environ.get('POSTS_SEARCH_BACKEND', 'auto')
+
+# Замеры запросов: строка JSON в лог yatube.requests, гистограммы на
+# /metrics и заголовок Server-Timing (сотрудникам или всем при
+# SERVER_TIMING_PUBLIC). /metrics открыт сотрудникам, по заголовку
+# Authorization: Bearer METRICS_TOKEN и адресам METRICS_ALLOWED_IPS. Адреса
+# годятся, только если сервер слушает внутренний адрес без прокси: за
+# прокси REMOTE_ADDR у всех запросов - адрес прокси.
+REQUEST_METRICS = os.environ.get('REQUEST_METRICS', '1') == '1'
+SERVER_TIMING_PUBLIC = os.environ.get('SERVER_TIMING_PUBLIC', '0') == '1'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [
+    address for address in
+    os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if address
+]
+
+# Профилировщик медленных запросов: стеки раз в INTERVAL секунд, файлы
+# только для запросов дольше THRESHOLD секунд. Отчет - profile_report.
+SLOW_REQUEST_PROFILER = os.environ.get('SLOW_REQUEST_PROFILER', '0') == '1'
+SLOW_REQUEST_THRESHOLD = float(os.environ.get('SLOW_REQUEST_THRESHOLD', 1))
+SLOW_REQUEST_PROFILE_INTERVAL = float(
+    os.environ.get('SLOW_REQUEST_PROFILE_INTERVAL', 0.005))
+SLOW_REQUEST_PROFILE_DIR = os.environ.get(
+    'SLOW_REQUEST_PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+
+# Журнал SQL по отпечаткам запросов: сводка в админке на /admin/sql/,
+# запросы дольше порога (секунды) - в лог yatube.sql с планом EXPLAIN.
+SQL_LOG = os.environ.get('SQL_LOG', '1') == '1'
+SQL_SLOW_THRESHOLD = float(os.environ.get('SQL_SLOW_THRESHOLD', 0.1))
+SQL_LOG_MAX_ENTRIES = 2000
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'yatube.profiler': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'yatube.sql': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
 }
@@ -2,6 +2,9 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
 
+from core.admin import sql_report
+from core.views import metrics
+
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
 handler403 = 'core.views.permission_denied'
@@ -9,10 +12,13 @@ handler403 = 'core.views.permission_denied'
 urlpatterns = [
     # импорт правил из приложения posts
     path('', include('posts.urls', namespace='posts')),
+    path(
+        'admin/sql/', admin.site.admin_view(sql_report), name='sql_report'),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('metrics', metrics, name='metrics'),
 ]
 
 if settings.DEBUG: